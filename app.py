@@ -5,20 +5,30 @@ Sistema de Torneio de Beach Tennis - 5 Rodadas com Duplas Mistas
 Desenvolvido para BT Mania
 """
 
-from flask import Flask, render_template, redirect, url_for, request, jsonify, session
-import json
+from flask import (Flask, render_template, redirect, url_for, request, jsonify, session, abort,
+                   Response, stream_with_context)
 import os
 import hashlib
-from datetime import datetime
-from typing import Dict
+import json
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
 from utils.sorteio_rodadas import (
     gerar_5_rodadas,
     validar_participantes,
-    calcular_ranking_individual,
-    separar_ranking_por_genero,
     analisar_viabilidade_mesmo_genero,
     gerar_sorteio_mesmo_genero
 )
+from utils.armazenamento import criar_backend
+from utils.cache_leitura import cache_leitura
+from utils.estado_torneio import TODAS, EstadoTorneio, linha_ranking_zerada
+from utils.eventos import INTERVALO_VERIFICACAO, Difusor, formatar_evento
+from utils.exportacao import exportar, ler_exportacao
+from utils.filtro_visitas import FiltroVisitas
+from utils.jogadores import chave_nome, normalizar_nome, resolver_nomes_ranking
+from utils.migracoes import migrar
+from utils.ranking_incremental import diferenca_ranking
+from utils.torneios import ArquivoTorneios, jogadores_das_rodadas
+from utils.visitas import RegistradorVisitas
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'bt-sorteio-secret-key-2024')
@@ -32,11 +42,47 @@ def favicon():
     return ("", 204)
 
 # Arquivos de dados
-DATA_FILE = os.path.join("data", "jogadores.json")
-RODADAS_FILE = "data/rodadas.json"
-RANKING_FILE = "data/ranking.json"
-VISITAS_FILE = "data/visitas.json"
-VISITAS_DETALHADAS_FILE = "data/visitas_detalhadas.json"
+VISITAS_FILE = "data/visitas.json"  # formato antigo (lista de hashes), convertido para o contador
+VISITANTES_FILE = "data/visitantes.bin"  # só o total (página inicial)
+VISITANTES_DETALHES_FILE = "data/visitantes_detalhes.bin"  # por dia e por página
+VISITAS_DETALHADAS_FILE = "data/visitas_detalhadas.json"  # formatos antigos, convertidos para o log
+VISITAS_LOG_FILE = "data/visitas.log"
+VISITAS_LOG_DIR = "data/visitas"
+VISITAS_AGREGADOS_FILE = "data/visitas_agregados.json"
+VISITAS_SERIES_FILE = "data/visitas_series.db"
+
+# Armazenamento do torneio (BT_STORAGE=json|sqlite), migrado para o esquema atual
+armazenamento = criar_backend()
+migrar(armazenamento)
+
+# Estado do torneio em memória; placares e presenças são gravados em segundo plano
+estado = EstadoTorneio(armazenamento)
+
+# Torneios encerrados (data/torneios/<id>/ + índice)
+arquivo_torneios = ArquivoTorneios()
+
+# Visitas: fila em memória gravada em lotes no log segmentado (data/visitas/)
+visitas = RegistradorVisitas(VISITAS_LOG_DIR, VISITANTES_FILE, VISITANTES_DETALHES_FILE,
+                             VISITAS_AGREGADOS_FILE, VISITAS_SERIES_FILE)
+visitas.converter_log_antigo(VISITAS_DETALHADAS_FILE)
+visitas.converter_log_antigo(VISITAS_LOG_FILE)
+visitas.reconstruir_agregados()
+visitas.converter_unicos_antigos(VISITAS_FILE)
+visitas.separar_unicos()
+filtro_visitas = FiltroVisitas()
+
+# Eventos ao vivo (/events/<categoria>) das conexões abertas neste worker
+difusor = Difusor()
+
+
+def estado_do_torneio(torneio_id=None) -> EstadoTorneio:
+    """Torneio atual (sem id) ou um torneio arquivado; 404 se o id não existe"""
+    if torneio_id is None:
+        return estado
+    estado_arquivado = arquivo_torneios.estado(torneio_id)
+    if estado_arquivado is None:
+        abort(404)
+    return estado_arquivado
 
 
 # ============================================================================
@@ -44,75 +90,89 @@ VISITAS_DETALHADAS_FILE = "data/visitas_detalhadas.json"
 # ============================================================================
 
 def carregar_jogadores():
-    """Carrega jogadores do arquivo JSON"""
-    try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            jogadores = json.load(f)
-            for j in jogadores:
-                if "confirmado" not in j:
-                    j["confirmado"] = False
-                if "categorias" not in j:
-                    j["categorias"] = ["mista"]
-            return jogadores
-    except FileNotFoundError:
-        return []
-
-
-def salvar_jogadores(jogadores):
-    """Salva jogadores no arquivo JSON"""
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(jogadores, f, ensure_ascii=False, indent=2)
+    """Jogadores do torneio (lista compartilhada do estado em memória: não modificar)"""
+    return estado.jogadores()
 
 
 # ============================================================================
-# FUNÇÕES AUXILIARES - RODADAS E RANKING
+# FUNÇÕES AUXILIARES - RANKING VERSIONADO (ETag / Last-Modified)
 # ============================================================================
 
-def carregar_rodadas():
-    """Carrega as rodadas do arquivo JSON"""
-    try:
-        with open(RODADAS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return None
-
+# (torneio_id, categoria) -> versão publicada do ranking: ETag, data e corpos já gerados
+_versoes_ranking: Dict[tuple, Dict] = {}
 
-def salvar_rodadas(dados):
-    """Salva as rodadas no arquivo JSON"""
-    with open(RODADAS_FILE, "w", encoding="utf-8") as f:
-        json.dump(dados, f, ensure_ascii=False, indent=2)
 
-
-def carregar_ranking():
-    """Carrega o ranking do arquivo JSON (categoria mista - compatibilidade)"""
+def _data_http(iso: Optional[str]) -> Optional[datetime]:
+    """Timestamp ISO local (ultima_atualizacao) em UTC, com precisão de segundos"""
     try:
-        with open(RANKING_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
+        return datetime.fromisoformat(iso).astimezone(timezone.utc).replace(microsecond=0)
+    except (TypeError, ValueError):
         return None
 
 
-def salvar_ranking(dados):
-    """Salva o ranking no arquivo JSON (categoria mista - compatibilidade)"""
-    with open(RANKING_FILE, "w", encoding="utf-8") as f:
-        json.dump(dados, f, ensure_ascii=False, indent=2)
-
+def versao_ranking(categoria, torneio_id=None) -> Dict:
+    """
+    Versão atual do ranking da categoria. O ETag é o hash do conteúdo (igual em todos
+    os workers); os corpos já gerados desta versão ficam em "corpos".
+    """
+    estado_t = estado_do_torneio(torneio_id)
+    versao, ranking, assinatura = estado_t.versao_ranking(categoria)
+    chave = (torneio_id, categoria)
+    publicada = _versoes_ranking.get(chave)
+    if publicada is None or publicada["estado"] is not estado_t or publicada["versao"] != versao:
+        publicada = {
+            "estado": estado_t,
+            "categoria": categoria,
+            "versao": versao,
+            "ranking": ranking,
+            "etag": assinatura,
+            "modificado": _data_http(ranking.get("ultima_atualizacao")),
+            "corpos": {}
+        }
+        _versoes_ranking[chave] = publicada
+    return publicada
 
-def carregar_ranking_por_categoria(categoria: str):
-    """Carrega o ranking de uma categoria específica"""
-    arquivo = f"data/ranking_{categoria}.json"
-    try:
-        with open(arquivo, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return None
 
+def resposta_versionada(publicada: Dict, formato: str, gerar: Callable[[], str], mimetype: str) -> Response:
+    """
+    304 se o cliente já tem esta versão (If-None-Match / If-Modified-Since), sem gerar
+    nada; senão o corpo gerado uma vez por versão e formato.
+    """
+    if request.if_none_match:
+        atual = request.if_none_match.contains_weak(publicada["etag"])
+    else:
+        atual = bool(publicada["modificado"] and request.if_modified_since
+                     and publicada["modificado"] <= request.if_modified_since)
 
-def salvar_ranking_por_categoria(categoria: str, dados: Dict):
-    """Salva o ranking de uma categoria específica"""
-    arquivo = f"data/ranking_{categoria}.json"
-    with open(arquivo, "w", encoding="utf-8") as f:
-        json.dump(dados, f, ensure_ascii=False, indent=2)
+    if atual:
+        resposta = Response(status=304)
+    else:
+        corpo = publicada["corpos"].get(formato)
+        if corpo is None:
+            corpo = publicada["corpos"][formato] = gerar()
+        resposta = Response(corpo, mimetype=mimetype)
+    resposta.set_etag(publicada["etag"])
+    if publicada["modificado"]:
+        resposta.last_modified = publicada["modificado"]
+    resposta.cache_control.no_cache = True  # Pode guardar, mas revalida a cada acesso
+    return resposta
+
+
+# categoria -> ETag da última versão do ranking anunciada por este worker
+_anunciadas: Dict[str, str] = {}
+
+
+def anunciar_ranking(categoria, externa: bool = False):
+    """
+    Publica "ranking" para as conexões da categoria se a versão mudou desde o último
+    anúncio. externa=True: a mudança foi notada na verificação periódica (placar
+    gravado por outro worker), sem um evento "resultado" antes.
+    """
+    publicada = versao_ranking(categoria)
+    if _anunciadas.get(categoria) != publicada["etag"]:
+        _anunciadas[categoria] = publicada["etag"]
+        difusor.publicar(categoria, "ranking", {"versao": publicada["versao"], "etag": publicada["etag"],
+                                                "externa": externa})
 
 
 # ============================================================================
@@ -137,8 +197,13 @@ def obter_ip_real():
 
 @app.before_request
 def registrar_visita_global():
-    """Registra visitas únicas por IP e salva dados detalhados"""
+    """Registra a visita (IP em hash + dados detalhados) na fila de gravação"""
     try:
+        # Arquivos estáticos, POSTs, robôs e amostragem: decidido antes de qualquer outro trabalho
+        peso = filtro_visitas.avaliar(request.method, request.path, request.headers.get('User-Agent', ''))
+        if peso is None:
+            return
+        
         # Obtém IP real (considerando proxies)
         ip = obter_ip_real()
         user_hash = hashlib.md5(ip.encode()).hexdigest()
@@ -147,7 +212,6 @@ def registrar_visita_global():
         dados_visita = {
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "ip_hash": user_hash,  # Hash para privacidade
-            "ip_original": ip,  # IP real (pode ser removido se preferir mais privacidade)
             "user_agent": request.headers.get('User-Agent', ''),
             "navegador": request.user_agent.browser if hasattr(request, 'user_agent') else None,
             "plataforma": request.user_agent.platform if hasattr(request, 'user_agent') else None,
@@ -159,36 +223,11 @@ def registrar_visita_global():
             "host": request.host,
             "scheme": request.scheme,  # http ou https
         }
+        if peso > 1:
+            dados_visita["peso"] = peso  # Visita amostrada: vale por peso visitas nos contadores
         
-        # 1. Atualiza contador de visitantes únicos (data/visitas.json)
-        try:
-            with open(VISITAS_FILE, "r", encoding="utf-8") as f:
-                content = f.read().strip()
-                ips = json.loads(content) if content else []
-        except (FileNotFoundError, json.JSONDecodeError):
-            ips = []
-
-        if user_hash not in ips:
-            ips.append(user_hash)
-            with open(VISITAS_FILE, "w", encoding="utf-8") as f:
-                json.dump(ips, f, indent=2)
-        
-        # 2. Salva log detalhado de todas as visitas (data/visitas_detalhadas.json)
-        try:
-            with open(VISITAS_DETALHADAS_FILE, "r", encoding="utf-8") as f:
-                content = f.read().strip()
-                logs = json.loads(content) if content else []
-        except (FileNotFoundError, json.JSONDecodeError):
-            logs = []
-        
-        logs.append(dados_visita)
-        
-        # Mantém apenas os últimos 1000 logs para não crescer infinitamente
-        if len(logs) > 1000:
-            logs = logs[-1000:]
-        
-        with open(VISITAS_DETALHADAS_FILE, "w", encoding="utf-8") as f:
-            json.dump(logs, f, indent=2, ensure_ascii=False)
+        # Só enfileira: a gravação (log + visitantes únicos) é feita em lotes, fora da requisição
+        visitas.registrar(dados_visita)
             
     except Exception as e:
         # Log de erro (opcional)
@@ -205,11 +244,8 @@ def index():
     """Página inicial do torneio"""
     total_visitas = 0
     try:
-        with open(VISITAS_FILE, "r", encoding="utf-8") as f:
-            content = f.read().strip()
-            visitas = json.loads(content) if content else []
-            total_visitas = len(visitas)
-    except (FileNotFoundError, json.JSONDecodeError):
+        total_visitas = visitas.total_unicos()
+    except ValueError:
         pass
     
     return render_template("index.html", total_visitas=total_visitas)
@@ -222,7 +258,7 @@ def index():
 @app.route("/presenca")
 def presenca():
     """Página de confirmação de presença e cadastro"""
-    jogadores = sorted(carregar_jogadores(), key=lambda j: j["nome"])
+    jogadores = sorted(estado.jogadores(), key=lambda j: j["nome"])
     categorias = {
         "mista_m": len([j for j in jogadores if j["confirmado"] and j["sexo"] == "M"]),
         "mista_f": len([j for j in jogadores if j["confirmado"] and j["sexo"] == "F"]),
@@ -235,13 +271,8 @@ def presenca():
 @app.route("/confirmar_presenca", methods=["POST"])
 def confirmar_presenca():
     """API para confirmar presença de jogadores"""
-    jogadores = carregar_jogadores()
     confirmados = request.json.get("confirmado", [])
-    
-    for j in jogadores:
-        j["confirmado"] = j["nome"] in confirmados
-    
-    salvar_jogadores(jogadores)
+    estado.confirmar_presenca(confirmados)
     return {"status": "ok"}
 
 
@@ -249,28 +280,44 @@ def confirmar_presenca():
 def adicionar_ou_editar_jogador():
     """API para adicionar ou editar jogador"""
     data = request.get_json()
-    nome = data.get("nome", "").strip()
+    nome = normalizar_nome(data.get("nome", ""))
     sexo = data.get("sexo")
     categorias = data.get("categorias", ["mista"])
+    jogador_id = data.get("id")  # Com id, edita (ou renomeia) o jogador desse id
 
     if not nome or not sexo:
         return {"status": "erro", "mensagem": "Dados incompletos"}, 400
 
-    jogadores = carregar_jogadores()
-    jogador_existente = next((j for j in jogadores if j["nome"].lower() == nome.lower()), None)
+    conflito = False
+
+    def gravar(jogadores):
+        nonlocal conflito
+        if jogador_id is not None:
+            # Renomear para o nome de OUTRO jogador criaria duas pessoas com o mesmo nome
+            if any(chave_nome(j["nome"]) == chave_nome(nome) and j.get("id") != jogador_id for j in jogadores):
+                conflito = True
+                return None  # não grava
+            jogador_existente = next((j for j in jogadores if j.get("id") == jogador_id), None)
+            if jogador_existente:
+                jogador_existente["nome"] = nome
+        else:
+            jogador_existente = next((j for j in jogadores if chave_nome(j["nome"]) == chave_nome(nome)), None)
 
-    if jogador_existente:
-        jogador_existente["sexo"] = sexo
-        jogador_existente["categorias"] = categorias
-    else:
-        jogadores.append({
-            "nome": nome,
-            "sexo": sexo,
-            "categorias": categorias,
-            "confirmado": False
-        })
+        if jogador_existente:
+            jogador_existente["sexo"] = sexo
+            jogador_existente["categorias"] = categorias
+        else:
+            jogadores.append({
+                "nome": nome,
+                "sexo": sexo,
+                "categorias": categorias,
+                "confirmado": False
+            })
+        return jogadores
 
-    salvar_jogadores(jogadores)
+    estado.atualizar_jogadores(gravar)
+    if conflito:
+        return {"status": "erro", "mensagem": f"Já existe outro jogador chamado {nome}"}, 409
     return {"status": "ok"}
 
 
@@ -284,10 +331,16 @@ def excluir_jogador():
         if not nome:
             return jsonify({'status': 'erro', 'mensagem': 'Nome não fornecido'}), 400
 
-        jogadores = carregar_jogadores()
-        jogadores_filtrados = [j for j in jogadores if j["nome"] != nome]
+        # As rodadas guardam o id: excluir quem está no sorteio atual deixaria o id sem nome
+        jogador_id = estado.registro().id(nome)
+        for categoria in estado.categorias_com_rodadas():
+            no_sorteio = jogadores_das_rodadas(estado.rodadas(categoria))
+            if nome in no_sorteio or (jogador_id is not None and jogador_id in no_sorteio):
+                return jsonify({'status': 'erro',
+                                'mensagem': f'{nome} está nas rodadas atuais ({categoria}). '
+                                            'Resete as rodadas antes de excluir.'}), 409
 
-        salvar_jogadores(jogadores_filtrados)
+        estado.atualizar_jogadores(lambda jogadores: [j for j in jogadores if j["nome"] != nome])
         return jsonify({'status': 'ok'})
 
     except Exception as e:
@@ -301,12 +354,11 @@ def excluir_jogador():
 @app.route("/gerar-rodadas", methods=["POST"])
 def rota_gerar_rodadas():
     """Gera as 5 rodadas com duplas mistas"""
-    jogadores = carregar_jogadores()
-    confirmados = [j for j in jogadores if j.get("confirmado")]
+    confirmados = estado.confirmados()
     
-    # Separa por gênero
-    homens = [j["nome"] for j in confirmados if j["sexo"] == "M"]
-    mulheres = [j["nome"] for j in confirmados if j["sexo"] == "F"]
+    # Separa por gênero (o sorteio trabalha com os ids dos jogadores)
+    homens = [j["id"] for j in confirmados if j["sexo"] == "M"]
+    mulheres = [j["id"] for j in confirmados if j["sexo"] == "F"]
     
     # Valida
     valido, mensagem = validar_participantes(homens, mulheres)
@@ -321,6 +373,7 @@ def rota_gerar_rodadas():
     
     # Adiciona metadados
     dados_completos = {
+        "categoria": "mista",
         "data_sorteio": datetime.now().isoformat(),
         "total_homens": len(homens),
         "total_mulheres": len(mulheres),
@@ -329,62 +382,38 @@ def rota_gerar_rodadas():
     }
     
     # Salva
-    salvar_rodadas(dados_completos)
+    estado.definir_rodadas("mista", dados_completos)
     
     # Inicializa ranking com jogadores confirmados (todos com 0)
-    masculino = sorted([{
-        "nome": nome,
-        "vitorias": 0,
-        "derrotas": 0,
-        "percentual_vitorias": 0,
-        "saldo_games": 0,
-        "games_feitos": 0,
-        "games_sofridos": 0
-    } for nome in homens], key=lambda x: x["nome"])
-    
-    feminino = sorted([{
-        "nome": nome,
-        "vitorias": 0,
-        "derrotas": 0,
-        "percentual_vitorias": 0,
-        "saldo_games": 0,
-        "games_feitos": 0,
-        "games_sofridos": 0
-    } for nome in mulheres], key=lambda x: x["nome"])
+    masculino = sorted([linha_ranking_zerada(nome) for nome in estado.nomes(homens)],
+                       key=lambda x: x["nome"])
+    feminino = sorted([linha_ranking_zerada(nome) for nome in estado.nomes(mulheres)],
+                      key=lambda x: x["nome"])
     
     ranking_inicial = {
+        "categoria": "mista",
         "ultima_atualizacao": datetime.now().isoformat(),
         "masculino": masculino,
         "feminino": feminino
     }
-    salvar_ranking(ranking_inicial)
+    estado.salvar_ranking("mista", ranking_inicial)
     
     return jsonify({"status": "ok", "total_rodadas": resultado["total_rodadas"]})
 
 
 @app.route("/rodadas")
-def rota_ver_rodadas():
-    """Visualiza rodadas geradas de todas as categorias"""
+@app.route("/torneios/<torneio_id>/rodadas")
+def rota_ver_rodadas(torneio_id=None):
+    """Visualiza rodadas geradas de todas as categorias (do torneio atual ou de um arquivado)"""
     categoria_selecionada = request.args.get("categoria", None)
     
-    # Carrega rodadas de todas as categorias
-    # Tenta primeiro o arquivo novo por categoria, depois o antigo para compatibilidade
-    rodadas_mista = carregar_rodadas_por_categoria("mista")
-    if not rodadas_mista:
-        rodadas_mista = carregar_rodadas()  # Arquivo antigo para compatibilidade
-    rodadas_masculino = carregar_rodadas_por_categoria("masculino")
-    rodadas_feminino = carregar_rodadas_por_categoria("feminino")
-    
-    # Prepara dados para o template
-    todas_rodadas = {
-        "mista": rodadas_mista,
-        "masculino": rodadas_masculino,
-        "feminino": rodadas_feminino
-    }
+    # Rodadas de todas as categorias, com nomes para exibição
+    todas_rodadas = estado_do_torneio(torneio_id).todas_rodadas_exibicao()
     
     # Se não há nenhuma categoria com rodadas, mostra mensagem
     if not any(todas_rodadas.values()):
-        return render_template("rodadas.html", todas_rodadas=None, categoria_selecionada=None)
+        return render_template("rodadas.html", todas_rodadas=None, categoria_selecionada=None,
+                               torneio_id=torneio_id)
     
     # Se categoria foi especificada, usa ela; senão, usa a primeira disponível
     if categoria_selecionada and categoria_selecionada in todas_rodadas and todas_rodadas[categoria_selecionada]:
@@ -396,28 +425,16 @@ def rota_ver_rodadas():
     
     return render_template("rodadas.html", 
                          todas_rodadas=todas_rodadas, 
-                         categoria_selecionada=categoria_ativa)
+                         categoria_selecionada=categoria_ativa,
+                         torneio_id=torneio_id)
 
 
 @app.route("/resetar-rodadas")
 def rota_resetar_rodadas():
-    """Remove as rodadas e ranking gerados de todas as categorias"""
-    # Remove arquivos antigos (compatibilidade)
-    if os.path.exists(RODADAS_FILE):
-        os.remove(RODADAS_FILE)
-    if os.path.exists(RANKING_FILE):
-        os.remove(RANKING_FILE)
-    
-    # Remove arquivos de rodadas por categoria
-    categorias = ["mista", "masculino", "feminino"]
-    for categoria in categorias:
-        arquivo_rodadas = f"data/rodadas_{categoria}.json"
-        if os.path.exists(arquivo_rodadas):
-            os.remove(arquivo_rodadas)
-        
-        arquivo_ranking = f"data/ranking_{categoria}.json"
-        if os.path.exists(arquivo_ranking):
-            os.remove(arquivo_ranking)
+    """Arquiva o torneio atual em data/torneios/ e começa um novo (mantém jogadores)"""
+    estado.descarregar()
+    arquivo_torneios.arquivar(armazenamento)
+    estado.limpar_torneio()
     
     return redirect(url_for("presenca"))
 
@@ -431,20 +448,8 @@ def rota_registro_resultados():
     """Página para registrar resultados dos jogos de todas as categorias"""
     categoria_selecionada = request.args.get("categoria", None)
     
-    # Carrega rodadas de todas as categorias
-    # Tenta primeiro o arquivo novo por categoria, depois o antigo para compatibilidade
-    rodadas_mista = carregar_rodadas_por_categoria("mista")
-    if not rodadas_mista:
-        rodadas_mista = carregar_rodadas()  # Arquivo antigo para compatibilidade
-    rodadas_masculino = carregar_rodadas_por_categoria("masculino")
-    rodadas_feminino = carregar_rodadas_por_categoria("feminino")
-    
-    # Prepara dados para o template
-    todas_rodadas = {
-        "mista": rodadas_mista,
-        "masculino": rodadas_masculino,
-        "feminino": rodadas_feminino
-    }
+    # Rodadas de todas as categorias, com nomes para exibição
+    todas_rodadas = estado.todas_rodadas_exibicao()
     
     # Se não há nenhuma categoria com rodadas, redireciona
     if not any([todas_rodadas["mista"], todas_rodadas["masculino"], todas_rodadas["feminino"]]):
@@ -471,11 +476,7 @@ def rota_salvar_resultado():
     if categoria not in ["mista", "masculino", "feminino"]:
         categoria = "mista"
     
-    # Carrega rodadas da categoria específica (prioriza arquivos por categoria)
-    if categoria == "mista":
-        dados_rodadas = carregar_rodadas_por_categoria("mista") or carregar_rodadas()
-    else:
-        dados_rodadas = carregar_rodadas_por_categoria(categoria)
+    dados_rodadas = estado.rodadas(categoria)
     
     if not dados_rodadas:
         return jsonify({"erro": "Rodadas não encontradas"}), 404
@@ -494,45 +495,22 @@ def rota_salvar_resultado():
     if games_d1 < 6 and games_d2 < 6:
         return jsonify({"erro": "Placar inválido. Mínimo de 6 games para vencer"}), 400
     
-    # Atualiza o confronto
+    # Valida o confronto
     rodada = dados_rodadas["rodadas"][rodada_num - 1]
     confronto = rodada["confrontos"][confronto_idx]
     
-    # Inicializa resultado se não existir
-    if "resultado" not in confronto:
-        confronto["resultado"] = {}
-    
-    confronto["resultado"]["games_dupla1"] = games_d1
-    confronto["resultado"]["games_dupla2"] = games_d2
-    confronto["resultado"]["finalizado"] = True
-    
-    # Salva rodadas atualizadas (sempre por categoria)
-    if categoria == "mista":
-        salvar_rodadas_por_categoria("mista", dados_rodadas)
-    else:
-        salvar_rodadas_por_categoria(categoria, dados_rodadas)
-    
-    # Recalcula o ranking
-    ranking = calcular_ranking_individual(dados_rodadas["rodadas"])
+    # Placar aplicado em memória e anexado ao diário de resultados em segundo plano;
+    # o ranking é derivado das rodadas na leitura
+    estado.registrar_resultado(categoria, rodada_num - 1, confronto_idx, games_d1, games_d2)
     
-    if categoria == "mista":
-        # Para mista, separa por gênero
-        ranking_separado = separar_ranking_por_genero(ranking, carregar_jogadores())
-        dados_ranking = {
-            "categoria": "mista",
-            "ultima_atualizacao": datetime.now().isoformat(),
-            "masculino": ranking_separado["masculino"],
-            "feminino": ranking_separado["feminino"]
-        }
-        salvar_ranking(dados_ranking)
-    else:
-        # Para masculino/feminino, salva ranking direto
-        dados_ranking = {
-            "categoria": categoria,
-            "ultima_atualizacao": datetime.now().isoformat(),
-            "ranking": ranking
-        }
-        salvar_ranking_por_categoria(categoria, dados_ranking)
+    # Avisa quem está com as rodadas ou o ranking abertos (uma publicação por placar)
+    difusor.publicar(categoria, "resultado", {
+        "rodada": rodada_num - 1,
+        "confronto": confronto_idx,
+        "games_dupla1": games_d1,
+        "games_dupla2": games_d2
+    })
+    anunciar_ranking(categoria)
     
     return jsonify({"status": "ok"})
 
@@ -542,31 +520,22 @@ def rota_salvar_resultado():
 # ============================================================================
 
 @app.route("/ranking")
-def rota_ranking_individual():
+@app.route("/torneios/<torneio_id>/ranking")
+def rota_ranking_individual(torneio_id=None):
     """Exibe modal com categorias disponíveis ou ranking direto se categoria especificada"""
     categoria = request.args.get("categoria", None)
     
     # Se categoria foi especificada, redireciona para a rota específica
     if categoria and categoria in ["mista", "masculino", "feminino"]:
-        return redirect(url_for("rota_ranking_por_categoria", categoria=categoria))
+        return redirect(url_for("rota_ranking_por_categoria", categoria=categoria, torneio_id=torneio_id))
     
     # Verifica quais categorias têm rodadas geradas
-    # Prioriza arquivos por categoria; mantém fallback para compatibilidade
-    rodadas_mista = carregar_rodadas_por_categoria("mista") or carregar_rodadas()
-    rodadas_masculino = carregar_rodadas_por_categoria("masculino")
-    rodadas_feminino = carregar_rodadas_por_categoria("feminino")
-    
-    categorias_disponiveis = []
-    if rodadas_mista:
-        categorias_disponiveis.append("mista")
-    if rodadas_masculino:
-        categorias_disponiveis.append("masculino")
-    if rodadas_feminino:
-        categorias_disponiveis.append("feminino")
+    categorias_disponiveis = estado_do_torneio(torneio_id).categorias_com_rodadas()
     
     # Se só tem uma categoria, redireciona direto
     if len(categorias_disponiveis) == 1:
-        return redirect(url_for("rota_ranking_por_categoria", categoria=categorias_disponiveis[0]))
+        return redirect(url_for("rota_ranking_por_categoria", categoria=categorias_disponiveis[0],
+                                torneio_id=torneio_id))
     
     # Se não tem nenhuma, mostra mensagem
     if not categorias_disponiveis:
@@ -574,164 +543,258 @@ def rota_ranking_individual():
                              ranking=None, 
                              categoria=None,
                              categorias_disponiveis=[],
-                             mostrar_modal=True)
+                             mostrar_modal=True,
+                             torneio_id=torneio_id)
     
     # Mostra modal com categorias disponíveis
     return render_template("ranking_individual.html", 
                          ranking=None, 
                          categoria=None,
                          categorias_disponiveis=categorias_disponiveis,
-                         mostrar_modal=True)
+                         mostrar_modal=True,
+                         torneio_id=torneio_id)
+
+
+@app.route("/ranking/todas")
+@app.route("/torneios/<torneio_id>/ranking/todas")
+def rota_ranking_todas(torneio_id=None):
+    """Rankings de todas as categorias e o resumo por jogador numa página só"""
+    publicada = versao_ranking(TODAS, torneio_id)
+    
+    def renderizar():
+        todas = publicada["ranking"]
+        return render_template("ranking_todas_categorias.html", rankings=todas["categorias"],
+                               categorias_com_sorteio=list(todas["categorias"]), resumo=todas["jogadores"],
+                               ultima_atualizacao=todas["ultima_atualizacao"], categoria_selecionada=None,
+                               torneio_id=torneio_id, etag=publicada["etag"])
+    
+    return resposta_versionada(publicada, "html", renderizar, "text/html")
+
+
+@app.route("/api/ranking/todas")
+@app.route("/api/torneios/<torneio_id>/ranking/todas")
+def api_ranking_todas(torneio_id=None):
+    """Rankings de todas as categorias e o resumo por jogador em JSON (mesmo ETag da página)"""
+    publicada = versao_ranking(TODAS, torneio_id)
+    
+    return resposta_versionada(
+        publicada, "json",
+        lambda: json.dumps(dict(publicada["ranking"], versao=publicada["versao"]), ensure_ascii=False),
+        "application/json"
+    )
 
 
 @app.route("/ranking/<categoria>")
-def rota_ranking_por_categoria(categoria):
+@app.route("/torneios/<torneio_id>/ranking/<categoria>")
+def rota_ranking_por_categoria(categoria, torneio_id=None):
     """Exibe o ranking de uma categoria específica"""
     if categoria not in ["mista", "masculino", "feminino"]:
-        return redirect(url_for("rota_ranking_individual"))
+        return redirect(url_for("rota_ranking_individual", torneio_id=torneio_id))
     
-    if categoria == "mista":
-        ranking = carregar_ranking()  # compatibilidade para ranking mista consolidado
-    else:
-        ranking = carregar_ranking_por_categoria(categoria)
+    # Derivado das rodadas (inclui placares ainda não gravados); sem rodadas, o ranking
+    # salvo; sem resultados, os jogadores confirmados. Renderizado uma vez por versão
+    publicada = versao_ranking(categoria, torneio_id)
     
-    # Verifica se o ranking existe e tem dados
-    if categoria == "mista":
-        tem_dados_ranking = ranking and ranking.get("masculino") and len(ranking.get("masculino", [])) > 0
-        dados_rodadas = carregar_rodadas_por_categoria("mista") or carregar_rodadas()
-    else:
-        tem_dados_ranking = ranking and ranking.get("ranking") and len(ranking.get("ranking", [])) > 0
-        dados_rodadas = carregar_rodadas_por_categoria(categoria)
+    return resposta_versionada(
+        publicada, "html",
+        lambda: render_template("ranking_individual.html", ranking=publicada["ranking"],
+                                categoria=categoria, torneio_id=torneio_id, versao=publicada["versao"],
+                                etag=publicada["etag"]),
+        "text/html"
+    )
+
+
+@app.route("/api/ranking/<categoria>")
+@app.route("/api/torneios/<torneio_id>/ranking/<categoria>")
+def api_ranking(categoria, torneio_id=None):
+    """
+    Ranking da categoria em JSON, com a versão (mesmo ETag da página).
+    ?since=<versão>: só o que mudou desde aquela versão ({"alterado": false} se nada),
+    ou o ranking completo se a versão já saiu do histórico deste worker. O cliente
+    manda If-None-Match com o ETag que tem: 304 se está em dia.
+    """
+    if categoria not in ["mista", "masculino", "feminino"]:
+        return jsonify({"erro": "Categoria inválida"}), 404
     
-    if not tem_dados_ranking:
-        # Se não tem ranking ou está vazio, tenta gerar baseado nas rodadas
-        if dados_rodadas:
-            ranking_calc = calcular_ranking_individual(dados_rodadas["rodadas"])
-            
-            if categoria == "mista":
-                ranking_sep = separar_ranking_por_genero(ranking_calc, carregar_jogadores())
-                
-                # Se o cálculo retornou dados, usa ele e salva
-                if ranking_sep["masculino"] or ranking_sep["feminino"]:
-                    ranking = {
-                        "categoria": "mista",
-                        "ultima_atualizacao": datetime.now().isoformat(),
-                        "masculino": ranking_sep["masculino"],
-                        "feminino": ranking_sep["feminino"]
-                    }
-                    salvar_ranking(ranking)
-                else:
-                    # Se não tem resultados ainda, mostra jogadores confirmados
-                    jogadores = carregar_jogadores()
-                    confirmados = [j for j in jogadores if j.get("confirmado")]
-                    
-                    masculino = sorted([{
-                        "nome": j["nome"],
-                        "vitorias": 0,
-                        "derrotas": 0,
-                        "percentual_vitorias": 0,
-                        "saldo_games": 0,
-                        "games_feitos": 0,
-                        "games_sofridos": 0
-                    } for j in confirmados if j["sexo"] == "M"], key=lambda x: x["nome"])
-                    
-                    feminino = sorted([{
-                        "nome": j["nome"],
-                        "vitorias": 0,
-                        "derrotas": 0,
-                        "percentual_vitorias": 0,
-                        "saldo_games": 0,
-                        "games_feitos": 0,
-                        "games_sofridos": 0
-                    } for j in confirmados if j["sexo"] == "F"], key=lambda x: x["nome"])
-                    
-                    ranking = {
-                        "categoria": "mista",
-                        "ultima_atualizacao": datetime.now().isoformat(),
-                        "masculino": masculino,
-                        "feminino": feminino
-                    }
-            else:
-                # Para masculino/feminino
-                if ranking_calc:
-                    ranking = {
-                        "categoria": categoria,
-                        "ultima_atualizacao": datetime.now().isoformat(),
-                        "ranking": ranking_calc
-                    }
-                    salvar_ranking_por_categoria(categoria, ranking)
+    publicada = versao_ranking(categoria, torneio_id)
+    desde = request.args.get("since", type=int)
+    
+    if desde is not None:
+        anterior = publicada["estado"].versao_anterior(categoria, desde)
+        # O ETag confere que a versão do cliente é esta mesma (veio deste worker)
+        if anterior and (not request.if_none_match or request.if_none_match.contains_weak(anterior[2])):
+            return resposta_versionada(publicada, f"desde-{desde}",
+                                       lambda: json.dumps(_diferenca_desde(publicada, anterior), ensure_ascii=False),
+                                       "application/json")
+    
+    return resposta_versionada(
+        publicada, "json",
+        lambda: json.dumps(dict(publicada["ranking"], versao=publicada["versao"]), ensure_ascii=False),
+        "application/json"
+    )
+
+
+def _diferenca_desde(publicada: Dict, anterior) -> Dict:
+    """Corpo da resposta com ?since: linhas que mudaram e posições novas"""
+    if anterior[0] == publicada["versao"]:
+        return {"versao": publicada["versao"], "alterado": False}
+    return {
+        "versao": publicada["versao"],
+        "alterado": True,
+        "categoria": publicada["categoria"],
+        "ultima_atualizacao": publicada["ranking"].get("ultima_atualizacao"),
+        "listas": diferenca_ranking(anterior[1], publicada["ranking"])
+    }
+
+
+@app.route("/events/<categoria>")
+def rota_eventos(categoria):
+    """
+    Eventos ao vivo da categoria do torneio atual (Server-Sent Events):
+      resultado      - placar registrado (rodada, confronto, games de cada dupla)
+      ranking        - nova versão do ranking (buscar /api/ranking/<categoria>?since=)
+      ressincronizar - eventos podem ter sido perdidos: recarregar os dados
+    """
+    if categoria not in ["mista", "masculino", "feminino"]:
+        return jsonify({"erro": "Categoria inválida"}), 404
+    
+    assinatura = difusor.assinar(categoria)
+    if assinatura is None:
+        # Worker no limite de conexões: o cliente continua com a atualização periódica
+        return jsonify({"erro": "Muitas conexões abertas"}), 503, {"Retry-After": "60"}
+    
+    def gerar():
+        try:
+            publicada = versao_ranking(categoria)
+            # Esta conexão já recebe a versão atual: sem registrar o anúncio, a primeira
+            # verificação periódica a mandaria de novo como externa. Se outra versão já foi
+            # anunciada, as conexões antigas ainda precisam desta (o cliente ignora o ETag que já tem)
+            _anunciadas.setdefault(categoria, publicada["etag"])
+            yield "retry: 5000\n" + formatar_evento("ranking", {"versao": publicada["versao"],
+                                                                "etag": publicada["etag"]})
+            while True:
+                mensagem = assinatura.proxima(INTERVALO_VERIFICACAO)
+                if assinatura.perdeu:
+                    while assinatura.proxima(0) is not None:
+                        pass
+                    assinatura.perdeu = False
+                    yield formatar_evento("ressincronizar", {})
+                elif mensagem is not None:
+                    yield mensagem
                 else:
-                    # Se não tem resultados, mostra jogadores confirmados
-                    jogadores = carregar_jogadores()
-                    confirmados = [j for j in jogadores if j.get("confirmado")]
-                    sexo_filtro = "M" if categoria == "masculino" else "F"
-                    
-                    ranking_list = sorted([{
-                        "nome": j["nome"],
-                        "vitorias": 0,
-                        "derrotas": 0,
-                        "percentual_vitorias": 0,
-                        "saldo_games": 0,
-                        "games_feitos": 0,
-                        "games_sofridos": 0
-                    } for j in confirmados if j["sexo"] == sexo_filtro], key=lambda x: x["nome"])
-                    
-                    ranking = {
-                        "categoria": categoria,
-                        "ultima_atualizacao": datetime.now().isoformat(),
-                        "ranking": ranking_list
-                    }
-        else:
-            # Se não tem rodadas ainda, mostra jogadores confirmados
-            jogadores = carregar_jogadores()
-            confirmados = [j for j in jogadores if j.get("confirmado")]
-            
-            if categoria == "mista":
-                masculino = sorted([{
-                    "nome": j["nome"],
-                    "vitorias": 0,
-                    "derrotas": 0,
-                    "percentual_vitorias": 0,
-                    "saldo_games": 0,
-                    "games_feitos": 0,
-                    "games_sofridos": 0
-                } for j in confirmados if j["sexo"] == "M"], key=lambda x: x["nome"])
-                
-                feminino = sorted([{
-                    "nome": j["nome"],
-                    "vitorias": 0,
-                    "derrotas": 0,
-                    "percentual_vitorias": 0,
-                    "saldo_games": 0,
-                    "games_feitos": 0,
-                    "games_sofridos": 0
-                } for j in confirmados if j["sexo"] == "F"], key=lambda x: x["nome"])
-                
-                ranking = {
-                    "categoria": "mista",
-                    "ultima_atualizacao": datetime.now().isoformat(),
-                    "masculino": masculino,
-                    "feminino": feminino
-                }
-            else:
-                sexo_filtro = "M" if categoria == "masculino" else "F"
-                ranking_list = sorted([{
-                    "nome": j["nome"],
-                    "vitorias": 0,
-                    "derrotas": 0,
-                    "percentual_vitorias": 0,
-                    "saldo_games": 0,
-                    "games_feitos": 0,
-                    "games_sofridos": 0
-                } for j in confirmados if j["sexo"] == sexo_filtro], key=lambda x: x["nome"])
-                
-                ranking = {
-                    "categoria": categoria,
-                    "ultima_atualizacao": datetime.now().isoformat(),
-                    "ranking": ranking_list
-                }
-    
-    return render_template("ranking_individual.html", ranking=ranking, categoria=categoria)
+                    # Nada publicado neste worker: confere se o ranking mudou em outro
+                    anunciar_ranking(categoria, externa=True)
+                    yield ": ping\n\n"
+        finally:
+            difusor.cancelar(assinatura)
+    
+    return Response(gerar(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# ============================================================================
+# ROTAS - TORNEIOS ARQUIVADOS
+# ============================================================================
+
+@app.route("/torneios")
+def rota_torneios():
+    """Lista os torneios encerrados (lê só o índice, não as partições)"""
+    return render_template("torneios.html", torneios=arquivo_torneios.listar())
+
+
+@app.route("/api/torneios")
+def api_torneios():
+    """Índice dos torneios encerrados em JSON"""
+    return jsonify(arquivo_torneios.listar())
+
+
+def ranking_temporada(categoria, ano) -> list:
+    """Ranking acumulado dos torneios arquivados, com os nomes atuais dos jogadores"""
+    registro = estado.registro()
+    ranking = arquivo_torneios.ranking_temporada(categoria, ano, registro)
+    return resolver_nomes_ranking([dict(linha) for linha in ranking], registro)
+
+
+def _filtros_temporada():
+    """?categoria= (vazio ou "todas": todas somadas) e ?ano=AAAA; None se a categoria é inválida"""
+    categoria = request.args.get("categoria") or None
+    if categoria == TODAS:
+        categoria = None
+    ano = request.args.get("ano") or None
+    if categoria is not None and categoria not in ["mista", "masculino", "feminino"]:
+        return None
+    return categoria, ano
+
+
+@app.route("/torneios/temporada")
+def rota_ranking_temporada():
+    """Ranking da temporada: soma dos torneios arquivados (do ano escolhido)"""
+    filtros = _filtros_temporada()
+    if filtros is None:
+        return redirect(url_for("rota_ranking_temporada"))
+    categoria, ano = filtros
+    return render_template("ranking_temporada.html", ranking=ranking_temporada(categoria, ano),
+                           categoria=categoria, ano=ano, anos=arquivo_torneios.anos())
+
+
+@app.route("/api/torneios/temporada")
+def api_ranking_temporada():
+    """Ranking da temporada em JSON (?categoria=mista|masculino|feminino, ?ano=AAAA)"""
+    filtros = _filtros_temporada()
+    if filtros is None:
+        return jsonify({"erro": "Categoria inválida"}), 404
+    categoria, ano = filtros
+    return jsonify({"categoria": categoria or TODAS, "ano": ano, "ranking": ranking_temporada(categoria, ano)})
+
+
+# ============================================================================
+# ROTAS - PARCERIAS E CONFRONTOS ENTRE JOGADORES
+# ============================================================================
+
+def _resposta_pares(jogador_id: int, tipo: str, chave: str):
+    """
+    Desempenho do jogador com cada parceiro / contra cada adversário, do índice de
+    pares mantido junto com o ranking. ?categoria= limita a uma categoria,
+    ?com=<id> a um único jogador (O(1)) e ?torneio=<id> usa um torneio arquivado.
+    """
+    estado_t = estado_do_torneio(request.args.get("torneio"))
+    categoria = request.args.get("categoria") or None
+    if categoria is not None and categoria not in ["mista", "masculino", "feminino"]:
+        return jsonify({"erro": "Categoria inválida"}), 404
+    registro = estado_t.registro()
+    if jogador_id not in registro.por_id:
+        return jsonify({"erro": "Jogador não encontrado"}), 404
+    
+    linhas = []
+    pares = estado_t.pares_jogador(tipo, jogador_id, categoria, request.args.get("com", type=int))
+    for outro, (jogos, vitorias, feitos, sofridos) in pares.items():
+        linhas.append({
+            "id": outro,
+            "nome": registro.nome(outro),
+            "jogos": jogos,
+            "vitorias": vitorias,
+            "derrotas": jogos - vitorias,
+            "games_feitos": feitos,
+            "games_sofridos": sofridos,
+            "saldo_games": feitos - sofridos,
+            "percentual_vitorias": round((vitorias / jogos) * 100, 1)
+        })
+    # Quem mais jogou com/contra o jogador primeiro
+    linhas.sort(key=lambda linha: (-linha["jogos"], -linha["vitorias"], -linha["saldo_games"], linha["nome"]))
+    return jsonify({"jogador": {"id": jogador_id, "nome": registro.nome(jogador_id)},
+                    "categoria": categoria or TODAS, chave: linhas})
+
+
+@app.route("/api/jogador/<int:jogador_id>/parcerias")
+def api_parcerias(jogador_id):
+    """Resultados do jogador com cada parceiro de dupla"""
+    return _resposta_pares(jogador_id, "parcerias", "parcerias")
+
+
+@app.route("/api/jogador/<int:jogador_id>/confrontos")
+def api_confrontos(jogador_id):
+    """Resultados do jogador contra cada adversário"""
+    return _resposta_pares(jogador_id, "adversarios", "confrontos")
 
 
 # Rota de redirecionamento para compatibilidade
@@ -748,8 +811,7 @@ def rota_ranking_individual_old():
 @app.route("/gerar-sorteio")
 def gerar_sorteio():
     """Página de geração de sorteio com abas para cada categoria"""
-    jogadores = carregar_jogadores()
-    confirmados = [j for j in jogadores if j.get("confirmado")]
+    confirmados = estado.confirmados()
     
     # Conta participantes por categoria (filtra por sexo)
     masculino = [j["nome"] for j in confirmados if j["sexo"] == "M"]
@@ -781,8 +843,7 @@ def api_analisar_categoria():
     if categoria not in ["mista", "masculino", "feminino"]:
         return jsonify({"erro": "Categoria inválida"}), 400
     
-    jogadores = carregar_jogadores()
-    confirmados = [j for j in jogadores if j.get("confirmado")]
+    confirmados = estado.confirmados()
     
     if categoria == "mista":
         homens = [j["nome"] for j in confirmados if j["sexo"] == "M"]
@@ -828,12 +889,11 @@ def api_gerar_sorteio():
     if categoria not in ["mista", "masculino", "feminino"]:
         return jsonify({"erro": "Categoria inválida"}), 400
     
-    jogadores = carregar_jogadores()
-    confirmados = [j for j in jogadores if j.get("confirmado")]
+    confirmados = estado.confirmados()
     
     if categoria == "mista":
-        homens = [j["nome"] for j in confirmados if j["sexo"] == "M"]
-        mulheres = [j["nome"] for j in confirmados if j["sexo"] == "F"]
+        homens = [j["id"] for j in confirmados if j["sexo"] == "M"]
+        mulheres = [j["id"] for j in confirmados if j["sexo"] == "F"]
         
         resultado = gerar_5_rodadas(homens, mulheres)
         
@@ -850,13 +910,13 @@ def api_gerar_sorteio():
         }
         
         # Salva rodadas
-        salvar_rodadas_por_categoria("mista", dados_completos)
+        estado.definir_rodadas("mista", dados_completos)
         
         return jsonify({"status": "ok", "total_rodadas": resultado["total_rodadas"]})
     
     elif categoria == "masculino":
         # Para masculino, pega todos os jogadores do sexo M
-        masculino = [j["nome"] for j in confirmados if j["sexo"] == "M"]
+        masculino = [j["id"] for j in confirmados if j["sexo"] == "M"]
         
         if len(masculino) == 0:
             return jsonify({"erro": "Nenhum jogador masculino confirmado."}), 400
@@ -881,29 +941,22 @@ def api_gerar_sorteio():
             "rodadas": resultado["rodadas"]
         }
         
-        salvar_rodadas_por_categoria("masculino", dados_completos)
+        estado.definir_rodadas("masculino", dados_completos)
         
         # Inicializa ranking vazio para a categoria
         ranking_inicial = {
             "categoria": "masculino",
             "ultima_atualizacao": datetime.now().isoformat(),
-            "ranking": sorted([{
-                "nome": nome,
-                "vitorias": 0,
-                "derrotas": 0,
-                "percentual_vitorias": 0,
-                "saldo_games": 0,
-                "games_feitos": 0,
-                "games_sofridos": 0
-            } for nome in masculino], key=lambda x: x["nome"])
+            "ranking": sorted([linha_ranking_zerada(nome) for nome in estado.nomes(masculino)],
+                              key=lambda x: x["nome"])
         }
-        salvar_ranking_por_categoria("masculino", ranking_inicial)
+        estado.salvar_ranking("masculino", ranking_inicial)
         
         return jsonify({"status": "ok", "total_rodadas": resultado["total_rodadas"]})
     
     elif categoria == "feminino":
         # Para feminino, pega todas as jogadoras do sexo F
-        feminino = [j["nome"] for j in confirmados if j["sexo"] == "F"]
+        feminino = [j["id"] for j in confirmados if j["sexo"] == "F"]
         
         if len(feminino) == 0:
             return jsonify({"erro": "Nenhuma jogadora feminina confirmada."}), 400
@@ -928,46 +981,63 @@ def api_gerar_sorteio():
             "rodadas": resultado["rodadas"]
         }
         
-        salvar_rodadas_por_categoria("feminino", dados_completos)
+        estado.definir_rodadas("feminino", dados_completos)
         
         # Inicializa ranking vazio para a categoria
         ranking_inicial = {
             "categoria": "feminino",
             "ultima_atualizacao": datetime.now().isoformat(),
-            "ranking": sorted([{
-                "nome": nome,
-                "vitorias": 0,
-                "derrotas": 0,
-                "percentual_vitorias": 0,
-                "saldo_games": 0,
-                "games_feitos": 0,
-                "games_sofridos": 0
-            } for nome in feminino], key=lambda x: x["nome"])
+            "ranking": sorted([linha_ranking_zerada(nome) for nome in estado.nomes(feminino)],
+                              key=lambda x: x["nome"])
         }
-        salvar_ranking_por_categoria("feminino", ranking_inicial)
+        estado.salvar_ranking("feminino", ranking_inicial)
         
         return jsonify({"status": "ok", "total_rodadas": resultado["total_rodadas"]})
 
 
 # ============================================================================
-# FUNÇÕES AUXILIARES - RODADAS POR CATEGORIA
+# ROTAS - EXPORTAÇÃO E IMPORTAÇÃO (NDJSON)
 # ============================================================================
 
-def salvar_rodadas_por_categoria(categoria: str, dados: Dict):
-    """Salva rodadas de uma categoria específica"""
-    arquivo = f"data/rodadas_{categoria}.json"
-    with open(arquivo, "w", encoding="utf-8") as f:
-        json.dump(dados, f, ensure_ascii=False, indent=2)
-
-
-def carregar_rodadas_por_categoria(categoria: str):
-    """Carrega rodadas de uma categoria específica"""
-    arquivo = f"data/rodadas_{categoria}.json"
+@app.route("/api/export")
+def api_export():
+    """Torneio completo em NDJSON, gerado linha a linha (?torneio=<id> para um arquivado)"""
+    torneio_id = request.args.get("torneio")
+    estado_exportado = estado_do_torneio(torneio_id)
+    estado_exportado.descarregar()  # inclui placares ainda não gravados
+    
+    nome = f"torneio-{torneio_id or datetime.now().strftime('%Y-%m-%d')}.ndjson"
+    return Response(
+        stream_with_context(exportar(estado_exportado.armazenamento, torneio_id)),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename={nome}"}
+    )
+
+
+@app.route("/api/import", methods=["POST"])
+def api_import():
+    """
+    Substitui o torneio atual pelo NDJSON enviado no corpo. A senha administrativa vai só
+    no cabeçalho X-Admin-Password (na URL ficaria em logs e no histórico do navegador):
+        curl -H "X-Admin-Password: ..." --data-binary @torneio.ndjson .../api/import
+    """
+    senha = request.headers.get("X-Admin-Password")
+    if senha != ADMIN_PASSWORD:
+        return jsonify({"erro": "Senha incorreta"}), 403
+    
+    # Lê o corpo linha a linha; nada é gravado se alguma linha for inválida
     try:
-        with open(arquivo, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return None
+        dados = ler_exportacao(request.stream)
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    
+    estado.substituir(dados["jogadores"], dados["rodadas"], dados["rankings"])
+    return jsonify({
+        "status": "ok",
+        "jogadores": len(dados["jogadores"]),
+        "rodadas": list(dados["rodadas"]),
+        "rankings": list(dados["rankings"])
+    })
 
 
 # ============================================================================
@@ -994,58 +1064,69 @@ def admin():
 def admin_visitas():
     """Estatísticas de visitas"""
     try:
-        # Carrega visitantes únicos
-        with open(VISITAS_FILE, "r", encoding="utf-8") as f:
-            visitas_unicas = json.load(f)
-        
-        # Carrega logs detalhados
-        try:
-            with open(VISITAS_DETALHADAS_FILE, "r", encoding="utf-8") as f:
-                logs = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            logs = []
-        
-        # Análise de dados
-        from collections import Counter
-        
-        # Navegadores
-        navegadores = Counter(log.get('navegador', 'Desconhecido') for log in logs)
-        
-        # Plataformas
-        plataformas = Counter(log.get('plataforma', 'Desconhecido') for log in logs)
-        
-        # Páginas mais acessadas
-        paginas = Counter(log.get('path', '/') for log in logs)
-        
-        # Referrers (origem do tráfego)
-        referrers = Counter(
-            log.get('referrer', '(acesso direto)') if log.get('referrer') else '(acesso direto)' 
-            for log in logs
-        )
-        
-        # Horários de acesso (por hora)
-        horarios = Counter()
-        for log in logs:
-            timestamp = log.get('timestamp', '')
-            if timestamp and len(timestamp) >= 13:
-                hora = timestamp[11:13]  # Extrai a hora
-                horarios[hora] += 1
+        # Contagens mantidas a cada lote gravado: nada de percorrer o log aqui
+        resumo = visitas.resumo(10)
         
         return render_template(
             "admin_visitas.html",
-            total_unicos=len(visitas_unicas),
-            total_acessos=len(logs),
-            navegadores=dict(navegadores.most_common(10)),
-            plataformas=dict(plataformas.most_common(10)),
-            paginas=dict(paginas.most_common(10)),
-            referrers=dict(referrers.most_common(10)),
-            horarios=dict(sorted(horarios.items())),
-            ultimos_logs=logs[-50:][::-1] if logs else []  # Últimos 50 em ordem reversa
+            total_unicos=visitas.total_unicos(),
+            unicos_por_dia=visitas.unicos_por_dia(),
+            unicos_por_pagina=visitas.unicos_por_pagina(),
+            total_acessos=resumo["total"],
+            navegadores=resumo["navegadores"],
+            plataformas=resumo["plataformas"],
+            paginas=resumo["paginas"],
+            referrers=resumo["referrers"],
+            horarios=resumo["horarios"],
+            ultimos_logs=visitas.ultimas(50),  # Do mais recente para o mais antigo
+            fila=visitas.estatisticas(),
+            filtro=filtro_visitas.estatisticas()
         )
     except Exception as e:
         return f"Erro ao carregar estatísticas: {e}", 500
 
 
+@app.route("/admin/visitas/log")
+def admin_visitas_log():
+    """Log de visitas paginado, do mais recente para o mais antigo (?cursor=...&limite=...)"""
+    try:
+        limite = min(max(int(request.args.get("limite", 50)), 1), 1000)
+        registros, cursor = visitas.pagina_log(request.args.get("cursor"), limite)
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    return jsonify({"visitas": registros, "cursor": cursor})
+
+
+@app.route("/api/visitas/serie")
+def api_visitas_serie():
+    """
+    Acessos por intervalo: ?nivel=minuto|hora|dia&inicio=...&fim=...&pagina=...
+    (inicio/fim no formato AAAA-MM-DD[ HH[:MM]]; padrão: período recente do nível)
+    """
+    nivel = request.args.get("nivel", "minuto")
+    inicio = request.args.get("inicio")
+    fim = request.args.get("fim")
+    try:
+        periodo = visitas.series.periodo(nivel, inicio, fim)
+        pontos = visitas.series.consultar(nivel, inicio, fim, request.args.get("pagina"))
+        paginas = visitas.series.por_pagina(nivel, inicio, fim)
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    return jsonify({
+        "nivel": nivel,
+        "inicio": periodo[0],
+        "fim": periodo[1],
+        "pontos": pontos,
+        "paginas": paginas
+    })
+
+
+@app.route("/admin/cache")
+def admin_cache():
+    """Contadores de acerto/falha do cache de leitura deste worker"""
+    return jsonify(cache_leitura.estatisticas())
+
+
 # ============================================================================
 # INICIALIZAÇÃO
 # ============================================================================
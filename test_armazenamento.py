@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes do armazenamento (cada teste usa um diretório temporário, sem tocar em data/):
+- Diário de resultados relido após uma queda (inclusive no meio de uma escrita) [JSON]
+- Compactação do diário (manual e automática pelo limite) [JSON]
+- Placares gravados continuam lá depois de reabrir o armazenamento [JSON e SQLite]
+- Exportação NDJSON seguida de importação devolve o mesmo torneio [JSON e SQLite]
+- Id de jogador excluído não é dado a um jogador novo [JSON e SQLite]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+
+from utils.armazenamento import BackendJSON, BackendSQLite
+from utils.estado_torneio import EstadoTorneio
+from utils.exportacao import exportar, ler_exportacao
+
+# Cores para output
+class Colors:
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    CYAN = '\033[96m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+def print_header(text):
+    print(f"\n{Colors.BOLD}{Colors.CYAN}{'='*80}{Colors.END}")
+    print(f"{Colors.BOLD}{Colors.CYAN}{text.center(80)}{Colors.END}")
+    print(f"{Colors.BOLD}{Colors.CYAN}{'='*80}{Colors.END}\n")
+
+def print_success(text):
+    print(f"{Colors.GREEN}✓ {text}{Colors.END}")
+
+def print_error(text):
+    print(f"{Colors.RED}✗ {text}{Colors.END}")
+
+
+JOGADORES = [
+    {"id": 1, "nome": "Ana", "sexo": "F", "categorias": ["mista", "feminino"], "confirmado": True},
+    {"id": 2, "nome": "Bia", "sexo": "F", "categorias": ["mista", "feminino"], "confirmado": True},
+    {"id": 3, "nome": "Caio", "sexo": "M", "categorias": ["mista", "masculino"], "confirmado": True},
+    {"id": 4, "nome": "Davi", "sexo": "M", "categorias": ["mista", "masculino"], "confirmado": False},
+]
+
+
+# tipo -> função que cria o backend dentro de um diretório (reabrir = criar de novo)
+BACKENDS = {
+    "json": lambda diretorio: BackendJSON(diretorio, limite_compactacao=1000),
+    "sqlite": lambda diretorio: BackendSQLite(os.path.join(diretorio, "torneio.db")),
+}
+
+
+def rodadas_quatro():
+    """Duas rodadas com um confronto cada entre os jogadores 1 a 4, sem placares"""
+    def confronto(d1, d2):
+        return {"dupla1": {"jogador1": d1[0], "jogador2": d1[1]},
+                "dupla2": {"jogador1": d2[0], "jogador2": d2[1]}}
+    return {
+        "data_sorteio": "2026-01-10T09:00:00",
+        "rodadas": [
+            {"numero": 1, "confrontos": [confronto((1, 3), (2, 4))], "descansando": []},
+            {"numero": 2, "confrontos": [confronto((1, 4), (2, 3))], "descansando": []},
+        ]
+    }
+
+
+def placares(dados):
+    return [(c.get("resultado") or {}).get("games_dupla1") for r in dados["rodadas"] for c in r["confrontos"]]
+
+
+def ler_arquivo(arquivo):
+    with open(arquivo, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def testar_diario_apos_queda():
+    with tempfile.TemporaryDirectory() as diretorio:
+        backend = BackendJSON(diretorio, limite_compactacao=1000)
+        backend.salvar_rodadas("mista", rodadas_quatro())
+        backend.registrar_resultado("mista", 0, 0, 6, 2)
+
+        # Queda no meio da próxima escrita: a linha fica pela metade
+        with open(backend.arquivo_diario("mista"), "a", encoding="utf-8") as f:
+            f.write('{"seq": 2, "categoria": "mis')
+
+        # "Reinício": outro backend sobre o mesmo diretório
+        reiniciado = BackendJSON(diretorio, limite_compactacao=1000)
+        if placares(reiniciado.carregar_rodadas("mista")) != [6, None]:
+            return False, "placar do diário não reaplicado sobre o snapshot"
+        if placares(json.loads(ler_arquivo(backend.arquivo_rodadas("mista")))) != [None, None]:
+            return False, "o snapshot não deveria ter mudado sem compactação"
+
+        # O placar seguinte não pode ser colado na linha incompleta
+        reiniciado.registrar_resultado("mista", 1, 0, 7, 5)
+        dados = BackendJSON(diretorio).carregar_rodadas("mista")
+        if placares(dados) != [6, 7]:
+            return False, f"placar anexado após a queda perdido: {placares(dados)}"
+        if dados["seq_diario"] != 2:
+            return False, f"seq_diario {dados['seq_diario']}, esperado 2"
+        return True, "diário reaplicado após reinício; linha incompleta descartada"
+
+
+def testar_compactacao():
+    with tempfile.TemporaryDirectory() as diretorio:
+        backend = BackendJSON(diretorio, limite_compactacao=1000)
+        compactadas = []
+        backend.ao_compactar = lambda categoria, dados: compactadas.append((categoria, placares(dados)))
+        backend.salvar_rodadas("mista", rodadas_quatro())
+        backend.registrar_resultados("mista", [(0, 0, 6, 2), (1, 0, 3, 6)])
+        backend.registrar_resultado("mista", 0, 0, 6, 4)  # placar editado
+
+        if not backend.compactar("mista"):
+            return False, "compactar não fez nada com eventos no diário"
+        if ler_arquivo(backend.arquivo_diario("mista")):
+            return False, "diário não foi esvaziado"
+        snapshot = json.loads(ler_arquivo(backend.arquivo_rodadas("mista")))
+        if placares(snapshot) != [6, 3] or snapshot["rodadas"][0]["confrontos"][0]["resultado"]["games_dupla2"] != 4:
+            return False, "snapshot compactado sem o último placar de cada confronto"
+        if snapshot["seq_diario"] != 3:
+            return False, f"seq_diario {snapshot['seq_diario']}, esperado 3"
+        if compactadas != [("mista", [6, 3])]:
+            return False, f"ao_compactar chamado com {compactadas}"
+        if backend.compactar("mista"):
+            return False, "segunda compactação sem eventos deveria retornar False"
+
+        # A numeração continua depois do snapshot; compactação automática pelo limite
+        backend.limite_compactacao = 2
+        backend.registrar_resultado("mista", 1, 0, 6, 0)
+        backend.registrar_resultado("mista", 0, 0, 2, 6)
+        fim = time.time() + 5
+        while os.path.getsize(backend.arquivo_diario("mista")) and time.time() < fim:
+            time.sleep(0.01)
+        snapshot = json.loads(ler_arquivo(backend.arquivo_rodadas("mista")))
+        if (snapshot["seq_diario"], placares(snapshot)) != (5, [2, 6]):
+            return False, f"compactação automática: seq {snapshot['seq_diario']}, placares {placares(snapshot)}"
+        return True, "snapshot com os placares do diário, diário vazio, seq preservado"
+
+
+def testar_resultados_apos_reinicio(tipo):
+    with tempfile.TemporaryDirectory() as diretorio:
+        backend = BACKENDS[tipo](diretorio)
+        backend.salvar_rodadas("mista", rodadas_quatro())
+        backend.registrar_resultados("mista", [(0, 0, 6, 2), (1, 0, 3, 6)])
+        backend.registrar_resultado("mista", 1, 0, 7, 6)  # placar editado
+        if backend.registrar_resultado("feminino", 0, 0, 6, 0):
+            return False, "placar aceito em categoria sem rodadas"
+
+        dados = BACKENDS[tipo](diretorio).carregar_rodadas("mista")
+        if placares(dados) != [6, 7] or dados["rodadas"][1]["confrontos"][0]["resultado"]["games_dupla2"] != 6:
+            return False, f"placares após reabrir: {placares(dados)}"
+        if dados["data_sorteio"] != "2026-01-10T09:00:00":
+            return False, "metadados do sorteio perdidos"
+        return True, "placares novos e editados preservados ao reabrir"
+
+
+def exportacao_sem_cabecalho(backend):
+    return [linha for linha in exportar(backend) if '"tipo": "cabecalho"' not in linha]
+
+
+def testar_exportacao_ida_e_volta(tipo_origem, tipo_destino):
+    with tempfile.TemporaryDirectory() as origem, tempfile.TemporaryDirectory() as destino:
+        backend = BACKENDS[tipo_origem](origem)
+        backend.salvar_jogadores(JOGADORES)
+        masculino = rodadas_quatro()
+        masculino["rodadas"][0]["confrontos"][0]["quadra"] = 2
+        masculino["rodadas"][0]["descansando"] = ["Zé"]  # nome fora do cadastro (torneio antigo)
+        backend.salvar_rodadas("mista", rodadas_quatro())
+        backend.salvar_rodadas("masculino", masculino)
+        backend.registrar_resultado("mista", 0, 0, 6, 2)  # JSON: só no diário
+        backend.salvar_ranking("mista", {"categoria": "mista", "masculino": [], "feminino": []})
+
+        linhas = list(exportar(backend, torneio="atual"))
+        dados = ler_exportacao(linha.encode("utf-8") for linha in linhas)
+        importado = BACKENDS[tipo_destino](destino)
+        importado.substituir_torneio(dados["jogadores"], dados["rodadas"], dados["rankings"])
+
+        if importado.carregar_jogadores() != JOGADORES:
+            return False, "jogadores diferentes após importar"
+        for categoria in ("mista", "masculino"):
+            original = dict(backend.carregar_rodadas(categoria))
+            copia = dict(importado.carregar_rodadas(categoria))
+            original.pop("seq_diario", None), copia.pop("seq_diario", None)
+            if copia != original:
+                return False, f"rodadas de {categoria} diferentes após importar"
+        if importado.carregar_rodadas("feminino") is not None:
+            return False, "categoria sem sorteio apareceu na importação"
+        if importado.carregar_ranking("mista") != backend.carregar_ranking("mista"):
+            return False, "ranking salvo diferente após importar"
+        if exportacao_sem_cabecalho(importado) != exportacao_sem_cabecalho(backend):
+            return False, "reexportar o torneio importado gera outro arquivo"
+        return True, f"{len(linhas)} linhas exportadas e importadas sem diferença"
+
+
+def testar_ids_nao_reutilizados(tipo):
+    """Torneios arquivados guardam ids: o id do jogador excluído não pode passar a outro"""
+    def novo(nome):
+        return lambda jogadores: jogadores + [{"nome": nome, "sexo": "M", "categorias": ["mista"],
+                                               "confirmado": False}]
+
+    def ids(estado):
+        return {j["nome"]: j["id"] for j in estado.jogadores()}
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        estado = EstadoTorneio(BACKENDS[tipo](diretorio), intervalo_ms=0)
+        for nome in ("Ana", "Bia", "Caio"):
+            estado.atualizar_jogadores(novo(nome))
+        if ids(estado) != {"Ana": 1, "Bia": 2, "Caio": 3}:
+            return False, f"ids iniciais {ids(estado)}"
+
+        estado.atualizar_jogadores(lambda jogadores: [j for j in jogadores if j["nome"] != "Caio"])
+        estado.atualizar_jogadores(novo("Davi"))
+        if ids(estado).get("Davi") != 4:
+            return False, f"Davi recebeu o id {ids(estado).get('Davi')} (Caio era o 3)"
+
+        # Depois de reabrir o armazenamento, e excluindo de novo o maior id
+        estado = EstadoTorneio(BACKENDS[tipo](diretorio), intervalo_ms=0)
+        estado.atualizar_jogadores(lambda jogadores: [j for j in jogadores if j["nome"] != "Davi"])
+        estado.atualizar_jogadores(novo("Eva"))
+        if ids(estado) != {"Ana": 1, "Bia": 2, "Eva": 5}:
+            return False, f"ids após reabrir {ids(estado)}"
+        return True, "jogadores novos recebem ids nunca usados"
+
+
+TESTES = [
+    ("Diário de resultados após uma queda", testar_diario_apos_queda),
+    ("Compactação do diário", testar_compactacao),
+    ("Placares após reabrir (JSON)", partial(testar_resultados_apos_reinicio, "json")),
+    ("Placares após reabrir (SQLite)", partial(testar_resultados_apos_reinicio, "sqlite")),
+    ("Exportação e importação (JSON)", partial(testar_exportacao_ida_e_volta, "json", "json")),
+    ("Exportação e importação (SQLite)", partial(testar_exportacao_ida_e_volta, "sqlite", "sqlite")),
+    ("Exportação do JSON importada no SQLite", partial(testar_exportacao_ida_e_volta, "json", "sqlite")),
+    ("Ids de jogadores excluídos (JSON)", partial(testar_ids_nao_reutilizados, "json")),
+    ("Ids de jogadores excluídos (SQLite)", partial(testar_ids_nao_reutilizados, "sqlite")),
+]
+
+
+def main():
+    print_header("TESTES DO ARMAZENAMENTO")
+    falhas = 0
+    for nome, teste in TESTES:
+        try:
+            sucesso, msg = teste()
+        except Exception as e:  # erro inesperado conta como falha
+            sucesso, msg = False, f"{type(e).__name__}: {e}"
+        if sucesso:
+            print_success(f"{nome}: {msg}")
+        else:
+            print_error(f"{nome}: {msg}")
+            falhas += 1
+    print(f"\n{Colors.BOLD}{len(TESTES) - falhas}/{len(TESTES)} testes OK{Colors.END}\n")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,16 +14,23 @@ import json
 from collections import defaultdict
 from pathlib import Path
 
-from app import (
-    calcular_ranking_individual,
-    separar_ranking_por_genero,
-    carregar_jogadores,
-)
+from app import carregar_jogadores
+from utils.jogadores import RegistroJogadores, resolver_nomes_ranking
+from utils.sorteio_rodadas import calcular_ranking_individual, chave_jogador, separar_ranking_por_genero
 
 
 BASE = Path("data")
 
 
+def registro() -> RegistroJogadores:
+    """As rodadas guardam ids: nomes de exibição vêm do cadastro, como no app"""
+    return RegistroJogadores(carregar_jogadores())
+
+
+def ranking_com_nomes(rodadas: list) -> list:
+    return resolver_nomes_ranking(calcular_ranking_individual(rodadas), registro())
+
+
 def validar_rodadas(path: Path, categoria_label: str):
     """Valida rodadas: jogos por jogador e duplas repetidas."""
     print("=" * 80)
@@ -52,7 +59,7 @@ def validar_rodadas(path: Path, categoria_label: str):
             d2 = c.get("dupla2")
 
             if d1:
-                t1 = tuple(sorted([d1["jogador1"], d1["jogador2"]]))
+                t1 = tuple(sorted([d1["jogador1"], d1["jogador2"]], key=chave_jogador))
                 if t1 in duplas:
                     duplas_repetidas.append((num, t1))
                 duplas.add(t1)
@@ -60,7 +67,7 @@ def validar_rodadas(path: Path, categoria_label: str):
                 jogos_por_jogador[d1["jogador2"]] += 1
 
             if d2:
-                t2 = tuple(sorted([d2["jogador1"], d2["jogador2"]]))
+                t2 = tuple(sorted([d2["jogador1"], d2["jogador2"]], key=chave_jogador))
                 if t2 in duplas:
                     duplas_repetidas.append((num, t2))
                 duplas.add(t2)
@@ -74,17 +81,18 @@ def validar_rodadas(path: Path, categoria_label: str):
     jogos_esperados = dados.get("jogos_por_pessoa")
     problemas_jogos = []
 
+    nomes = registro()
     print("\nJogos por jogador:")
-    for j, n in sorted(jogos_por_jogador.items()):
+    for j, n in sorted(jogos_por_jogador.items(), key=lambda item: chave_jogador(item[0])):
         ok = (jogos_esperados is None) or (n == jogos_esperados)
-        print(f"  {'✓' if ok else '✗'} {j}: {n} jogos")
+        print(f"  {'✓' if ok else '✗'} {nomes.nome(j)}: {n} jogos")
         if not ok:
             problemas_jogos.append((j, n))
 
     print("\nDuplas repetidas:")
     if duplas_repetidas:
         for num, dupla in duplas_repetidas:
-            print(f"  Rodada {num}: {dupla[0]} + {dupla[1]}")
+            print(f"  Rodada {num}: {nomes.nome(dupla[0])} + {nomes.nome(dupla[1])}")
     else:
         print("  Nenhuma")
 
@@ -137,7 +145,7 @@ def testar_ranking_masculino(dados_masc: dict):
     print("RANKING - MASCULINO (simulação)")
     print("=" * 80)
     dados_sim = simular_resultados(dados_masc)
-    ranking = calcular_ranking_individual(dados_sim["rodadas"])
+    ranking = ranking_com_nomes(dados_sim["rodadas"])
 
     print("\nTop 5 jogadores:")
     for pos, j in enumerate(ranking[:5], start=1):
@@ -153,7 +161,7 @@ def testar_ranking_feminino(dados_fem: dict):
     print("RANKING - FEMININO (simulação)")
     print("=" * 80)
     dados_sim = simular_resultados(dados_fem)
-    ranking = calcular_ranking_individual(dados_sim["rodadas"])
+    ranking = ranking_com_nomes(dados_sim["rodadas"])
 
     print("\nTop 5 jogadoras:")
     for pos, j in enumerate(ranking[:5], start=1):
@@ -169,7 +177,7 @@ def testar_ranking_mista(dados_mista: dict):
     print("RANKING - MISTA (simulação)")
     print("=" * 80)
     dados_sim = simular_resultados(dados_mista)
-    ranking_ind = calcular_ranking_individual(dados_sim["rodadas"])
+    ranking_ind = ranking_com_nomes(dados_sim["rodadas"])
 
     jogadores = carregar_jogadores()
     ranking_sep = separar_ranking_por_genero(ranking_ind, jogadores)
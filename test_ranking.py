@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes do cálculo de ranking (sem servidor e sem tocar em data/):
+- Desempate com ids e nomes misturados nas rodadas (cálculo completo, incremental e numpy)
+- Ranking incremental igual ao cálculo completo após cada placar (novo, editado, removido)
+- Diferenças entre versões do ranking (?since) aplicadas como no cliente
+- Mesmo ETag do ranking em todos os workers antes do primeiro resultado
+- Ranking da temporada somando agregados gravados com nomes e com ids
+"""
+
+import random
+import sys
+import tempfile
+import time
+
+from utils.armazenamento import BackendJSON
+from utils.estado_torneio import EstadoTorneio
+from utils.ranking_incremental import LISTAS_RANKING, MotorRanking, diferenca_ranking
+from utils.jogadores import RegistroJogadores, resolver_nomes_ranking
+from utils.ranking_vetorizado import calcular_ranking_vetorizado, disponivel
+from utils.torneios import agregar_rodadas, somar_agregados
+from utils.sorteio_rodadas import calcular_ranking_individual
+
+# Cores para output
+class Colors:
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    CYAN = '\033[96m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+def print_header(text):
+    print(f"\n{Colors.BOLD}{Colors.CYAN}{'='*80}{Colors.END}")
+    print(f"{Colors.BOLD}{Colors.CYAN}{text.center(80)}{Colors.END}")
+    print(f"{Colors.BOLD}{Colors.CYAN}{'='*80}{Colors.END}\n")
+
+def print_success(text):
+    print(f"{Colors.GREEN}✓ {text}{Colors.END}")
+
+def print_error(text):
+    print(f"{Colors.RED}✗ {text}{Colors.END}")
+
+
+def confronto(d1, d2, g1=None, g2=None):
+    c = {"dupla1": {"jogador1": d1[0], "jogador2": d1[1]},
+         "dupla2": {"jogador1": d2[0], "jogador2": d2[1]}}
+    if g1 is not None:
+        c["resultado"] = {"games_dupla1": g1, "games_dupla2": g2, "finalizado": True}
+    return c
+
+
+def rodadas_mistas():
+    """
+    Ids (cadastro) e nomes (fora do cadastro) nas mesmas rodadas, com empate total
+    entre os dois jogadores de cada dupla (1 e "Ana", 2 e "Bia") e entre 3 e "Caio"
+    """
+    return [
+        {"numero": 1, "confrontos": [confronto((1, "Ana"), (2, "Bia"), 6, 3)], "descansando": [3, "Caio"]},
+        {"numero": 2, "confrontos": [confronto((3, "Caio"), (2, "Bia"))], "descansando": [1, "Ana"]},
+    ]
+
+
+def testar_desempate_misto():
+    rodadas = rodadas_mistas()
+    ranking = calcular_ranking_individual(rodadas)
+    ordem = [linha["nome"] for linha in ranking]
+    # Empates totais: id antes do nome (1 e "Ana", 3 e "Caio", 2 e "Bia")
+    esperado = [1, "Ana", 3, "Caio", 2, "Bia"]
+    if ordem != esperado:
+        return False, f"ordem {ordem}, esperado {esperado}"
+
+    motor = MotorRanking({"rodadas": rodadas})
+    registro = type("Registro", (), {"nome": staticmethod(lambda jogador: jogador)})()
+    if [linha["nome"] for linha in motor.linhas(registro)] != esperado:
+        return False, "MotorRanking em ordem diferente"
+
+    # Placar novo reposiciona sem comparar id com nome
+    motor.aplicar((1, 0), (6, 0))
+    rodadas[1]["confrontos"][0]["resultado"] = {"games_dupla1": 6, "games_dupla2": 0, "finalizado": True}
+    if [linha["nome"] for linha in motor.linhas(registro)] != [l["nome"] for l in calcular_ranking_individual(rodadas)]:
+        return False, "MotorRanking divergiu após placar novo"
+    return True, "ids e nomes empatados ordenados sem erro (ids primeiro)"
+
+
+def testar_vetorizado_misto():
+    if not disponivel():
+        return True, "numpy não instalado, ignorado"
+    rodadas = rodadas_mistas()
+    if calcular_ranking_vetorizado(rodadas) != calcular_ranking_individual(rodadas):
+        return False, "resultado diferente de calcular_ranking_individual"
+    return True, "mesmo resultado de calcular_ranking_individual"
+
+
+def rodadas_aleatorias(sorteio, jogadores, total_rodadas):
+    """Rodadas sem placares: a cada rodada 8 jogadores em 2 confrontos, os outros descansam"""
+    rodadas = []
+    for numero in range(1, total_rodadas + 1):
+        ordem = sorteio.sample(jogadores, len(jogadores))
+        rodadas.append({"numero": numero,
+                        "confrontos": [confronto(ordem[0:2], ordem[2:4]), confronto(ordem[4:6], ordem[6:8])],
+                        "descansando": ordem[8:]})
+    return rodadas
+
+
+def testar_incremental_igual_completo():
+    sorteio = random.Random(2024)
+    registro = RegistroJogadores([{"id": i, "nome": f"Jogador {i}"} for i in range(1, 9)])
+    rodadas = rodadas_aleatorias(sorteio, list(range(1, 9)) + ["Ana", "Zé"], 12)
+    motor = MotorRanking({"rodadas": rodadas})
+    chaves = [(r, c) for r in range(len(rodadas)) for c in range(2)]
+
+    for passo in range(300):
+        r, c = sorteio.choice(chaves)
+        if sorteio.random() < 0.1:
+            placar = None  # placar apagado
+            rodadas[r]["confrontos"][c].pop("resultado", None)
+        else:
+            placar = sorteio.choice([(6, sorteio.randint(0, 4)), (sorteio.randint(0, 4), 6), (7, 6), (6, 7), (5, 5)])
+            rodadas[r]["confrontos"][c]["resultado"] = {"games_dupla1": placar[0], "games_dupla2": placar[1],
+                                                        "finalizado": True}
+        motor.aplicar((r, c), placar)
+        completo = resolver_nomes_ranking(calcular_ranking_individual(rodadas), registro)
+        if motor.linhas(registro) != completo:
+            return False, f"diferença no passo {passo} (confronto {r},{c} -> {placar})"
+
+    # Motor montado do zero sobre o estado final: mesmo resultado
+    if MotorRanking({"rodadas": rodadas}).linhas(registro) != motor.linhas(registro):
+        return False, "motor novo difere do motor atualizado placar a placar"
+    return True, "300 placares aplicados, igual a calcular_ranking_individual em todos"
+
+
+def aplicar_diferenca(ranking, listas):
+    """Como aplicarDiferenca (ranking_individual.html): None se o cliente teria de recarregar"""
+    novo = dict(ranking)
+    for lista, diferenca in listas.items():
+        linhas = ranking.get(lista) or []
+        if diferenca["total"] != len(linhas):
+            return None
+        por_jogador = {linha.get("id", linha["nome"]): [posicao + 1, linha] for posicao, linha in enumerate(linhas)}
+        for linha in diferenca["linhas"]:
+            atual = por_jogador.get(linha.get("id", linha["nome"]))
+            if atual is None:
+                return None
+            atual[:] = [linha["posicao"], {k: v for k, v in linha.items() if k != "posicao"}]
+        novo[lista] = [linha for _, linha in sorted(por_jogador.values(), key=lambda item: item[0])]
+    return novo
+
+
+def testar_diferencas_desde_versao():
+    jogadores = [{"id": i, "nome": nome, "sexo": sexo, "categorias": ["mista"], "confirmado": True}
+                 for i, (nome, sexo) in enumerate([("Ana", "F"), ("Bia", "F"), ("Caio", "M"), ("Davi", "M"),
+                                                   ("Eva", "F"), ("Fábio", "M"), ("Gil", "M"), ("Hana", "F"),
+                                                   ("Iara", "F"), ("João", "M")], start=1)]
+    sorteio = random.Random(7)
+    with tempfile.TemporaryDirectory() as diretorio:
+        estado = EstadoTorneio(BackendJSON(diretorio), intervalo_ms=0)
+        estado.armazenamento.salvar_jogadores(jogadores)
+        estado.definir_rodadas("mista", {"rodadas": rodadas_aleatorias(sorteio, list(range(1, 11)), 6)})
+
+        versoes = [estado.versao_ranking("mista")]
+        if estado.versao_ranking("mista")[0] != versoes[0][0]:
+            return False, "versão mudou sem mudança no ranking"
+        for passo in range(20):
+            r, c = sorteio.randrange(6), sorteio.randrange(2)
+            estado.registrar_resultado("mista", r, c, 6, sorteio.randint(0, 5))
+            versao = estado.versao_ranking("mista")
+            if versao[0] != versoes[-1][0] + 1:
+                return False, f"versão {versao[0]} após a versão {versoes[-1][0]}"
+            versoes.append(versao)
+
+            # Cliente em qualquer versão ainda no histórico chega à versão atual só com a diferença
+            for anterior in (versoes[-2], versoes[0]):
+                if estado.versao_anterior("mista", anterior[0]) is not anterior:
+                    return False, f"versão {anterior[0]} fora do histórico"
+                listas = diferenca_ranking(anterior[1], versao[1])
+                aplicado = aplicar_diferenca(anterior[1], listas)
+                if aplicado is None or any(aplicado.get(l) != versao[1].get(l) for l in LISTAS_RANKING):
+                    return False, f"diferença {anterior[0]} -> {versao[0]} não reproduz o ranking"
+                for lista, diferenca in listas.items():
+                    antigas = anterior[1].get(lista) or []
+                    for linha in diferenca["linhas"]:
+                        sem_posicao = {k: v for k, v in linha.items() if k != "posicao"}
+                        if antigas[linha["posicao"] - 1:linha["posicao"]] == [sem_posicao]:
+                            return False, f"diferença com linha que não mudou: {linha['nome']}"
+    return True, f"{len(versoes) - 1} versões; diferenças aplicadas reproduzem o ranking atual"
+
+
+def testar_etag_sem_resultados():
+    """Dois EstadoTorneio sobre os mesmos dados (dois workers), antes de qualquer placar"""
+    jogadores = [{"id": i, "nome": f"Jogador {i}", "sexo": "M", "categorias": ["masculino"], "confirmado": True}
+                 for i in range(1, 11)]
+    with tempfile.TemporaryDirectory() as diretorio:
+        BackendJSON(diretorio).salvar_jogadores(jogadores)
+        for situacao in ("só confirmados", "sorteio sem placares"):
+            assinaturas = set()
+            for _ in range(2):
+                estado = EstadoTorneio(BackendJSON(diretorio), intervalo_ms=0)
+                assinaturas.add(estado.versao_ranking("masculino")[2])
+                time.sleep(0.01)
+            if len(assinaturas) != 1:
+                return False, f"{situacao}: {len(assinaturas)} ETags diferentes"
+            if situacao == "só confirmados":
+                estado.definir_rodadas("masculino", {"data_sorteio": "2026-01-10T09:00:00",
+                                                     "rodadas": rodadas_aleatorias(random.Random(1), list(range(1, 11)), 3)})
+        ranking = estado.ranking("masculino")
+        if ranking["ultima_atualizacao"] != "2026-01-10T09:00:00":
+            return False, f"ultima_atualizacao {ranking['ultima_atualizacao']} sem placares"
+        if estado.montar_ranking("masculino", estado.rodadas("masculino")) != ranking:
+            return False, "montar_ranking difere do ranking incremental sem placares"
+    return True, "ETag igual entre workers; data do sorteio como última atualização"
+
+
+def testar_temporada_mista():
+    """Torneio antigo gravado com nomes + torneio novo com ids: um jogador, uma linha"""
+    registro = RegistroJogadores([{"id": 1, "nome": "Ana"}, {"id": 2, "nome": "Bia"},
+                                  {"id": 3, "nome": "Caio"}, {"id": 4, "nome": "Duda"}])
+    antigo = {"categorias": {"mista": agregar_rodadas({"rodadas": [
+        {"numero": 1, "confrontos": [confronto(("Ana", "Bia"), ("Caio", "Zé"), 6, 2)], "descansando": []}]})}}
+    novo = {"categorias": {"mista": agregar_rodadas({"rodadas": [
+        {"numero": 1, "confrontos": [confronto((1, 3), (2, 4), 6, 4)], "descansando": []}]})}}
+
+    ranking = somar_agregados([antigo, novo], "mista", registro)
+    por_jogador = {linha["nome"]: linha for linha in ranking}
+    if sorted(por_jogador, key=str) != sorted([1, 2, 3, 4, "Zé"], key=str):
+        return False, f"jogadores {list(por_jogador)}"
+    ana = por_jogador[1]
+    if (ana["vitorias"], ana["jogos_realizados"], ana["torneios"], ana["saldo_games"]) != (2, 2, 2, 6):
+        return False, f"Ana somada errado: {ana}"
+    if por_jogador["Zé"]["torneios"] != 1:
+        return False, "nome fora do cadastro deveria continuar separado"
+    # Sem registro, nomes e ids ficam separados mas a ordenação não quebra
+    somar_agregados([antigo, novo], "mista")
+    return True, "nomes de torneios antigos somados ao id do jogador"
+
+
+TESTES = [
+    ("Desempate com ids e nomes misturados", testar_desempate_misto),
+    ("Ranking vetorizado (numpy) com ids e nomes", testar_vetorizado_misto),
+    ("Ranking incremental igual ao cálculo completo", testar_incremental_igual_completo),
+    ("Diferenças desde uma versão do ranking (?since)", testar_diferencas_desde_versao),
+    ("ETag do ranking antes do primeiro resultado", testar_etag_sem_resultados),
+    ("Ranking da temporada com torneios por nome e por id", testar_temporada_mista),
+]
+
+
+def main():
+    print_header("TESTES DO RANKING")
+    falhas = 0
+    for nome, teste in TESTES:
+        try:
+            sucesso, msg = teste()
+        except Exception as e:  # erro inesperado conta como falha
+            sucesso, msg = False, f"{type(e).__name__}: {e}"
+        if sucesso:
+            print_success(f"{nome}: {msg}")
+        else:
+            print_error(f"{nome}: {msg}")
+            falhas += 1
+    print(f"\n{Colors.BOLD}{len(TESTES) - falhas}/{len(TESTES)} testes OK{Colors.END}\n")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
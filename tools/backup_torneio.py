@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backup do torneio atual em NDJSON (mesmo formato de /api/export e /api/import)
+
+Uso:
+    python tools/backup_torneio.py exportar torneio.ndjson
+    python tools/backup_torneio.py importar torneio.ndjson
+
+Usa o backend configurado (BT_STORAGE). A importação substitui jogadores,
+rodadas e rankings atuais; rode com o app parado.
+"""
+
+import sys
+import os
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.armazenamento import criar_backend
+from utils.exportacao import exportar, ler_exportacao
+from utils.migracoes import migrar
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3 or sys.argv[1] not in ("exportar", "importar"):
+        print(__doc__)
+        sys.exit(1)
+
+    acao, arquivo = sys.argv[1], sys.argv[2]
+    backend = criar_backend()
+    migrar(backend)
+
+    if acao == "exportar":
+        with open(arquivo, "w", encoding="utf-8") as f:
+            linhas = 0
+            for linha in exportar(backend):
+                f.write(linha)
+                linhas += 1
+        print(f"✓ {linhas} registros exportados para {arquivo}")
+    else:
+        with open(arquivo, "r", encoding="utf-8") as f:
+            dados = ler_exportacao(f)
+        backend.substituir_torneio(dados["jogadores"], dados["rodadas"], dados["rankings"])
+        print(f"✓ {len(dados['jogadores'])} jogadores importados de {arquivo}")
+        print(f"  - Rodadas: {', '.join(dados['rodadas']) or 'nenhuma'}")
+        print(f"  - Rankings: {', '.join(dados['rankings']) or 'nenhum'}")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de leitura/gravação dos formatos de data/ em dados com o formato de
+data/rodadas_mista.json, ampliados 1x, 10x e 100x (mais rodadas e jogadores).
+
+Uso:
+    python tools/benchmark_formato.py [repeticoes]
+"""
+
+import sys
+import os
+import json
+import tempfile
+import time
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.arquivos import escrever_json_atomico, ler_json
+from utils.formato import FORMATOS, validar_formato
+
+BASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "rodadas_mista.json")
+
+
+def ampliar(dados, fator):
+    """Replica as rodadas `fator` vezes, com nomes de jogadores distintos em cada cópia"""
+    def renomear(nome, copia):
+        return nome if copia == 0 else f"{nome} {copia}"
+
+    rodadas = []
+    for copia in range(fator):
+        for rodada in dados["rodadas"]:
+            confrontos = []
+            for c in rodada["confrontos"]:
+                novo = json.loads(json.dumps(c))
+                for dupla in ("dupla1", "dupla2"):
+                    if novo.get(dupla):
+                        for chave in ("jogador1", "jogador2"):
+                            novo[dupla][chave] = renomear(novo[dupla][chave], copia)
+                confrontos.append(novo)
+            rodadas.append({
+                "numero": len(rodadas) + 1,
+                "confrontos": confrontos,
+                "descansando": [renomear(n, copia) for n in rodada.get("descansando", [])]
+            })
+    return dict(dados, rodadas=rodadas, total_rodadas=len(rodadas))
+
+
+def cronometrar(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+if __name__ == '__main__':
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    with open(BASE, "r", encoding="utf-8") as f:
+        base = json.load(f)
+
+    formatos = []
+    for formato in FORMATOS:
+        try:
+            formatos.append(validar_formato(formato))
+        except ValueError as e:
+            print(f"(ignorando {formato}: {e})")
+
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo = os.path.join(pasta, "rodadas.json")
+        for fator in (1, 10, 100):
+            dados = ampliar(base, fator)
+            print(f"\n=== {fator}x ({len(dados['rodadas'])} rodadas) ===")
+            print(f"{'formato':<16}{'bytes':>10}{'salvar (ms)':>14}{'carregar (ms)':>16}")
+            for formato in formatos:
+                n = max(1, repeticoes // fator)
+                salvar = cronometrar(lambda: escrever_json_atomico(arquivo, dados, formato), n)
+                tamanho = os.path.getsize(arquivo)
+                carregar = cronometrar(lambda: ler_json(arquivo), n)
+                assert ler_json(arquivo) == dados
+                print(f"{formato:<16}{tamanho:>10}{salvar:>14.2f}{carregar:>16.2f}")
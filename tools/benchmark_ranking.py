@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do ranking individual: calcular_ranking_individual (Python puro) contra
+calcular_ranking_vetorizado (numpy), em temporadas sorteadas com cada vez mais
+confrontos. Confere que os dois dão o mesmo resultado e mostra o ponto de virada
+(use-o em BT_RANKING_VETORIZADO_MINIMO).
+
+Uso:
+    python tools/benchmark_ranking.py [repeticoes]
+"""
+
+import sys
+import os
+import random
+import time
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sorteio_rodadas import calcular_ranking_individual
+from utils.ranking_vetorizado import calcular_ranking_vetorizado, disponivel
+
+TAMANHOS = (6, 25, 50, 100, 200, 500, 1000, 5000, 20000)  # confrontos
+
+
+def temporada(confrontos, sorteio):
+    """Rodadas de 6 confrontos entre ~4 jogadores por confronto da rodada (ids inteiros)"""
+    jogadores = list(range(1, max(24, confrontos // 10) + 1))
+    rodadas = []
+    while confrontos > 0:
+        nesta = min(6, confrontos)
+        confrontos -= nesta
+        escalados = sorteio.sample(jogadores, 4 * nesta)
+        lista = []
+        for c in range(nesta):
+            a, b, x, y = escalados[4 * c:4 * c + 4]
+            confronto = {"dupla1": {"jogador1": a, "jogador2": b},
+                         "dupla2": {"jogador1": x, "jogador2": y}}
+            if sorteio.random() < 0.9:
+                vencedor = sorteio.randint(0, 1)
+                perdedor = sorteio.randint(0, 5)
+                confronto["resultado"] = {"games_dupla1": 6 if vencedor == 0 else perdedor,
+                                          "games_dupla2": perdedor if vencedor == 0 else 6,
+                                          "finalizado": True}
+            lista.append(confronto)
+        rodadas.append({"numero": len(rodadas) + 1, "confrontos": lista,
+                        "descansando": [j for j in jogadores if j not in escalados][:2]})
+    return rodadas
+
+
+def cronometrar(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+if __name__ == '__main__':
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    if not disponivel():
+        print("numpy não está instalado (pip install numpy)")
+        sys.exit(1)
+
+    sorteio = random.Random(2025)
+    virada = None
+    print(f"{'confrontos':>10}{'python (ms)':>14}{'numpy (ms)':>14}{'razão':>8}")
+    for tamanho in TAMANHOS:
+        rodadas = temporada(tamanho, sorteio)
+        assert calcular_ranking_vetorizado(rodadas) == calcular_ranking_individual(rodadas)
+        n = max(3, repeticoes * 100 // max(tamanho, 100))
+        python = cronometrar(lambda: calcular_ranking_individual(rodadas), n)
+        vetorizado = cronometrar(lambda: calcular_ranking_vetorizado(rodadas), n)
+        # Menor tamanho a partir do qual o numpy ganha em todos os maiores
+        if vetorizado >= python:
+            virada = None
+        elif virada is None:
+            virada = tamanho
+        print(f"{tamanho:>10}{python:>14.3f}{vetorizado:>14.3f}{python / vetorizado:>8.2f}")
+
+    print(f"\nnumpy passa a compensar a partir de ~{virada} confrontos" if virada
+          else "\nnumpy não compensou em nenhum tamanho")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para converter os arquivos de data/ para outro formato de serialização
+
+Uso:
+    python tools/converter_formato.py <formato> [diretorio]
+
+Formatos: json-indentado, json, orjson, msgpack
+Depois da conversão, rode o app com BT_DATA_FORMAT=<formato> para manter o formato.
+"""
+
+import sys
+import os
+import glob
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.arquivos import bloqueio, escrever_json_atomico, ler_json
+from utils.formato import FORMATOS, validar_formato
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(f"Uso: python tools/converter_formato.py <{'|'.join(FORMATOS)}> [diretorio]")
+        sys.exit(1)
+
+    formato = validar_formato(sys.argv[1])
+    diretorio = sys.argv[2] if len(sys.argv) > 2 else "data"
+
+    print(f"Convertendo {diretorio}/*.json para {formato}...")
+    for arquivo in sorted(glob.glob(os.path.join(diretorio, "*.json"))):
+        with bloqueio(arquivo):
+            dados = ler_json(arquivo)
+            if dados is None:
+                print(f"  - {os.path.basename(arquivo)}: vazio, ignorado")
+                continue
+            antes = os.path.getsize(arquivo)
+            escrever_json_atomico(arquivo, dados, formato)
+            depois = os.path.getsize(arquivo)
+        print(f"  ✓ {os.path.basename(arquivo)}: {antes} → {depois} bytes")
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para importar os arquivos JSON de data/ para o banco SQLite
+
+Uso:
+    python tools/importar_sqlite.py [caminho_do_banco]
+
+Depois da importação, rode o app com BT_STORAGE=sqlite.
+"""
+
+import sys
+import os
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.armazenamento import BackendJSON, BackendSQLite, ARQUIVO_SQLITE, importar_dados
+from utils.migracoes import migrar
+
+if __name__ == '__main__':
+    caminho = sys.argv[1] if len(sys.argv) > 1 else os.path.join("data", ARQUIVO_SQLITE)
+    print(f"Importando data/*.json para {caminho}...")
+
+    origem = BackendJSON("data")
+    migrar(origem)
+    resumo = importar_dados(origem, BackendSQLite(caminho))
+
+    print(f"✓ {resumo['jogadores']} jogadores importados")
+    print(f"  - Rodadas: {', '.join(resumo['rodadas']) or 'nenhuma'}")
+    print(f"  - Rankings: {', '.join(resumo['rankings']) or 'nenhum'}")
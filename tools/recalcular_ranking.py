@@ -4,7 +4,6 @@
 Script para recalcular o ranking a partir das rodadas atualizadas
 """
 
-import json
 import sys
 import os
 from datetime import datetime
@@ -12,22 +11,26 @@ from datetime import datetime
 # Adiciona o diretório raiz ao path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.sorteio_rodadas import calcular_ranking_individual, separar_ranking_por_genero
+from utils.sorteio_rodadas import separar_ranking_por_genero
+from utils.ranking_vetorizado import calcular_ranking
+from utils.armazenamento import BackendJSON
+from utils.jogadores import RegistroJogadores, resolver_nomes_ranking
+from utils.migracoes import migrar
+
+armazenamento = BackendJSON("data")
+migrar(armazenamento)
 
 def carregar_jogadores():
     """Carrega jogadores do arquivo JSON"""
-    with open("data/jogadores.json", "r", encoding="utf-8") as f:
-        return json.load(f)
+    return armazenamento.carregar_jogadores()
 
 def carregar_rodadas():
-    """Carrega rodadas do arquivo JSON"""
-    with open("data/rodadas_mista.json", "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Carrega rodadas (snapshot + resultados pendentes no diário)"""
+    return armazenamento.carregar_rodadas("mista")
 
 def salvar_ranking(dados):
     """Salva o ranking no arquivo JSON"""
-    with open("data/ranking.json", "w", encoding="utf-8") as f:
-        json.dump(dados, f, ensure_ascii=False, indent=2)
+    armazenamento.salvar_ranking("mista", dados)
 
 if __name__ == '__main__':
     print("Recalculando ranking...")
@@ -37,7 +40,8 @@ if __name__ == '__main__':
     dados_rodadas = carregar_rodadas()
     
     # Calcula ranking individual
-    ranking_individual = calcular_ranking_individual(dados_rodadas["rodadas"])
+    ranking_individual = resolver_nomes_ranking(calcular_ranking(dados_rodadas["rodadas"]),
+                                                RegistroJogadores(jogadores_data))
     
     # Separa por gênero
     ranking_por_genero = separar_ranking_por_genero(ranking_individual, jogadores_data)
@@ -53,7 +57,7 @@ if __name__ == '__main__':
     # Salva
     salvar_ranking(ranking_final)
     
-    print("✓ Ranking recalculado e salvo em data/ranking.json")
+    print("✓ Ranking recalculado e salvo em data/ranking_mista.json")
     print(f"  - Masculino: {len(ranking_final['masculino'])} jogadores")
     print(f"  - Feminino: {len(ranking_final['feminino'])} jogadoras")
 
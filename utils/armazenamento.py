@@ -0,0 +1,719 @@
+# -*- coding: utf-8 -*-
+"""
+Camada de armazenamento do torneio
+Backends disponíveis:
+- "json": um arquivo por documento em data/ (formato original)
+- "sqlite": banco SQLite em modo WAL, com jogadores, rodadas e confrontos em linhas
+
+O backend é escolhido pela variável de ambiente BT_STORAGE (padrão: json).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.arquivos import bloqueio, escrever_json_atomico
+from utils.cache_leitura import cache_leitura, copiar_json
+from utils.diario_resultados import DiarioResultados, aplicar_evento
+from utils.transacao_sqlite import em_transacao, sem_transacao
+
+CATEGORIAS = ["mista", "masculino", "feminino"]
+
+# Configuração (variáveis de ambiente)
+BACKEND_PADRAO = os.environ.get("BT_STORAGE", "json")
+ARQUIVO_SQLITE = os.environ.get("BT_SQLITE_PATH", "torneio.db")
+# Quantidade de eventos no diário de resultados que dispara a compactação
+LIMITE_COMPACTACAO = int(os.environ.get("BT_DIARIO_LIMITE", "50"))
+
+
+# ============================================================================
+# BACKEND JSON (ARQUIVOS)
+# ============================================================================
+
+class BackendJSON:
+    """
+    Armazena cada documento (jogadores, rodadas, ranking) em um arquivo JSON.
+    Resultados são anexados a um diário por categoria (ver utils/diario_resultados.py)
+    e incorporados ao arquivo de rodadas por uma compactação em segundo plano.
+    """
+
+    tipo = "json"
+
+    def __init__(self, diretorio: str = "data", limite_compactacao: int = LIMITE_COMPACTACAO):
+        self.diretorio = diretorio
+        self.limite_compactacao = limite_compactacao
+        # Chamado após cada compactação com (categoria, rodadas) — o app grava o ranking
+        self.ao_compactar: Optional[Callable[[Optional[str], Dict], None]] = None
+        self._materializados = {}
+        self._compactando = set()
+        self._compactando_guarda = threading.Lock()
+
+    # ---------------------------------------------------------------- caminhos
+
+    def arquivo_jogadores(self) -> str:
+        return os.path.join(self.diretorio, "jogadores.json")
+
+    def arquivo_ids_jogadores(self) -> str:
+        return os.path.join(self.diretorio, "jogadores_ids.json")
+
+    def arquivo_esquema(self) -> str:
+        return os.path.join(self.diretorio, "esquema.json")
+
+    def arquivo_rodadas(self, categoria: Optional[str] = None) -> str:
+        """Sem categoria retorna o arquivo antigo (data/rodadas.json), lido só pela migração"""
+        if categoria is None:
+            return os.path.join(self.diretorio, "rodadas.json")
+        return os.path.join(self.diretorio, f"rodadas_{categoria}.json")
+
+    def arquivo_diario(self, categoria: Optional[str] = None) -> str:
+        if categoria is None:
+            return os.path.join(self.diretorio, "resultados.log")
+        return os.path.join(self.diretorio, f"resultados_{categoria}.log")
+
+    def arquivo_ranking(self, categoria: Optional[str] = None) -> str:
+        """Sem categoria retorna o ranking antigo (data/ranking.json), lido só pela migração"""
+        if categoria is None:
+            return os.path.join(self.diretorio, "ranking.json")
+        return os.path.join(self.diretorio, f"ranking_{categoria}.json")
+
+    # ----------------------------------------------------------------- leitura
+
+    def _ler(self, arquivo: str, copiar: bool = True):
+        """Leitura pelo cache (copiar=False devolve o snapshot compartilhado, só leitura)"""
+        return cache_leitura.ler(arquivo, copiar=copiar)
+
+    def _escrever(self, arquivo: str, dados):
+        cache_leitura.guardar(arquivo, dados, escrever_json_atomico(arquivo, dados))
+
+    def _atualizar(self, arquivo: str, funcao: Callable):
+        """Ler-modificar-gravar sob o bloqueio do arquivo"""
+        with bloqueio(arquivo):
+            novos = funcao(self._ler(arquivo))
+            if novos is not None:
+                self._escrever(arquivo, novos)
+            return novos
+
+    # ----------------------------------------------------------------- esquema
+
+    def versao_esquema(self) -> int:
+        dados = self._ler(self.arquivo_esquema(), copiar=False)
+        return dados.get("schema_version", 0) if dados else 0
+
+    def definir_versao_esquema(self, versao: int):
+        self._escrever(self.arquivo_esquema(), {"schema_version": versao})
+
+    def bloqueio_migracao(self):
+        return bloqueio(self.arquivo_esquema())
+
+    def remover_legado(self):
+        """Remove os arquivos sem categoria (data/rodadas.json, data/ranking.json)"""
+        diario = DiarioResultados(self.arquivo_diario(None))
+        with bloqueio(diario.arquivo):
+            for arquivo in (self.arquivo_rodadas(None), self.arquivo_ranking(None)):
+                if os.path.exists(arquivo):
+                    os.remove(arquivo)
+            diario.remover()
+
+    # --------------------------------------------------------------- jogadores
+
+    def carregar_jogadores(self, copiar: bool = True) -> List[Dict]:
+        return self._ler(self.arquivo_jogadores(), copiar) or []
+
+    def salvar_jogadores(self, jogadores: List[Dict]):
+        # Sob o bloqueio: não cai no meio de um atualizar_jogadores (que gravaria por cima)
+        with bloqueio(self.arquivo_jogadores()):
+            self._gravar_jogadores(jogadores)
+
+    def atualizar_jogadores(self, funcao: Callable[[List[Dict]], List[Dict]]) -> List[Dict]:
+        """Aplica funcao(jogadores) -> jogadores sem perder gravações concorrentes"""
+        with bloqueio(self.arquivo_jogadores()):
+            jogadores = funcao(self._ler(self.arquivo_jogadores()) or [])
+            if jogadores is not None:
+                self._gravar_jogadores(jogadores)
+            return jogadores
+
+    def _gravar_jogadores(self, jogadores: List[Dict]):
+        """Quem chama segura bloqueio(arquivo_jogadores)"""
+        ids = [j["id"] for j in jogadores if isinstance(j.get("id"), int)]
+        self.reservar_ids_jogador(max(ids, default=0) + 1)
+        self._escrever(self.arquivo_jogadores(), jogadores)
+
+    def proximo_id_jogador(self) -> int:
+        """Primeiro id de jogador nunca usado (só cresce: ids de excluídos não voltam)"""
+        dados = self._ler(self.arquivo_ids_jogadores(), copiar=False)
+        return dados.get("proximo_id", 1) if dados else 1
+
+    def reservar_ids_jogador(self, proximo: int):
+        """Garante que os ids abaixo de proximo não sejam distribuídos de novo"""
+        if proximo > self.proximo_id_jogador():
+            self._atualizar(self.arquivo_ids_jogadores(),
+                            lambda dados: {"proximo_id": max(proximo, (dados or {}).get("proximo_id", 1))})
+
+    # ----------------------------------------------------------------- rodadas
+
+    def carregar_rodadas(self, categoria: Optional[str] = None, copiar: bool = True) -> Optional[Dict]:
+        """Snapshot das rodadas + eventos pendentes do diário"""
+        # O diário é lido ANTES do snapshot: a compactação grava o snapshot antes
+        # de esvaziar o diário, então nenhum evento pode ser perdido entre as leituras
+        eventos = DiarioResultados(self.arquivo_diario(categoria)).eventos()
+        snapshot = self._ler(self.arquivo_rodadas(categoria), copiar=False)
+        if snapshot is None:
+            return None
+
+        seq_snapshot = snapshot.get("seq_diario", 0)
+        if not eventos or eventos[-1]["seq"] <= seq_snapshot:
+            return copiar_json(snapshot) if copiar else snapshot
+
+        # Materializa uma vez por par (snapshot, diário); leituras seguintes reaproveitam
+        memo = self._materializados.get(categoria)
+        if memo is None or memo[0] is not snapshot or memo[1] is not eventos:
+            dados = copiar_json(snapshot)
+            for evento in eventos:
+                if evento["seq"] > seq_snapshot:
+                    aplicar_evento(dados, evento)
+            memo = (snapshot, eventos, dados)
+            self._materializados[categoria] = memo
+        return copiar_json(memo[2]) if copiar else memo[2]
+
+    def salvar_rodadas(self, categoria: Optional[str], dados: Dict):
+        """Grava o documento inteiro (novo sorteio) e descarta o diário da categoria"""
+        diario = DiarioResultados(self.arquivo_diario(categoria))
+        with bloqueio(diario.arquivo):
+            self._escrever(self.arquivo_rodadas(categoria), dict(dados, seq_diario=self._ultimo_seq(categoria)))
+            diario.esvaziar()
+
+    def reescrever_rodadas(self, categoria: Optional[str], funcao: Callable[[Dict], Optional[Dict]]) -> bool:
+        """
+        Aplica funcao(rodadas) -> rodadas sobre o estado atual (snapshot + diário)
+        e grava o resultado como novo snapshot. funcao retorna None se não há nada a mudar.
+        """
+        diario = DiarioResultados(self.arquivo_diario(categoria))
+        with bloqueio(diario.arquivo):
+            dados = self.carregar_rodadas(categoria)
+            if dados is None:
+                return False
+            novos = funcao(dados)
+            if novos is None:
+                return False
+            self._escrever(self.arquivo_rodadas(categoria), dict(novos, seq_diario=self._ultimo_seq(categoria)))
+            diario.esvaziar()
+        return True
+
+    def _ultimo_seq(self, categoria: Optional[str]) -> int:
+        snapshot = self._ler(self.arquivo_rodadas(categoria), copiar=False) or {}
+        return max(DiarioResultados(self.arquivo_diario(categoria)).ultimo_seq(),
+                   snapshot.get("seq_diario", 0))
+
+    def registrar_resultado(self, categoria: Optional[str], rodada_idx: int,
+                            confronto_idx: int, games_d1: int, games_d2: int) -> bool:
+        """Anexa o placar ao diário (O(1) bytes). Retorna False se não há rodadas"""
+        return self.registrar_resultados(categoria, [(rodada_idx, confronto_idx, games_d1, games_d2)])
+
+    def registrar_resultados(self, categoria: Optional[str], resultados: List[Tuple[int, int, int, int]]) -> bool:
+        """Anexa vários placares (rodada_idx, confronto_idx, games_d1, games_d2) com um único fsync"""
+        diario = DiarioResultados(self.arquivo_diario(categoria))
+        with bloqueio(diario.arquivo):
+            snapshot = self._ler(self.arquivo_rodadas(categoria), copiar=False)
+            if snapshot is None:
+                return False
+            if not resultados:
+                return True
+            seq = self._ultimo_seq(categoria) + 1
+            diario.anexar(seq, categoria, resultados)
+            pendentes = seq + len(resultados) - 1 - snapshot.get("seq_diario", 0)
+
+        if pendentes >= self.limite_compactacao:
+            self.agendar_compactacao(categoria)
+        return True
+
+    def agendar_compactacao(self, categoria: Optional[str]):
+        """Compacta o diário da categoria em uma thread de segundo plano"""
+        with self._compactando_guarda:
+            if categoria in self._compactando:
+                return
+            self._compactando.add(categoria)
+
+        def executar():
+            try:
+                self.compactar(categoria)
+            except Exception as e:
+                print(f"Erro ao compactar diário de resultados ({categoria}): {e}")
+            finally:
+                with self._compactando_guarda:
+                    self._compactando.discard(categoria)
+
+        threading.Thread(target=executar, name=f"compactacao-{categoria}", daemon=True).start()
+
+    def compactar(self, categoria: Optional[str]) -> bool:
+        """Incorpora os eventos do diário a um novo snapshot e esvazia o diário"""
+        diario = DiarioResultados(self.arquivo_diario(categoria))
+        with bloqueio(diario.arquivo):
+            dados = self.carregar_rodadas(categoria, copiar=False)
+            if dados is None or not diario.eventos():
+                return False
+            # Snapshot primeiro, diário depois (ver carregar_rodadas)
+            self._escrever(self.arquivo_rodadas(categoria), dados)
+            diario.esvaziar()
+
+        if self.ao_compactar:
+            self.ao_compactar(categoria, dados)
+        return True
+
+    # ----------------------------------------------------------------- ranking
+
+    def carregar_ranking(self, categoria: Optional[str] = None, copiar: bool = True) -> Optional[Dict]:
+        return self._ler(self.arquivo_ranking(categoria), copiar)
+
+    def salvar_ranking(self, categoria: Optional[str], dados: Dict):
+        with bloqueio(self.arquivo_ranking(categoria)):  # idem atualizar_ranking
+            self._escrever(self.arquivo_ranking(categoria), dados)
+
+    def atualizar_ranking(self, categoria: Optional[str], funcao: Callable[[Optional[Dict]], Dict]) -> Dict:
+        """Aplica funcao(ranking_atual) -> ranking sob o bloqueio do arquivo de ranking"""
+        return self._atualizar(self.arquivo_ranking(categoria), funcao)
+
+    # ------------------------------------------------------------------- reset
+
+    def limpar_torneio(self):
+        """Remove rodadas e rankings de todas as categorias (mantém jogadores)"""
+        for categoria in CATEGORIAS:
+            diario = DiarioResultados(self.arquivo_diario(categoria))
+            with bloqueio(diario.arquivo):
+                for arquivo in (self.arquivo_rodadas(categoria), self.arquivo_ranking(categoria)):
+                    if os.path.exists(arquivo):
+                        os.remove(arquivo)
+                diario.remover()
+
+    def substituir_torneio(self, jogadores: List[Dict], rodadas: Dict, rankings: Dict):
+        """
+        Troca o torneio inteiro (importação). Cada arquivo é gravado de forma atômica;
+        no backend JSON não há transação entre arquivos.
+        """
+        self.limpar_torneio()
+        self.salvar_jogadores(jogadores)
+        for categoria, dados in rodadas.items():
+            self.salvar_rodadas(categoria, dados)
+        for categoria, dados in rankings.items():
+            self.salvar_ranking(categoria, dados)
+
+
+# ============================================================================
+# BACKEND SQLITE (WAL)
+# ============================================================================
+
+ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS jogadores (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL UNIQUE,
+    sexo TEXT,
+    categorias TEXT NOT NULL DEFAULT '["mista"]',
+    confirmado INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS sorteios (
+    categoria TEXT PRIMARY KEY,
+    metadados TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS rodadas (
+    categoria TEXT NOT NULL,
+    posicao INTEGER NOT NULL,
+    numero INTEGER,
+    descansando TEXT NOT NULL DEFAULT '[]',
+    PRIMARY KEY (categoria, posicao)
+);
+
+CREATE TABLE IF NOT EXISTS confrontos (
+    categoria TEXT NOT NULL,
+    rodada INTEGER NOT NULL,
+    indice INTEGER NOT NULL,
+    -- Sem tipo declarado: guarda o id (inteiro) ou o nome (rodadas antigas) sem conversão
+    dupla1_jogador1,
+    dupla1_jogador2,
+    dupla2_jogador1,
+    dupla2_jogador2,
+    quadra INTEGER,
+    games_dupla1 INTEGER,
+    games_dupla2 INTEGER,
+    finalizado INTEGER,
+    PRIMARY KEY (categoria, rodada, indice)
+);
+
+CREATE TABLE IF NOT EXISTS rankings (
+    categoria TEXT PRIMARY KEY,
+    dados TEXT NOT NULL
+);
+"""
+
+# Categoria usada no banco para o arquivo antigo data/rodadas.json / data/ranking.json
+# (lida só pela migração)
+CATEGORIA_LEGADO = ""
+
+
+class BackendSQLite:
+    """
+    Armazena o torneio em um banco SQLite em modo WAL.
+    Cada thread (e cada worker do gunicorn) usa sua própria conexão;
+    o WAL permite leitores concorrentes enquanto um worker grava.
+    Leituras com copiar=False reaproveitam o último objeto montado enquanto o banco
+    não muda (PRAGMA data_version + contador de gravações deste processo).
+    """
+
+    tipo = "sqlite"
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.ao_compactar = None  # Sem diário: cada resultado já é um UPDATE
+        self._local = threading.local()
+        self._gravacoes = 0
+        self._criar_esquema()
+
+    def _conexao(self) -> sqlite3.Connection:
+        # Conexões não podem atravessar um fork: recria se o PID mudou
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None or self._local.pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=10, isolation_level=None)
+            conexao.row_factory = sqlite3.Row
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            conexao.execute("PRAGMA busy_timeout=10000")
+            self._local.conexao = conexao
+            self._local.pid = os.getpid()
+            self._local.cache = {}
+        return conexao
+
+    def _cacheado(self, chave, carregar: Callable, copiar: bool):
+        """
+        Leitura cacheada por thread. data_version muda quando OUTRA conexão grava;
+        as gravações desta instância incrementam _gravacoes.
+        """
+        conexao = self._conexao()
+        versao = (conexao.execute("PRAGMA data_version").fetchone()[0], self._gravacoes)
+        entrada = self._local.cache.get(chave)
+        if entrada is None or entrada[0] != versao:
+            entrada = (versao, carregar())
+            self._local.cache[chave] = entrada
+        return copiar_json(entrada[1]) if copiar else entrada[1]
+
+    def _gravou(self):
+        self._gravacoes += 1
+
+    def _criar_esquema(self):
+        diretorio = os.path.dirname(self.caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self._conexao().executescript(ESQUEMA_SQLITE)
+
+    @staticmethod
+    def _chave(categoria: Optional[str]) -> str:
+        return CATEGORIA_LEGADO if categoria is None else categoria
+
+    # ----------------------------------------------------------------- esquema
+
+    def versao_esquema(self) -> int:
+        return self._conexao().execute("PRAGMA user_version").fetchone()[0]
+
+    def definir_versao_esquema(self, versao: int):
+        self._conexao().execute(f"PRAGMA user_version = {int(versao)}")
+
+    def bloqueio_migracao(self):
+        return bloqueio(self.caminho)
+
+    def remover_legado(self):
+        conexao = self._conexao()
+        with em_transacao(conexao):
+            for tabela in ("sorteios", "rodadas", "confrontos", "rankings"):
+                conexao.execute(f"DELETE FROM {tabela} WHERE categoria = ?", (CATEGORIA_LEGADO,))
+        self._gravou()
+
+    # --------------------------------------------------------------- jogadores
+
+    def carregar_jogadores(self, copiar: bool = True) -> List[Dict]:
+        return self._cacheado("jogadores", self._ler_jogadores, copiar)
+
+    def _ler_jogadores(self) -> List[Dict]:
+        linhas = self._conexao().execute(
+            "SELECT id, nome, sexo, categorias, confirmado FROM jogadores ORDER BY id"
+        ).fetchall()
+        return [{
+            "id": linha["id"],
+            "nome": linha["nome"],
+            "sexo": linha["sexo"],
+            "categorias": json.loads(linha["categorias"]),
+            "confirmado": bool(linha["confirmado"])
+        } for linha in linhas]
+
+    def salvar_jogadores(self, jogadores: List[Dict], transacao: bool = True):
+        """Sincroniza a tabela com a lista (pelo id; renomear é um UPDATE de uma linha)"""
+        conexao = self._conexao()
+        with em_transacao(conexao) if transacao else sem_transacao():
+            ids = [j["id"] for j in jogadores]
+            conexao.execute(
+                f"DELETE FROM jogadores WHERE id NOT IN ({','.join('?' * len(ids))})",
+                ids
+            )
+            # Libera nomes que vão trocar de dono (ex.: renomeações cruzadas)
+            conexao.executemany(
+                "UPDATE jogadores SET nome = '#' || id WHERE id = ? AND nome <> ?",
+                [(j["id"], j["nome"]) for j in jogadores]
+            )
+            conexao.executemany(
+                """INSERT INTO jogadores (id, nome, sexo, categorias, confirmado)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET
+                       nome = excluded.nome,
+                       sexo = excluded.sexo,
+                       categorias = excluded.categorias,
+                       confirmado = excluded.confirmado""",
+                [(j["id"], j["nome"], j.get("sexo"),
+                  json.dumps(j.get("categorias", ["mista"]), ensure_ascii=False),
+                  int(bool(j.get("confirmado", False)))) for j in jogadores]
+            )
+        self._gravou()
+
+    def atualizar_jogadores(self, funcao: Callable[[List[Dict]], List[Dict]]) -> List[Dict]:
+        with em_transacao(self._conexao()):
+            jogadores = funcao(self.carregar_jogadores())
+            if jogadores is not None:
+                self.salvar_jogadores(jogadores, transacao=False)
+            return jogadores
+
+    def proximo_id_jogador(self) -> int:
+        """Primeiro id de jogador nunca usado (AUTOINCREMENT: sqlite_sequence só cresce)"""
+        linha = self._conexao().execute("SELECT seq FROM sqlite_sequence WHERE name = 'jogadores'").fetchone()
+        return (linha["seq"] if linha else 0) + 1
+
+    def reservar_ids_jogador(self, proximo: int):
+        """Garante que os ids abaixo de proximo não sejam distribuídos de novo"""
+        conexao = self._conexao()
+        with em_transacao(conexao):
+            if proximo <= self.proximo_id_jogador():
+                return
+            if conexao.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'jogadores'",
+                               (proximo - 1,)).rowcount == 0:
+                conexao.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('jogadores', ?)", (proximo - 1,))
+        self._gravou()
+
+    # ----------------------------------------------------------------- rodadas
+
+    def carregar_rodadas(self, categoria: Optional[str] = None, copiar: bool = True) -> Optional[Dict]:
+        return self._cacheado(("rodadas", categoria), lambda: self._ler_rodadas(categoria), copiar)
+
+    def _ler_rodadas(self, categoria: Optional[str]) -> Optional[Dict]:
+        conexao = self._conexao()
+        chave = self._chave(categoria)
+
+        linha = conexao.execute(
+            "SELECT metadados FROM sorteios WHERE categoria = ?", (chave,)
+        ).fetchone()
+        if linha is None:
+            return None
+        dados = json.loads(linha["metadados"])
+
+        rodadas = []
+        for rodada in conexao.execute(
+            "SELECT posicao, numero, descansando FROM rodadas WHERE categoria = ? ORDER BY posicao",
+            (chave,)
+        ):
+            rodadas.append({
+                "numero": rodada["numero"],
+                "confrontos": [],
+                "descansando": json.loads(rodada["descansando"])
+            })
+
+        for c in conexao.execute(
+            "SELECT * FROM confrontos WHERE categoria = ? ORDER BY rodada, indice", (chave,)
+        ):
+            confronto = {
+                "dupla1": {"jogador1": c["dupla1_jogador1"], "jogador2": c["dupla1_jogador2"]},
+                "dupla2": None
+            }
+            if c["dupla2_jogador1"] is not None:
+                confronto["dupla2"] = {"jogador1": c["dupla2_jogador1"], "jogador2": c["dupla2_jogador2"]}
+            if c["finalizado"] is not None:
+                confronto["resultado"] = {
+                    "games_dupla1": c["games_dupla1"],
+                    "games_dupla2": c["games_dupla2"],
+                    "finalizado": bool(c["finalizado"])
+                }
+            if c["quadra"] is not None:
+                confronto["quadra"] = c["quadra"]
+            rodadas[c["rodada"]]["confrontos"].append(confronto)
+
+        dados["rodadas"] = rodadas
+        return dados
+
+    def salvar_rodadas(self, categoria: Optional[str], dados: Dict, transacao: bool = True):
+        conexao = self._conexao()
+        chave = self._chave(categoria)
+        metadados = {k: v for k, v in dados.items() if k != "rodadas"}
+
+        with em_transacao(conexao) if transacao else sem_transacao():
+            self._apagar_rodadas(conexao, chave)
+            conexao.execute(
+                "INSERT INTO sorteios (categoria, metadados) VALUES (?, ?)",
+                (chave, json.dumps(metadados, ensure_ascii=False))
+            )
+            for posicao, rodada in enumerate(dados.get("rodadas", [])):
+                conexao.execute(
+                    "INSERT INTO rodadas (categoria, posicao, numero, descansando) VALUES (?, ?, ?, ?)",
+                    (chave, posicao, rodada.get("numero"),
+                     json.dumps(rodada.get("descansando", []), ensure_ascii=False))
+                )
+                conexao.executemany(
+                    """INSERT INTO confrontos (categoria, rodada, indice,
+                           dupla1_jogador1, dupla1_jogador2, dupla2_jogador1, dupla2_jogador2,
+                           quadra, games_dupla1, games_dupla2, finalizado)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    [_linha_confronto(chave, posicao, indice, confronto)
+                     for indice, confronto in enumerate(rodada.get("confrontos", []))]
+                )
+        self._gravou()
+
+    def reescrever_rodadas(self, categoria: Optional[str], funcao: Callable[[Dict], Optional[Dict]]) -> bool:
+        with em_transacao(self._conexao()):
+            dados = self.carregar_rodadas(categoria)
+            if dados is None:
+                return False
+            novos = funcao(dados)
+            if novos is None:
+                return False
+            self.salvar_rodadas(categoria, novos, transacao=False)
+        return True
+
+    def registrar_resultado(self, categoria: Optional[str], rodada_idx: int,
+                            confronto_idx: int, games_d1: int, games_d2: int) -> bool:
+        """Grava o placar de um confronto com um único UPDATE"""
+        return self.registrar_resultados(categoria, [(rodada_idx, confronto_idx, games_d1, games_d2)])
+
+    def registrar_resultados(self, categoria: Optional[str], resultados: List[Tuple[int, int, int, int]]) -> bool:
+        """Grava vários placares (rodada_idx, confronto_idx, games_d1, games_d2) em uma transação"""
+        conexao = self._conexao()
+        chave = self._chave(categoria)
+        with em_transacao(conexao):
+            if conexao.execute("SELECT 1 FROM sorteios WHERE categoria = ?", (chave,)).fetchone() is None:
+                return False
+            conexao.executemany(
+                """UPDATE confrontos
+                   SET games_dupla1 = ?, games_dupla2 = ?, finalizado = 1
+                   WHERE categoria = ? AND rodada = ? AND indice = ?""",
+                [(games_d1, games_d2, chave, rodada_idx, confronto_idx)
+                 for rodada_idx, confronto_idx, games_d1, games_d2 in resultados]
+            )
+        self._gravou()
+        return True
+
+    @staticmethod
+    def _apagar_rodadas(conexao: sqlite3.Connection, chave: str):
+        for tabela in ("sorteios", "rodadas", "confrontos"):
+            conexao.execute(f"DELETE FROM {tabela} WHERE categoria = ?", (chave,))
+
+    # ----------------------------------------------------------------- ranking
+
+    def carregar_ranking(self, categoria: Optional[str] = None, copiar: bool = True) -> Optional[Dict]:
+        return self._cacheado(("ranking", categoria), lambda: self._ler_ranking(categoria), copiar)
+
+    def _ler_ranking(self, categoria: Optional[str]) -> Optional[Dict]:
+        linha = self._conexao().execute(
+            "SELECT dados FROM rankings WHERE categoria = ?", (self._chave(categoria),)
+        ).fetchone()
+        return json.loads(linha["dados"]) if linha else None
+
+    def salvar_ranking(self, categoria: Optional[str], dados: Dict):
+        self._conexao().execute(
+            "INSERT OR REPLACE INTO rankings (categoria, dados) VALUES (?, ?)",
+            (self._chave(categoria), json.dumps(dados, ensure_ascii=False))
+        )
+        self._gravou()
+
+    def atualizar_ranking(self, categoria: Optional[str], funcao: Callable[[Optional[Dict]], Dict]) -> Dict:
+        with em_transacao(self._conexao()):
+            dados = funcao(self.carregar_ranking(categoria))
+            if dados is not None:
+                self.salvar_ranking(categoria, dados)
+            return dados
+
+    # ------------------------------------------------------------------- reset
+
+    def limpar_torneio(self):
+        conexao = self._conexao()
+        with em_transacao(conexao):
+            for tabela in ("sorteios", "rodadas", "confrontos", "rankings"):
+                conexao.execute(f"DELETE FROM {tabela}")
+        self._gravou()
+
+    def substituir_torneio(self, jogadores: List[Dict], rodadas: Dict, rankings: Dict):
+        """Troca o torneio inteiro (importação) em uma única transação"""
+        conexao = self._conexao()
+        with em_transacao(conexao):
+            for tabela in ("sorteios", "rodadas", "confrontos", "rankings"):
+                conexao.execute(f"DELETE FROM {tabela}")
+            self.salvar_jogadores(jogadores, transacao=False)
+            for categoria, dados in rodadas.items():
+                self.salvar_rodadas(categoria, dados, transacao=False)
+            for categoria, dados in rankings.items():
+                self.salvar_ranking(categoria, dados)
+
+
+def _linha_confronto(chave: str, posicao: int, indice: int, confronto: Dict) -> tuple:
+    dupla1 = confronto.get("dupla1") or {}
+    dupla2 = confronto.get("dupla2") or {}
+    resultado = confronto.get("resultado")
+    finalizado = None
+    if resultado is not None:
+        finalizado = int(bool(resultado.get("finalizado", False)))
+    return (
+        chave, posicao, indice,
+        dupla1.get("jogador1"), dupla1.get("jogador2"),
+        dupla2.get("jogador1"), dupla2.get("jogador2"),
+        confronto.get("quadra"),
+        (resultado or {}).get("games_dupla1"),
+        (resultado or {}).get("games_dupla2"),
+        finalizado
+    )
+
+
+# ============================================================================
+# SELEÇÃO E IMPORTAÇÃO
+# ============================================================================
+
+def criar_backend(tipo: Optional[str] = None, diretorio: str = "data"):
+    """Cria o backend configurado (BT_STORAGE=json|sqlite)"""
+    tipo = (tipo or BACKEND_PADRAO).lower()
+    if tipo == "json":
+        return BackendJSON(diretorio)
+    if tipo == "sqlite":
+        caminho = ARQUIVO_SQLITE
+        if not os.path.isabs(caminho):
+            caminho = os.path.join(diretorio, caminho)
+        return BackendSQLite(caminho)
+    raise ValueError(f"Backend de armazenamento desconhecido: {tipo}")
+
+
+def importar_dados(origem, destino) -> Dict:
+    """
+    Copia jogadores, rodadas e rankings de um backend para outro.
+    A origem deve estar no esquema atual (ver utils/migracoes.py).
+    """
+    resumo = {"jogadores": 0, "rodadas": [], "rankings": []}
+
+    jogadores = origem.carregar_jogadores()
+    destino.salvar_jogadores(jogadores)
+    destino.reservar_ids_jogador(origem.proximo_id_jogador())
+    resumo["jogadores"] = len(jogadores)
+
+    for categoria in CATEGORIAS:
+        rodadas = origem.carregar_rodadas(categoria)
+        if rodadas:
+            destino.salvar_rodadas(categoria, rodadas)
+            resumo["rodadas"].append(categoria)
+
+        ranking = origem.carregar_ranking(categoria)
+        if ranking:
+            destino.salvar_ranking(categoria, ranking)
+            resumo["rankings"].append(categoria)
+
+    destino.definir_versao_esquema(origem.versao_esquema())
+    return resumo
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Escrita segura de arquivos de dados com vários workers (gunicorn)
+- Escrita atômica: grava em arquivo temporário e troca com os.replace
+- Bloqueio consultivo por arquivo (<arquivo>.lock) só durante ler-modificar-gravar
+"""
+
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from utils.formato import desserializar, serializar
+
+try:
+    import fcntl
+except ImportError:  # Windows: apenas o bloqueio entre threads do mesmo processo
+    fcntl = None
+
+_bloqueios_locais = {}
+_bloqueios_locais_guarda = threading.Lock()
+
+
+def _bloqueio_local(arquivo: str) -> threading.RLock:
+    with _bloqueios_locais_guarda:
+        return _bloqueios_locais.setdefault(os.path.abspath(arquivo), threading.RLock())
+
+
+@contextmanager
+def bloqueio(arquivo: str):
+    """Bloqueio exclusivo de um arquivo de dados, entre threads e entre processos"""
+    with _bloqueio_local(arquivo):
+        if fcntl is None:
+            yield
+            return
+        with open(arquivo + ".lock", "a") as trava:
+            fcntl.flock(trava.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(trava.fileno(), fcntl.LOCK_UN)
+
+
+def escrever_atomico(arquivo: str, conteudo: bytes) -> Optional[os.stat_result]:
+    """
+    Grava o conteúdo inteiro ou nada: leitores nunca veem um arquivo pela metade.
+    Retorna o stat do arquivo que ESTA escrita gravou (fstat do próprio inode, mesmo
+    que outro processo já o tenha substituído), ou None no Windows, onde um arquivo
+    aberto não pode ser trocado.
+    """
+    diretorio = os.path.dirname(arquivo) or "."
+    fd, temporario = tempfile.mkstemp(prefix=".tmp-", dir=diretorio)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+            if os.name != "nt":
+                os.replace(temporario, arquivo)
+                return os.fstat(f.fileno())
+        os.replace(temporario, arquivo)
+        return None
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def escrever_json_atomico(arquivo: str, dados, formato: str = None) -> Optional[os.stat_result]:
+    """Serializa no formato configurado (BT_DATA_FORMAT) e grava de forma atômica"""
+    return escrever_atomico(arquivo, serializar(dados, formato))
+
+
+def ler_json(arquivo: str, padrao=None):
+    """Lê um arquivo de dados (formato detectado); retorna o padrão se não existir ou estiver vazio"""
+    try:
+        with open(arquivo, "rb") as f:
+            conteudo = f.read()
+    except FileNotFoundError:
+        return padrao
+    dados = desserializar(conteudo)
+    return padrao if dados is None else dados
+
+
+def atualizar_json(arquivo: str, funcao: Callable, padrao=None):
+    """
+    Ler-modificar-gravar sob bloqueio do arquivo.
+    funcao recebe os dados atuais e retorna os novos dados (None = não grava).
+    Retorna o que foi gravado (ou os dados atuais, se nada mudou).
+    """
+    with bloqueio(arquivo):
+        try:
+            dados = ler_json(arquivo, padrao)
+        except ValueError:  # Arquivo corrompido (JSONDecodeError ou msgpack inválido)
+            dados = padrao
+        novos = funcao(dados)
+        if novos is None:
+            return dados
+        escrever_json_atomico(arquivo, novos)
+        return novos
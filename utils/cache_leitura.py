@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Cache de leitura dos arquivos de dados, validado por (inode, mtime, ctime, tamanho)
+Enquanto o arquivo não muda no disco, nenhuma leitura faz parse do JSON de novo.
+Como toda gravação troca o arquivo (os.replace), o inode muda a cada escrita,
+inclusive quando feita por outro worker.
+"""
+
+import os
+import threading
+from typing import Callable, Dict, Optional
+
+from utils.arquivos import ler_json
+
+
+def copiar_json(dados):
+    """Cópia profunda de estruturas JSON (dict/list/escalares), mais rápida que deepcopy"""
+    if isinstance(dados, dict):
+        return {k: copiar_json(v) for k, v in dados.items()}
+    if isinstance(dados, list):
+        return [copiar_json(v) for v in dados]
+    return dados
+
+
+def _assinatura(st: os.stat_result) -> tuple:
+    return (st.st_ino, st.st_mtime_ns, st.st_ctime_ns, st.st_size)
+
+
+class CacheLeitura:
+    """
+    Cache por caminho de arquivo.
+    ler(..., copiar=True) retorna uma cópia que pode ser modificada;
+    ler(..., copiar=False) retorna o snapshot compartilhado, que NÃO deve ser modificado.
+    """
+
+    def __init__(self):
+        self._entradas: Dict[str, tuple] = {}
+        self._guarda = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def ler(self, arquivo: str, carregador: Callable = ler_json, copiar: bool = True):
+        try:
+            assinatura = _assinatura(os.stat(arquivo))
+        except FileNotFoundError:
+            self.invalidar(arquivo)
+            return None
+
+        entrada = self._entradas.get(arquivo)
+        if entrada is not None and entrada[0] == assinatura:
+            self.acertos += 1
+            dados = entrada[1]
+        else:
+            self.falhas += 1
+            dados = carregador(arquivo)
+            with self._guarda:
+                self._entradas[arquivo] = (assinatura, dados)
+
+        return copiar_json(dados) if copiar else dados
+
+    def guardar(self, arquivo: str, dados, st: Optional[os.stat_result]):
+        """
+        Atualiza o cache logo após uma gravação feita por este processo.
+        st é o stat do arquivo gravado (retorno de escrever_json_atomico), NÃO um
+        os.stat(arquivo) posterior: outro worker pode ter trocado o arquivo nesse meio
+        tempo, e os dados deste processo ficariam com a assinatura do arquivo dele.
+        """
+        if st is None:
+            self.invalidar(arquivo)
+            return
+        assinatura = _assinatura(st)
+        with self._guarda:
+            self._entradas[arquivo] = (assinatura, copiar_json(dados))
+
+    def invalidar(self, arquivo: Optional[str] = None):
+        with self._guarda:
+            if arquivo is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(arquivo, None)
+
+    def estatisticas(self) -> Dict:
+        total = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "entradas": len(self._entradas),
+            "taxa_acerto": round(self.acertos / total * 100, 1) if total else 0.0
+        }
+
+
+class MemoDerivado:
+    """
+    Guarda valores calculados a partir de snapshots do cache (ex.: rodadas com nomes
+    resolvidos). O valor é reaproveitado enquanto os objetos de origem forem os mesmos.
+    """
+
+    def __init__(self):
+        self._valores: Dict[object, tuple] = {}
+
+    def obter(self, chave, origens: tuple, calcular: Callable):
+        memo = self._valores.get(chave)
+        if memo is not None and len(memo[0]) == len(origens) and all(
+                a is b for a, b in zip(memo[0], origens)):
+            return memo[1]
+        valor = calcular()
+        self._valores[chave] = (origens, valor)
+        return valor
+
+
+# Cache compartilhado pelo processo (um por worker do gunicorn)
+cache_leitura = CacheLeitura()
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Contagem de visitantes únicos em pouco espaço
+Cada contador começa exato (conjunto de hashes de 64 bits) e, quando o conjunto
+passaria do tamanho de um sketch, vira HyperLogLog (2^12 registradores de 1 byte,
+erro padrão ~1,6%). Adicionar um hash que já foi contado não altera o contador
+(o registrador guarda um máximo), então vários workers podem juntar seus lotes
+ao mesmo arquivo sem contar ninguém duas vezes.
+
+Contadores nomeados são gravados juntos num arquivo binário (o total fica sozinho
+num arquivo, para a página inicial ler poucos bytes; por dia e por página, noutro):
+  b"BTU1" + quantidade (uint32) + para cada contador:
+  nome (uint16 + utf-8) + modo (uint8: 0 exato, 1 hll) + tamanho (uint32) + dados
+"""
+
+import math
+import struct
+from typing import Dict, Iterable, Optional, Union
+
+from utils.arquivos import bloqueio, escrever_atomico
+
+PRECISAO = 12
+REGISTRADORES = 1 << PRECISAO
+# Acima disso o conjunto exato (8 bytes por hash) ocupa mais que o sketch
+LIMITE_EXATO = REGISTRADORES // 8
+
+_ASSINATURA = b"BTU1"
+_EXATO, _HLL = 0, 1
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTRADORES)
+
+
+def hash_visitante(ip_hash: str) -> int:
+    """64 bits do hash MD5 (hex) do IP"""
+    return int(ip_hash[:16], 16)
+
+
+class ContadorUnicos:
+    """Cardinalidade exata para poucos elementos, HyperLogLog a partir de LIMITE_EXATO"""
+
+    __slots__ = ("_exatos", "_registradores", "_estimativa")
+
+    def __init__(self):
+        self._exatos: Optional[set] = set()
+        self._registradores: Optional[bytearray] = None
+        self._estimativa: Optional[int] = 0
+
+    @property
+    def exato(self) -> bool:
+        return self._registradores is None
+
+    def adicionar(self, valor: int):
+        if self._exatos is not None:
+            if valor in self._exatos:
+                return
+            self._exatos.add(valor)
+            self._estimativa = None
+            if len(self._exatos) > LIMITE_EXATO:
+                self._para_hll()
+            return
+        self._marcar(valor)
+
+    def _marcar(self, valor: int):
+        indice = valor >> (64 - PRECISAO)
+        resto = valor & ((1 << (64 - PRECISAO)) - 1)
+        posicao = (64 - PRECISAO) - resto.bit_length() + 1
+        if posicao > self._registradores[indice]:
+            self._registradores[indice] = posicao
+            self._estimativa = None
+
+    def unir(self, outro: "ContadorUnicos"):
+        """Soma outro contador a este (união dos visitantes)"""
+        if outro._exatos is not None:
+            for valor in outro._exatos:
+                self.adicionar(valor)
+            return
+        if self._registradores is None:
+            self._para_hll()
+        for indice, posicao in enumerate(outro._registradores):
+            if posicao > self._registradores[indice]:
+                self._registradores[indice] = posicao
+        self._estimativa = None
+
+    def _para_hll(self):
+        valores, self._exatos = self._exatos, None
+        self._registradores = bytearray(REGISTRADORES)
+        for valor in valores:
+            self._marcar(valor)
+        self._estimativa = None
+
+    def __len__(self) -> int:
+        if self._estimativa is None:
+            self._estimativa = len(self._exatos) if self._exatos is not None else self._estimar()
+        return self._estimativa
+
+    def _estimar(self) -> int:
+        registradores = self._registradores
+        estimativa = _ALPHA * REGISTRADORES * REGISTRADORES / sum(2.0 ** -r for r in registradores)
+        zeros = registradores.count(0)
+        if estimativa <= 2.5 * REGISTRADORES and zeros:
+            estimativa = REGISTRADORES * math.log(REGISTRADORES / zeros)  # contagem linear
+        return int(round(estimativa))
+
+    # ------------------------------------------------------------ serialização
+
+    def serializar(self) -> bytes:
+        if self._exatos is not None:
+            return bytes([_EXATO]) + b"".join(struct.pack(">Q", v) for v in sorted(self._exatos))
+        return bytes([_HLL]) + bytes(self._registradores)
+
+    @classmethod
+    def desserializar(cls, dados: bytes) -> "ContadorUnicos":
+        contador = cls()
+        if dados[0] == _EXATO:
+            contador._exatos = {v for (v,) in struct.iter_unpack(">Q", dados[1:])}
+            contador._estimativa = None
+        elif dados[0] == _HLL and len(dados) == REGISTRADORES + 1:
+            contador._exatos = None
+            contador._registradores = bytearray(dados[1:])
+            contador._estimativa = None
+        else:
+            raise ValueError("Contador de únicos inválido")
+        return contador
+
+
+def serializar_contadores(contadores: Dict[str, ContadorUnicos]) -> bytes:
+    partes = [_ASSINATURA, struct.pack(">I", len(contadores))]
+    for nome, contador in sorted(contadores.items()):
+        chave = nome.encode("utf-8")
+        dados = contador.serializar()
+        partes.append(struct.pack(">H", len(chave)) + chave + struct.pack(">I", len(dados)) + dados)
+    return b"".join(partes)
+
+
+def desserializar_contadores(conteudo: bytes) -> Dict[str, ContadorUnicos]:
+    if not conteudo:
+        return {}
+    if conteudo[:4] != _ASSINATURA:
+        raise ValueError("Arquivo de visitantes únicos inválido")
+    try:
+        (quantidade,) = struct.unpack_from(">I", conteudo, 4)
+        posicao = 8
+        contadores = {}
+        for _ in range(quantidade):
+            (tamanho_chave,) = struct.unpack_from(">H", conteudo, posicao)
+            posicao += 2
+            nome = conteudo[posicao:posicao + tamanho_chave].decode("utf-8")
+            posicao += tamanho_chave
+            (tamanho,) = struct.unpack_from(">I", conteudo, posicao)
+            posicao += 4
+            contadores[nome] = ContadorUnicos.desserializar(conteudo[posicao:posicao + tamanho])
+            posicao += tamanho
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise ValueError(f"Arquivo de visitantes únicos inválido ({e})")
+    return contadores
+
+
+def ler_contadores(arquivo: str) -> Dict[str, ContadorUnicos]:
+    """Contadores gravados no arquivo ({} se não existir)"""
+    try:
+        with open(arquivo, "rb") as f:
+            return desserializar_contadores(f.read())
+    except FileNotFoundError:
+        return {}
+
+
+def unir_contadores(arquivo: str, novos: Dict[str, Union[Iterable[int], ContadorUnicos]],
+                    remover: Optional[Iterable[str]] = None) -> Dict[str, ContadorUnicos]:
+    """
+    Junta os hashes novos (ou contadores inteiros) por nome de contador aos contadores
+    gravados, sob bloqueio do arquivo, e remove os contadores indicados.
+    Retorna os contadores gravados.
+    """
+    with bloqueio(arquivo):
+        try:
+            contadores = ler_contadores(arquivo)
+        except ValueError:  # Arquivo corrompido: recomeça a contagem
+            contadores = {}
+        for nome, valores in novos.items():
+            contador = contadores.setdefault(nome, ContadorUnicos())
+            if isinstance(valores, ContadorUnicos):
+                contador.unir(valores)
+                continue
+            for valor in valores:
+                contador.adicionar(valor)
+        for nome in remover or ():
+            contadores.pop(nome, None)
+        escrever_atomico(arquivo, serializar_contadores(contadores))
+        return contadores
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Diário (journal) de resultados: cada placar salvo vira uma linha NDJSON anexada
+ao arquivo data/resultados_<categoria>.log, em vez de regravar as rodadas inteiras.
+
+Estado atual = snapshot (data/rodadas_<categoria>.json, com "seq_diario")
+             + eventos do diário com seq maior que o do snapshot.
+A compactação grava um novo snapshot e esvazia o diário.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from utils.arquivos import escrever_atomico
+from utils.cache_leitura import cache_leitura
+
+
+def ler_eventos(arquivo: str) -> List[Dict]:
+    """Lê todos os eventos do diário; ignora uma última linha incompleta (queda no meio da escrita)"""
+    eventos = []
+    try:
+        with open(arquivo, "r", encoding="utf-8") as f:
+            for linha in f:
+                linha = linha.strip()
+                if not linha:
+                    continue
+                try:
+                    eventos.append(json.loads(linha))
+                except json.JSONDecodeError:
+                    break
+    except FileNotFoundError:
+        pass
+    return eventos
+
+
+def aplicar_evento(dados: Dict, evento: Dict):
+    """Aplica um evento de resultado sobre o documento de rodadas (in-place)"""
+    try:
+        confronto = dados["rodadas"][evento["rodada"]]["confrontos"][evento["confronto"]]
+    except (KeyError, IndexError, TypeError):
+        return
+    resultado = confronto.setdefault("resultado", {})
+    resultado["games_dupla1"] = evento["games_dupla1"]
+    resultado["games_dupla2"] = evento["games_dupla2"]
+    resultado["finalizado"] = True
+    dados["seq_diario"] = evento["seq"]
+    dados["ultimo_resultado"] = evento["ts"]
+
+
+class DiarioResultados:
+    """Arquivo de eventos de uma categoria. Quem chama deve segurar bloqueio(arquivo) ao escrever."""
+
+    def __init__(self, arquivo: str):
+        self.arquivo = arquivo
+
+    def eventos(self) -> List[Dict]:
+        """Eventos atuais (snapshot compartilhado do cache: não modificar)"""
+        return cache_leitura.ler(self.arquivo, carregador=ler_eventos, copiar=False) or []
+
+    def ultimo_seq(self) -> int:
+        eventos = self.eventos()
+        return eventos[-1]["seq"] if eventos else 0
+
+    def anexar(self, seq: int, categoria: str, resultados: List[Tuple[int, int, int, int]]) -> List[Dict]:
+        """
+        Anexa um evento por placar (rodada_idx, confronto_idx, games_d1, games_d2),
+        numerados a partir de seq, com uma única escrita e um único fsync
+        """
+        ts = datetime.now().isoformat()
+        eventos = [{
+            "seq": seq + i,
+            "categoria": categoria,
+            "rodada": rodada_idx,
+            "confronto": confronto_idx,
+            "games_dupla1": games_d1,
+            "games_dupla2": games_d2,
+            "ts": ts
+        } for i, (rodada_idx, confronto_idx, games_d1, games_d2) in enumerate(resultados)]
+        linhas = "".join(json.dumps(evento, ensure_ascii=False) + "\n" for evento in eventos)
+        self._descartar_linha_incompleta()
+        with open(self.arquivo, "a", encoding="utf-8") as f:
+            f.write(linhas)
+            f.flush()
+            os.fsync(f.fileno())
+        return eventos
+
+    def _descartar_linha_incompleta(self):
+        """
+        Se a escrita anterior caiu no meio (última linha sem o \\n final), corta essa
+        linha; senão o próximo evento seria colado nela e os dois se perderiam.
+        Um evento completo sem o \\n (ler_eventos já o aplica) só ganha o \\n.
+        """
+        try:
+            with open(self.arquivo, "rb+") as f:
+                tamanho = f.seek(0, os.SEEK_END)
+                if tamanho == 0:
+                    return
+                f.seek(tamanho - 1)
+                if f.read(1) == b"\n":
+                    return
+                f.seek(0)
+                conteudo = f.read()
+                inicio = conteudo.rfind(b"\n") + 1
+                try:
+                    json.loads(conteudo[inicio:])
+                    f.write(b"\n")
+                except ValueError:
+                    f.truncate(inicio)
+                f.flush()
+                os.fsync(f.fileno())
+        except FileNotFoundError:
+            pass
+
+    def esvaziar(self):
+        """Descarta os eventos (já incorporados a um snapshot)"""
+        if os.path.exists(self.arquivo):
+            escrever_atomico(self.arquivo, b"")
+
+    def remover(self):
+        if os.path.exists(self.arquivo):
+            os.remove(self.arquivo)
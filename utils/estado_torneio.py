@@ -0,0 +1,502 @@
+# -*- coding: utf-8 -*-
+"""
+Estado do torneio em memória (jogadores, rodadas e rankings por categoria)
+As rotas leem deste objeto; o disco só é consultado para validar o cache (um stat)
+quando outro worker grava algo.
+
+Mutações frequentes (placares e confirmações de presença) são aplicadas na memória
+na hora e gravadas em segundo plano: uma thread junta tudo o que chegou em
+BT_FLUSH_MS milissegundos e faz uma única gravação. BT_FLUSH_MS=0 grava na hora.
+Mutações raras (sorteio, cadastro, reset) continuam síncronas.
+
+O ranking de cada categoria vem de um MotorRanking (utils/ranking_incremental.py):
+um placar novo é aplicado como diferença, sem recalcular o torneio inteiro.
+Cada mudança do ranking exibido incrementa a versão da categoria (versao_ranking),
+usada pelas rotas para respostas condicionais (ETag), cache da página renderizada e
+diferenças desde uma versão anterior (as últimas HISTORICO_VERSOES ficam guardadas).
+
+Os dados já estão no esquema atual (migrados na inicialização, ver utils/migracoes.py).
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.cache_leitura import MemoDerivado, copiar_json
+from utils.jogadores import RegistroJogadores, atribuir_ids, decodificar_rodadas, resolver_nomes_ranking
+from utils.ranking_incremental import MotorRanking
+from utils.ranking_vetorizado import calcular_ranking
+from utils.sorteio_rodadas import resumo_jogadores, separar_ranking_por_genero
+
+CATEGORIAS = ["mista", "masculino", "feminino"]
+
+# Pseudo-categoria de versao_ranking: todas as categorias com rodadas (ranking_todas)
+TODAS = "todas"
+
+# Intervalo da gravação em segundo plano (milissegundos)
+INTERVALO_GRAVACAO_MS = int(os.environ.get("BT_FLUSH_MS", "200"))
+
+# Versões anteriores do ranking guardadas por categoria (diferença desde uma versão)
+HISTORICO_VERSOES = 32
+
+# (rodada_idx, confronto_idx) -> (games_dupla1, games_dupla2, timestamp)
+Placares = Dict[Tuple[int, int], Tuple[int, int, str]]
+
+# (número, ranking, assinatura do conteúdo)
+Versao = Tuple[int, Dict, str]
+
+
+def linha_ranking_zerada(nome: str) -> Dict:
+    """Linha de ranking de um jogador sem jogos"""
+    return {
+        "nome": nome,
+        "vitorias": 0,
+        "derrotas": 0,
+        "percentual_vitorias": 0,
+        "saldo_games": 0,
+        "games_feitos": 0,
+        "games_sofridos": 0
+    }
+
+
+class EstadoTorneio:
+    """
+    Modelo único do torneio sobre um backend de armazenamento.
+    Os valores retornados pelos acessores são compartilhados: NÃO modificar.
+    Placares pendentes de gravação aparecem nas leituras deste worker; outros
+    workers os veem depois da gravação (no máximo BT_FLUSH_MS depois).
+    """
+
+    def __init__(self, armazenamento, intervalo_ms: int = INTERVALO_GRAVACAO_MS):
+        self.armazenamento = armazenamento
+        self.intervalo = intervalo_ms / 1000
+        self._memo = MemoDerivado()
+        self._guarda = threading.Lock()
+        self._gravacao = threading.Lock()
+        # Mutações ainda não gravadas; cada alteração troca a "marca" usada nos memos
+        self._placares: Dict[str, Placares] = {}
+        self._confirmados: Optional[frozenset] = None
+        self._marcas: Dict[str, object] = {}
+        self._acordar = threading.Event()
+        # Ranking incremental por categoria; _motores_guarda vem antes de _guarda
+        self._motores: Dict[str, MotorRanking] = {}
+        self._motores_guarda = threading.Lock()
+        # Últimas versões do ranking de cada categoria, da mais antiga para a atual
+        self._versoes: Dict[str, List[Versao]] = {}
+        self._gravador: Optional[threading.Thread] = None
+        self._pid = None
+        armazenamento.ao_compactar = self._gravar_ranking_compactado
+
+    def _marca(self, chave: str) -> object:
+        return self._marcas.setdefault(chave, object())
+
+    def _trocar_marca(self, chave: str):
+        self._marcas[chave] = object()
+
+    # =========================================================== jogadores
+
+    def jogadores(self) -> List[Dict]:
+        """Cadastro atual, com as confirmações de presença ainda não gravadas"""
+        base = self.armazenamento.carregar_jogadores(copiar=False)
+        with self._guarda:
+            confirmados, marca = self._confirmados, self._marca("jogadores")
+        if confirmados is None:
+            return base
+        return self._memo.obter("jogadores", (base, marca),
+                                lambda: _com_confirmados(base, confirmados))
+
+    def registro(self) -> RegistroJogadores:
+        """Índices id/nome do cadastro atual"""
+        jogadores = self.jogadores()
+        return self._memo.obter("registro", (jogadores,), lambda: RegistroJogadores(jogadores))
+
+    def confirmados(self) -> List[Dict]:
+        return [j for j in self.jogadores() if j.get("confirmado")]
+
+    def nomes(self, ids: Iterable) -> List[str]:
+        """Nomes de exibição de uma lista de ids"""
+        registro = self.registro()
+        return [registro.nome(i) for i in ids]
+
+    def confirmar_presenca(self, nomes: Iterable[str]):
+        """Marca exatamente estes jogadores como confirmados (gravação em segundo plano)"""
+        with self._guarda:
+            self._confirmados = frozenset(nomes)
+            self._trocar_marca("jogadores")
+        self._agendar()
+
+    def atualizar_jogadores(self, funcao: Callable[[List[Dict]], List[Dict]]) -> List[Dict]:
+        """Ler-modificar-gravar do cadastro (síncrono; grava antes o que estiver pendente)"""
+        self.descarregar()
+
+        def aplicar(jogadores):
+            jogadores = funcao(jogadores)
+            if jogadores is not None:  # None = não grava
+                # Jogadores novos recebem id (nunca o de um jogador excluído)
+                atribuir_ids(jogadores, self.armazenamento.proximo_id_jogador())
+            return jogadores
+        return self.armazenamento.atualizar_jogadores(aplicar)
+
+    # ============================================================= rodadas
+
+    def rodadas(self, categoria: str) -> Optional[Dict]:
+        """Rodadas da categoria (com ids), incluindo placares ainda não gravados"""
+        # Pendentes ANTES do snapshot: a gravação grava e só depois tira dos pendentes,
+        # então um placar nunca fica de fora das duas leituras
+        with self._guarda:
+            placares, marca = self._placares.get(categoria), self._marca(categoria)
+        base = self.armazenamento.carregar_rodadas(categoria, copiar=False)
+        if not base:
+            return base
+        if not placares:
+            return base
+        return self._memo.obter(("rodadas", categoria), (base, marca),
+                                lambda: _aplicar_placares(base, placares))
+
+    def rodadas_exibicao(self, categoria: str) -> Optional[Dict]:
+        """Rodadas com os nomes dos jogadores no lugar dos ids (para os templates)"""
+        dados = self.rodadas(categoria)
+        if not dados:
+            return dados
+        registro = self.registro()
+        return self._memo.obter(("exibicao", categoria), (dados, registro),
+                                lambda: decodificar_rodadas(dados, registro))
+
+    def todas_rodadas_exibicao(self) -> Dict[str, Optional[Dict]]:
+        return {categoria: self.rodadas_exibicao(categoria) for categoria in CATEGORIAS}
+
+    def categorias_com_rodadas(self) -> List[str]:
+        return [categoria for categoria in CATEGORIAS if self.rodadas(categoria)]
+
+    def definir_rodadas(self, categoria: str, dados: Dict):
+        """Grava um novo sorteio (síncrono); descarta placares pendentes do sorteio anterior"""
+        # Segura a gravação: placares antigos não podem chegar ao diário depois do novo sorteio
+        with self._gravacao:
+            with self._guarda:
+                self._placares.pop(categoria, None)
+                self._trocar_marca(categoria)
+            self.armazenamento.salvar_rodadas(categoria, dados)
+
+    def registrar_resultado(self, categoria: str, rodada_idx: int, confronto_idx: int,
+                            games_d1: int, games_d2: int) -> bool:
+        """
+        Registra o placar na memória e agenda a gravação (índices já validados pela rota).
+        Retorna False se a categoria não tem rodadas.
+        """
+        if not self.rodadas(categoria):
+            return False
+
+        with self._motores_guarda:
+            timestamp = datetime.now().isoformat()
+            with self._guarda:
+                placares = dict(self._placares.get(categoria, {}))
+                placares[(rodada_idx, confronto_idx)] = (games_d1, games_d2, timestamp)
+                self._placares[categoria] = placares
+                self._trocar_marca(categoria)
+            # Só a diferença deste confronto no ranking (O(4 + log n))
+            motor = self._motores.get(categoria)
+            if motor is not None:
+                motor.registrar((rodada_idx, confronto_idx), (games_d1, games_d2), timestamp)
+        self._agendar()
+        return True
+
+    # ============================================================= ranking
+
+    def ranking_salvo(self, categoria: str) -> Optional[Dict]:
+        """Ranking gravado em disco"""
+        return self.armazenamento.carregar_ranking(categoria, copiar=False)
+
+    def salvar_ranking(self, categoria: str, dados: Dict):
+        self.armazenamento.salvar_ranking(categoria, dados)
+
+    def ranking(self, categoria: str) -> Dict:
+        """
+        Ranking para exibição: derivado das rodadas; sem rodadas, o ranking salvo;
+        sem nenhum dos dois, os confirmados com tudo zerado.
+        """
+        motor = self._motor(categoria)
+        if motor is not None:
+            registro, jogadores = self.registro(), self.jogadores()
+            ranking = self._memo.obter(("ranking", categoria), (motor.marca, registro, jogadores),
+                                       lambda: self._ranking_do_motor(categoria, motor, registro, jogadores))
+        else:
+            ranking = self.ranking_salvo(categoria)
+            chave = "masculino" if categoria == "mista" else "ranking"
+            if not (ranking and ranking.get(chave)):
+                ranking = None
+        return ranking or self.ranking_confirmados(categoria)
+
+    def versao_ranking(self, categoria: str) -> Versao:
+        """
+        Ranking e sua versão: um número que só cresce e muda sempre que o ranking muda
+        (placar, sorteio, cadastro), mais um hash do conteúdo (igual em todos os workers
+        que veem os mesmos dados). Sem mudança custa só a validação do cache (um stat).
+        """
+        ranking = self.ranking_todas() if categoria == TODAS else self.ranking(categoria)
+        with self._guarda:
+            historico = self._versoes.get(categoria)
+            if historico and historico[-1][1] is ranking:
+                return historico[-1]
+        conteudo = json.dumps(ranking, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        assinatura = hashlib.sha1(conteudo).hexdigest()[:20]
+        with self._guarda:
+            historico = self._versoes.setdefault(categoria, [])
+            if not historico or historico[-1][2] != assinatura:
+                historico.append((historico[-1][0] + 1 if historico else 1, ranking, assinatura))
+                del historico[:-HISTORICO_VERSOES]
+            elif historico[-1][1] is not ranking:
+                # Mesmo conteúdo em outro objeto (ex.: cache por thread do SQLite): mesma versão
+                historico[-1] = (historico[-1][0], ranking, assinatura)
+            return historico[-1]
+
+    def ranking_todas(self) -> Dict:
+        """
+        Rankings de todas as categorias com rodadas e o resumo por jogador entre elas.
+        Reaproveitado enquanto os rankings das categorias forem os mesmos.
+        """
+        rankings = {categoria: self.ranking(categoria) for categoria in self.categorias_com_rodadas()}
+        return self._memo.obter(TODAS, tuple(rankings.values()), lambda: _ranking_todas(rankings))
+
+    def versao_anterior(self, categoria: str, numero: int) -> Optional[Versao]:
+        """Uma das últimas versões do ranking (None se já saiu do histórico ou nunca existiu)"""
+        with self._guarda:
+            for versao in self._versoes.get(categoria, ()):
+                if versao[0] == numero:
+                    return versao
+        return None
+
+    def _motor(self, categoria: str) -> Optional[MotorRanking]:
+        """Motor de ranking em dia com as rodadas gravadas e os placares pendentes"""
+        with self._motores_guarda:
+            # Pendentes antes do snapshot (ver rodadas), os dois sob _motores_guarda:
+            # um placar registrado agora não é desfeito por um sincronizar atrasado
+            with self._guarda:
+                placares = self._placares.get(categoria) or {}
+            base = self.armazenamento.carregar_rodadas(categoria, copiar=False)
+            if not base:
+                return None
+            motor = self._motores.get(categoria)
+            if motor is not None and motor.base is base:
+                return motor
+            # Snapshot novo (gravação deste ou de outro worker): reaplica só o que mudou;
+            # sorteio novo: monta o motor do zero
+            if motor is None or not motor.mesmo_sorteio(base):
+                motor = MotorRanking(base)
+                self._motores[categoria] = motor
+            motor.sincronizar(base, placares)
+            return motor
+
+    def pares_jogador(self, tipo: str, jogador, categoria: Optional[str] = None, com=None) -> Dict[object, List[int]]:
+        """
+        Parcerias ("parcerias") ou confrontos ("adversarios") do jogador, somados nas
+        categorias com rodadas (ou só numa): outro jogador -> [jogos, vitorias,
+        games_feitos, games_sofridos]. Com `com`, só esse par (O(1) por categoria).
+        """
+        totais: Dict[object, List[int]] = {}
+        for nome_categoria in ([categoria] if categoria else self.categorias_com_rodadas()):
+            motor = self._motor(nome_categoria)
+            if motor is None:
+                continue
+            with self._motores_guarda:
+                linha = motor.pares.linha(tipo, jogador)
+                if com is None:
+                    celulas = list(linha.items())
+                else:
+                    celulas = [(com, linha[com])] if com in linha else []
+                for outro, celula in celulas:
+                    soma = totais.setdefault(outro, [0] * len(celula))
+                    for i, valor in enumerate(celula):
+                        soma[i] += valor
+        return totais
+
+    def _ranking_do_motor(self, categoria: str, motor: MotorRanking, registro, jogadores) -> Optional[Dict]:
+        with self._motores_guarda:
+            linhas = motor.linhas(registro)
+            ultima_atualizacao = motor.ultima_atualizacao or motor.base.get("data_sorteio")
+        return self._formatar_ranking(categoria, linhas, ultima_atualizacao, jogadores)
+
+    def montar_ranking(self, categoria: str, dados_rodadas: Dict) -> Optional[Dict]:
+        """Calcula o ranking da categoria a partir das rodadas (None se não há jogadores)"""
+        ranking_calc = resolver_nomes_ranking(calcular_ranking(dados_rodadas["rodadas"]), self.registro())
+        ultima_atualizacao = dados_rodadas.get("ultimo_resultado") or dados_rodadas.get("data_sorteio")
+        return self._formatar_ranking(categoria, ranking_calc, ultima_atualizacao, self.jogadores())
+
+    def _formatar_ranking(self, categoria: str, ranking_calc: List[Dict], ultima_atualizacao: Optional[str],
+                          jogadores: List[Dict]) -> Optional[Dict]:
+        # ultima_atualizacao entra no ETag: nada de datetime.now() aqui (sem resultados,
+        # a data do sorteio), senão cada worker e cada recálculo teriam outra versão
+        if categoria == "mista":
+            ranking_sep = separar_ranking_por_genero(ranking_calc, jogadores)
+            if not (ranking_sep["masculino"] or ranking_sep["feminino"]):
+                return None
+            return {
+                "categoria": "mista",
+                "ultima_atualizacao": ultima_atualizacao,
+                "masculino": ranking_sep["masculino"],
+                "feminino": ranking_sep["feminino"]
+            }
+
+        if not ranking_calc:
+            return None
+        return {
+            "categoria": categoria,
+            "ultima_atualizacao": ultima_atualizacao,
+            "ranking": ranking_calc
+        }
+
+    def ranking_confirmados(self, categoria: str) -> Dict:
+        """Ranking zerado com os jogadores confirmados (antes de existir qualquer resultado)"""
+        jogadores = self.jogadores()
+        return self._memo.obter(("confirmados", categoria), (jogadores,),
+                                lambda: self._ranking_confirmados(categoria, jogadores))
+
+    def _ranking_confirmados(self, categoria: str, jogadores: List[Dict]) -> Dict:
+        confirmados = [j for j in jogadores if j.get("confirmado")]
+
+        def zerados(sexo):
+            return sorted([linha_ranking_zerada(j["nome"]) for j in confirmados if j["sexo"] == sexo],
+                          key=lambda x: x["nome"])
+
+        if categoria == "mista":
+            return {
+                "categoria": "mista",
+                "ultima_atualizacao": None,  # Sem resultados (e estável para o ETag)
+                "masculino": zerados("M"),
+                "feminino": zerados("F")
+            }
+        return {
+            "categoria": categoria,
+            "ultima_atualizacao": None,
+            "ranking": zerados("M" if categoria == "masculino" else "F")
+        }
+
+    def _gravar_ranking_compactado(self, categoria: str, dados_rodadas: Dict):
+        """Após a compactação do diário, regrava o arquivo de ranking da categoria"""
+        ranking = self.montar_ranking(categoria, dados_rodadas)
+        if ranking:
+            self.salvar_ranking(categoria, ranking)
+
+    # =============================================================== reset
+
+    def limpar_torneio(self):
+        """Remove rodadas e rankings de todas as categorias (mantém jogadores)"""
+        with self._gravacao:
+            with self._guarda:
+                for categoria in list(self._placares):
+                    self._trocar_marca(categoria)
+                self._placares.clear()
+            self.armazenamento.limpar_torneio()
+
+    def substituir(self, jogadores: List[Dict], rodadas: Dict, rankings: Dict):
+        """Troca o torneio inteiro (importação); descarta as mutações pendentes"""
+        with self._gravacao:
+            with self._guarda:
+                for chave in list(self._placares) + ["jogadores"]:
+                    self._trocar_marca(chave)
+                self._placares.clear()
+                self._confirmados = None
+            self.armazenamento.substituir_torneio(jogadores, rodadas, rankings)
+
+    # ================================================ gravação em segundo plano
+
+    def _agendar(self):
+        if self.intervalo <= 0:
+            self.descarregar()
+            return
+        # A thread não sobrevive ao fork do gunicorn: cria no worker, na primeira mutação
+        if self._gravador is None or self._pid != os.getpid() or not self._gravador.is_alive():
+            with self._guarda:
+                if self._gravador is None or self._pid != os.getpid() or not self._gravador.is_alive():
+                    if self._gravador is None:
+                        atexit.register(self.descarregar)
+                    self._pid = os.getpid()
+                    self._gravador = threading.Thread(target=self._laco_gravacao,
+                                                      name="gravacao-torneio", daemon=True)
+                    self._gravador.start()
+        self._acordar.set()
+
+    def _laco_gravacao(self):
+        while True:
+            self._acordar.wait()
+            time.sleep(self.intervalo)  # junta as mutações que chegarem neste intervalo
+            self._acordar.clear()
+            try:
+                self.descarregar()
+            except Exception as e:
+                print(f"Erro na gravação do torneio: {e}")
+                self._acordar.set()
+
+    def pendentes(self) -> int:
+        """Quantidade de mutações ainda não gravadas"""
+        return sum(len(p) for p in self._placares.values()) + (self._confirmados is not None)
+
+    def descarregar(self):
+        """Grava agora todas as mutações pendentes (uma gravação por categoria)"""
+        with self._gravacao:
+            with self._guarda:
+                confirmados = self._confirmados
+                placares = dict(self._placares)
+
+            if confirmados is not None:
+                def marcar(jogadores):
+                    for j in jogadores:
+                        j["confirmado"] = j["nome"] in confirmados
+                    return jogadores
+                self.armazenamento.atualizar_jogadores(marcar)
+
+            gravados = {}
+            for categoria, pendentes in placares.items():
+                resultados = [(r, c, g1, g2) for (r, c), (g1, g2, _) in sorted(pendentes.items())]
+                self.armazenamento.registrar_resultados(categoria, resultados)
+                gravados[categoria] = pendentes
+
+            # Remove só o que não mudou enquanto gravava
+            with self._guarda:
+                if confirmados is not None and self._confirmados is confirmados:
+                    self._confirmados = None
+                    self._trocar_marca("jogadores")
+                for categoria, pendentes in gravados.items():
+                    if self._placares.get(categoria) is pendentes:
+                        del self._placares[categoria]
+                        self._trocar_marca(categoria)
+
+
+def _com_confirmados(jogadores: List[Dict], confirmados: frozenset) -> List[Dict]:
+    """Cópia do cadastro com as confirmações pendentes aplicadas"""
+    copia = copiar_json(jogadores)
+    for j in copia:
+        j["confirmado"] = j["nome"] in confirmados
+    return copia
+
+
+def _ranking_todas(rankings: Dict[str, Dict]) -> Dict:
+    categorias = {}
+    for categoria, ranking in rankings.items():
+        linhas = ranking.get("ranking") or (ranking.get("masculino") or []) + (ranking.get("feminino") or [])
+        tem_resultados = any(linha.get("vitorias") or linha.get("derrotas") for linha in linhas)
+        categorias[categoria] = dict(ranking, tem_resultados=tem_resultados)
+    return {
+        "categoria": TODAS,
+        "ultima_atualizacao": max((r.get("ultima_atualizacao") or "" for r in rankings.values()), default="") or None,
+        "categorias": categorias,
+        "jogadores": resumo_jogadores(rankings)
+    }
+
+
+def _aplicar_placares(dados: Dict, placares: Placares) -> Dict:
+    """Cópia das rodadas com os placares pendentes aplicados"""
+    copia = copiar_json(dados)
+    for (rodada_idx, confronto_idx), (games_d1, games_d2, ts) in placares.items():
+        confronto = copia["rodadas"][rodada_idx]["confrontos"][confronto_idx]
+        confronto["resultado"] = {
+            "games_dupla1": games_d1,
+            "games_dupla2": games_d2,
+            "finalizado": True
+        }
+        copia["ultimo_resultado"] = max(ts, copia.get("ultimo_resultado") or "")
+    return copia
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Eventos ao vivo (Server-Sent Events) dentro de um worker
+Um único Difusor por processo: a rota de placar publica uma vez e a mensagem,
+serializada uma só vez, vai para a fila de cada conexão aberta em /events/<categoria>.
+Funciona com workers de threads (gthread) e com gevent (queue e threading são
+trocados pelo monkey patch); com o worker síncrono cada conexão prenderia o worker.
+
+Publicações de outros workers não chegam a esta fila: cada conexão acorda a cada
+INTERVALO_VERIFICACAO segundos sem mensagem e compara a versão do ranking (app.py).
+Conexão lenta cuja fila enche perde mensagens e é avisada para se ressincronizar.
+"""
+
+import json
+import os
+import queue
+import threading
+from typing import Dict, Optional, Set
+
+# Conexões abertas por worker (cada uma ocupa uma thread no gthread)
+MAXIMO_ASSINANTES = int(os.environ.get("BT_EVENTOS_MAXIMO", "80"))
+
+# Segundos sem mensagem até conferir a versão do ranking (e mandar um ping)
+INTERVALO_VERIFICACAO = float(os.environ.get("BT_EVENTOS_VERIFICACAO_S", "15"))
+
+# Mensagens na fila de uma conexão antes de ela perder eventos
+TAMANHO_FILA = 64
+
+
+def formatar_evento(evento: str, dados: Dict) -> str:
+    """Mensagem no formato text/event-stream"""
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+class Assinatura:
+    """Fila de mensagens de uma conexão"""
+
+    __slots__ = ("canal", "fila", "perdeu")
+
+    def __init__(self, canal: str):
+        self.canal = canal
+        self.fila: "queue.Queue[str]" = queue.Queue(TAMANHO_FILA)
+        self.perdeu = False  # alguma mensagem foi descartada (fila cheia)
+
+    def proxima(self, espera: float) -> Optional[str]:
+        """Próxima mensagem, ou None se nada chegou em `espera` segundos"""
+        try:
+            return self.fila.get(timeout=espera)
+        except queue.Empty:
+            return None
+
+
+class Difusor:
+    """Distribui cada mensagem publicada num canal para todas as conexões do canal"""
+
+    def __init__(self, maximo: int = MAXIMO_ASSINANTES):
+        self.maximo = maximo
+        self._canais: Dict[str, Set[Assinatura]] = {}
+        self._guarda = threading.Lock()
+        self.publicadas = 0
+        self.perdidas = 0
+
+    def assinar(self, canal: str) -> Optional[Assinatura]:
+        """Nova conexão no canal; None se o worker já está no limite de conexões"""
+        with self._guarda:
+            if sum(len(assinaturas) for assinaturas in self._canais.values()) >= self.maximo:
+                return None
+            assinatura = Assinatura(canal)
+            self._canais.setdefault(canal, set()).add(assinatura)
+            return assinatura
+
+    def cancelar(self, assinatura: Assinatura):
+        with self._guarda:
+            assinaturas = self._canais.get(assinatura.canal)
+            if assinaturas is not None:
+                assinaturas.discard(assinatura)
+                if not assinaturas:
+                    del self._canais[assinatura.canal]
+
+    def publicar(self, canal: str, evento: str, dados: Dict) -> int:
+        """Enfileira o evento para as conexões do canal (sem esperar); retorna quantas"""
+        mensagem = formatar_evento(evento, dados)
+        with self._guarda:
+            assinaturas = list(self._canais.get(canal, ()))
+            self.publicadas += 1
+        for assinatura in assinaturas:
+            try:
+                assinatura.fila.put_nowait(mensagem)
+            except queue.Full:
+                assinatura.perdeu = True
+                self.perdidas += 1
+        return len(assinaturas)
+
+    def estatisticas(self) -> Dict:
+        with self._guarda:
+            conexoes = {canal: len(assinaturas) for canal, assinaturas in self._canais.items()}
+        return {"conexoes": conexoes, "maximo": self.maximo,
+                "publicadas": self.publicadas, "perdidas": self.perdidas}
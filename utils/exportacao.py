@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Exportação e importação do torneio completo em NDJSON (um registro JSON por linha)
+
+Registros, nesta ordem:
+  {"tipo": "cabecalho", "formato": 1, ...}
+  {"tipo": "jogador", "id", "nome", "sexo", "categorias", "confirmado"}
+  {"tipo": "sorteio", "categoria", "metadados"}
+  {"tipo": "rodada", "categoria", "posicao", "numero", "descansando"}
+  {"tipo": "confronto", "categoria", "rodada", "indice", "dupla1", "dupla2"[, "quadra"]}
+  {"tipo": "resultado", "categoria", "rodada", "indice", "games_dupla1", "games_dupla2", "finalizado"}
+  {"tipo": "ranking", "categoria", "dados"}
+
+A exportação é gerada linha a linha (uma categoria por vez em memória);
+a importação valida o arquivo inteiro antes de gravar e grava tudo de uma vez.
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+
+from utils.armazenamento import CATEGORIAS
+
+FORMATO_EXPORTACAO = 1
+
+TIPOS = ("cabecalho", "jogador", "sorteio", "rodada", "confronto", "resultado", "ranking")
+
+
+def _linha(registro: Dict) -> str:
+    return json.dumps(registro, ensure_ascii=False) + "\n"
+
+
+def exportar(backend, torneio: Optional[str] = None) -> Iterator[str]:
+    """Gera as linhas NDJSON do torneio guardado no backend"""
+    yield _linha({
+        "tipo": "cabecalho",
+        "formato": FORMATO_EXPORTACAO,
+        "torneio": torneio,
+        "exportado_em": datetime.now().isoformat()
+    })
+
+    for jogador in backend.carregar_jogadores(copiar=False):
+        yield _linha(dict(jogador, tipo="jogador"))
+
+    for categoria in CATEGORIAS:
+        dados = backend.carregar_rodadas(categoria, copiar=False)
+        if dados:
+            # seq_diario é detalhe do diário de resultados de cada instalação
+            metadados = {k: v for k, v in dados.items() if k not in ("rodadas", "seq_diario")}
+            yield _linha({"tipo": "sorteio", "categoria": categoria, "metadados": metadados})
+            for posicao, rodada in enumerate(dados.get("rodadas", [])):
+                yield _linha({
+                    "tipo": "rodada",
+                    "categoria": categoria,
+                    "posicao": posicao,
+                    "numero": rodada.get("numero"),
+                    "descansando": rodada.get("descansando", [])
+                })
+                for indice, confronto in enumerate(rodada.get("confrontos", [])):
+                    registro = {
+                        "tipo": "confronto",
+                        "categoria": categoria,
+                        "rodada": posicao,
+                        "indice": indice,
+                        "dupla1": confronto.get("dupla1"),
+                        "dupla2": confronto.get("dupla2")
+                    }
+                    if "quadra" in confronto:
+                        registro["quadra"] = confronto["quadra"]
+                    yield _linha(registro)
+                    resultado = confronto.get("resultado")
+                    if resultado:
+                        yield _linha(dict(resultado, tipo="resultado", categoria=categoria,
+                                          rodada=posicao, indice=indice))
+
+        ranking = backend.carregar_ranking(categoria, copiar=False)
+        if ranking:
+            yield _linha({"tipo": "ranking", "categoria": categoria, "dados": ranking})
+
+
+def ler_exportacao(linhas: Iterable) -> Dict:
+    """
+    Monta jogadores, rodadas e rankings a partir das linhas NDJSON (str ou bytes).
+    Levanta ValueError (com o número da linha) se algum registro for inválido.
+    """
+    jogadores = []
+    rodadas: Dict[str, Dict] = {}
+    rankings: Dict[str, Dict] = {}
+
+    for numero, linha in enumerate(linhas, start=1):
+        if isinstance(linha, bytes):
+            linha = linha.decode("utf-8")
+        linha = linha.strip()
+        if not linha:
+            continue
+        try:
+            registro = json.loads(linha)
+            if not isinstance(registro, dict):
+                raise ValueError("a linha não é um objeto JSON")
+            tipo = registro.pop("tipo")
+            if tipo not in TIPOS:
+                raise ValueError(f"tipo desconhecido: {tipo}")
+            if tipo == "cabecalho":
+                if registro.get("formato") != FORMATO_EXPORTACAO:
+                    raise ValueError(f"formato não suportado: {registro.get('formato')}")
+                continue
+            if tipo == "jogador":
+                if not isinstance(registro.get("id"), int) or not registro.get("nome"):
+                    raise ValueError("jogador sem id inteiro ou sem nome")
+                jogadores.append(registro)
+                continue
+
+            categoria = registro.pop("categoria")
+            if categoria not in CATEGORIAS:
+                raise ValueError(f"categoria inválida: {categoria}")
+            if tipo == "ranking":
+                rankings[categoria] = registro["dados"]
+            elif tipo == "sorteio":
+                rodadas[categoria] = dict(registro["metadados"], rodadas=[])
+            elif tipo == "rodada":
+                lista = rodadas[categoria]["rodadas"]
+                if registro["posicao"] != len(lista):
+                    raise ValueError("rodadas fora de ordem")
+                lista.append({"numero": registro["numero"], "confrontos": [],
+                              "descansando": registro.get("descansando", [])})
+            elif tipo == "confronto":
+                confrontos = rodadas[categoria]["rodadas"][registro["rodada"]]["confrontos"]
+                if registro["indice"] != len(confrontos):
+                    raise ValueError("confrontos fora de ordem")
+                confronto = {"dupla1": registro["dupla1"], "dupla2": registro.get("dupla2")}
+                if "quadra" in registro:
+                    confronto["quadra"] = registro["quadra"]
+                confrontos.append(confronto)
+            elif tipo == "resultado":
+                confronto = rodadas[categoria]["rodadas"][registro["rodada"]]["confrontos"][registro["indice"]]
+                confronto["resultado"] = {
+                    "games_dupla1": int(registro["games_dupla1"]),
+                    "games_dupla2": int(registro["games_dupla2"]),
+                    "finalizado": bool(registro.get("finalizado", True))
+                }
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            raise ValueError(f"Linha {numero}: registro inválido ({e})")
+
+    if len({j["id"] for j in jogadores}) != len(jogadores):
+        raise ValueError("Ids de jogadores repetidos")
+    return {"jogadores": jogadores, "rodadas": rodadas, "rankings": rankings}
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Quais requisições contam como visita (decidido antes de qualquer I/O)
+Regras, na ordem:
+  1. método fora de BT_VISITAS_METODOS (padrão: só GET) - descartada
+  2. caminho em BT_VISITAS_EXCLUIR, ou fora de BT_VISITAS_INCLUIR se definido - descartada
+  3. user-agent de robô (classificação guardada em cache LRU) - descartada
+  4. amostragem por caminho (BT_VISITAS_AMOSTRAGEM="/ranking*=0.25,/api/*=0.1"):
+     só uma fração é registrada e cada visita registrada vale 1/taxa nos contadores
+Padrões de caminho no formato do fnmatch, separados por vírgula.
+"""
+
+import os
+import random
+import re
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+METODOS_VISITAS = os.environ.get("BT_VISITAS_METODOS", "GET")
+INCLUIR_VISITAS = os.environ.get("BT_VISITAS_INCLUIR", "")
+EXCLUIR_VISITAS = os.environ.get(
+    "BT_VISITAS_EXCLUIR", "/static/*,/favicon.ico,/admin/cache,/admin/visitas/log,/api/visitas/*,/events/*"
+)
+AMOSTRAGEM_VISITAS = os.environ.get("BT_VISITAS_AMOSTRAGEM", "/ranking*=0.25,/api/*=0.1")
+
+_ROBO = re.compile(
+    r"bot|crawl|spider|slurp|scrap|fetch|monitor|uptime|preview|headless|lighthouse|"
+    r"curl|wget|python-requests|python-urllib|httpx|aiohttp|go-http-client|okhttp|java/|libwww|"
+    r"facebookexternalhit|whatsapp|telegram",
+    re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=2048)
+def eh_robo(user_agent: str) -> bool:
+    """User-agent de robô, monitor ou cliente HTTP de linha de comando (vazio conta como robô)"""
+    return not user_agent or _ROBO.search(user_agent) is not None
+
+
+def _padroes(texto: str) -> List[str]:
+    return [p.strip() for p in texto.split(",") if p.strip()]
+
+
+@lru_cache(maxsize=1024)
+def _taxa(caminho: str, incluir: Tuple[str, ...], excluir: Tuple[str, ...],
+          amostragem: Tuple[Tuple[str, float], ...]) -> Optional[float]:
+    """Taxa de amostragem do caminho (None se as regras de caminho o excluem)"""
+    if any(fnmatchcase(caminho, p) for p in excluir):
+        return None
+    if incluir and not any(fnmatchcase(caminho, p) for p in incluir):
+        return None
+    for padrao, taxa in amostragem:
+        if fnmatchcase(caminho, padrao):
+            return taxa
+    return 1.0
+
+
+def _amostragem(texto: str) -> List[Tuple[str, float]]:
+    regras = []
+    for item in _padroes(texto):
+        padrao, _, taxa = item.rpartition("=")
+        taxa = float(taxa)
+        if not padrao or not 0 < taxa <= 1:
+            raise ValueError(f"Regra de amostragem inválida: {item}")
+        regras.append((padrao, taxa))
+    return regras
+
+
+class FiltroVisitas:
+    """Decide, só com método, caminho e user-agent, se (e com que peso) uma requisição vira visita"""
+
+    def __init__(self, metodos: str = METODOS_VISITAS, incluir: str = INCLUIR_VISITAS,
+                 excluir: str = EXCLUIR_VISITAS, amostragem: str = AMOSTRAGEM_VISITAS):
+        self.metodos = {m.upper() for m in _padroes(metodos)}
+        # Tuplas: chave do cache de _taxa (que não guarda referência ao filtro)
+        self.incluir = tuple(_padroes(incluir))
+        self.excluir = tuple(_padroes(excluir))
+        self.amostragem = tuple(_amostragem(amostragem))
+        self.descartadas: Dict[str, int] = {"metodo": 0, "caminho": 0, "robo": 0, "amostragem": 0}
+
+    def avaliar(self, metodo: str, caminho: str, user_agent: str) -> Optional[int]:
+        """Peso da visita (1 = sem amostragem), ou None se ela não deve ser registrada"""
+        if metodo not in self.metodos:
+            self.descartadas["metodo"] += 1
+            return None
+        taxa = _taxa(caminho, self.incluir, self.excluir, self.amostragem)
+        if taxa is None:
+            self.descartadas["caminho"] += 1
+            return None
+        if eh_robo(user_agent):
+            self.descartadas["robo"] += 1
+            return None
+        if taxa < 1 and random.random() >= taxa:
+            self.descartadas["amostragem"] += 1
+            return None
+        return max(1, round(1 / taxa))
+
+    def estatisticas(self) -> Dict:
+        cache = eh_robo.cache_info()
+        return dict(self.descartadas, cache_robos={"acertos": cache.hits, "falhas": cache.misses,
+                                                   "tamanho": cache.currsize})
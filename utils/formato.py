@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Formatos de serialização dos arquivos de data/
+- "json-indentado": JSON com indent=2 (padrão, legível, igual ao formato original)
+- "json": JSON compacto, sem espaços
+- "orjson": JSON compacto gerado pelo orjson (requer o pacote orjson)
+- "msgpack": binário MessagePack (requer o pacote msgpack)
+
+O formato de gravação vem de BT_DATA_FORMAT. A leitura detecta o formato
+pelo conteúdo, então arquivos em formatos diferentes podem conviver em data/.
+"""
+
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+FORMATOS = ["json-indentado", "json", "orjson", "msgpack"]
+FORMATO_PADRAO = os.environ.get("BT_DATA_FORMAT", "json-indentado")
+
+# Primeiro byte significativo de um documento JSON
+_INICIO_JSON = frozenset(b'{["')
+_ESPACOS = b" \t\r\n"
+
+
+def validar_formato(formato: str) -> str:
+    """Confere se o formato existe e se a dependência opcional está instalada"""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: {formato}. Opções: {', '.join(FORMATOS)}")
+    if formato == "orjson" and orjson is None:
+        raise ValueError("Formato orjson requer o pacote orjson (pip install orjson)")
+    if formato == "msgpack" and msgpack is None:
+        raise ValueError("Formato msgpack requer o pacote msgpack (pip install msgpack)")
+    return formato
+
+
+def serializar(dados, formato: str = None) -> bytes:
+    """Converte os dados para bytes no formato pedido (ou no formato configurado)"""
+    formato = validar_formato(formato or FORMATO_PADRAO)
+    if formato == "json-indentado":
+        return json.dumps(dados, ensure_ascii=False, indent=2).encode("utf-8")
+    if formato == "json":
+        return json.dumps(dados, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if formato == "orjson":
+        return orjson.dumps(dados)
+    return msgpack.packb(dados, use_bin_type=True)
+
+
+def detectar_formato(conteudo: bytes) -> str:
+    """Identifica o formato de um arquivo pelo primeiro byte significativo"""
+    inicio = conteudo.lstrip(_ESPACOS)[:1]
+    if not inicio or inicio[0] in _INICIO_JSON:
+        return "json"
+    return "msgpack"
+
+
+def desserializar(conteudo: bytes):
+    """Lê bytes em qualquer um dos formatos. Conteúdo vazio retorna None"""
+    if not conteudo.strip(_ESPACOS):
+        return None
+    if detectar_formato(conteudo) == "json":
+        if orjson is not None:
+            return orjson.loads(conteudo)
+        return json.loads(conteudo.decode("utf-8"))
+    if msgpack is None:
+        raise ValueError("Arquivo em formato msgpack, mas o pacote msgpack não está instalado")
+    try:
+        return msgpack.unpackb(conteudo, raw=False)
+    except Exception as e:
+        raise ValueError(f"Arquivo msgpack inválido: {e}")
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Cadastro de jogadores com ids inteiros estáveis
+As rodadas guardam o id de cada jogador; o nome só é resolvido na hora de exibir.
+Assim, renomear um jogador é O(1) e variações como "Emmanuel " não quebram o ranking.
+"""
+
+from typing import Callable, Dict, List, Optional
+
+
+def normalizar_nome(nome) -> str:
+    """Remove espaços nas pontas e espaços repetidos"""
+    return " ".join(str(nome).split())
+
+
+def chave_nome(nome) -> str:
+    """Chave de comparação de nomes (sem diferenciar maiúsculas/minúsculas)"""
+    return normalizar_nome(nome).casefold()
+
+
+def atribuir_ids(jogadores: List[Dict], proximo_id: int = 1) -> bool:
+    """
+    Garante um id inteiro único para cada jogador e normaliza os nomes (in-place).
+    Ids novos começam em proximo_id (ver proximo_id_jogador dos backends): o id de um
+    jogador excluído nunca volta, pois os torneios arquivados ainda o referenciam.
+    Retorna True se algo mudou.
+    """
+    alterado = False
+    usados = set()
+    for j in jogadores:
+        nome = normalizar_nome(j.get("nome", ""))
+        if nome != j.get("nome"):
+            j["nome"] = nome
+            alterado = True
+        if isinstance(j.get("id"), int) and j["id"] not in usados:
+            usados.add(j["id"])
+
+    proximo = max(max(usados, default=0) + 1, proximo_id)
+    vistos = set()
+    for j in jogadores:
+        if isinstance(j.get("id"), int) and j["id"] not in vistos:
+            vistos.add(j["id"])
+            continue
+        j["id"] = proximo
+        vistos.add(proximo)
+        proximo += 1
+        alterado = True
+    return alterado
+
+
+class RegistroJogadores:
+    """Índices id -> jogador e nome -> id de uma lista de jogadores"""
+
+    def __init__(self, jogadores: List[Dict]):
+        self.por_id = {j["id"]: j for j in jogadores if "id" in j}
+        self._ids_por_nome = {chave_nome(j["nome"]): j["id"] for j in jogadores if "id" in j}
+
+    def nome(self, jogador) -> str:
+        """Nome de exibição; valores que não são id (nomes antigos) passam direto"""
+        if isinstance(jogador, int):
+            j = self.por_id.get(jogador)
+            return j["nome"] if j else f"#{jogador}"
+        return jogador
+
+    def id(self, nome) -> Optional[int]:
+        if isinstance(nome, int):
+            return nome
+        return self._ids_por_nome.get(chave_nome(nome))
+
+    def sexo(self, jogador) -> Optional[str]:
+        j = self.por_id.get(self.id(jogador))
+        return j["sexo"] if j else None
+
+
+# ============================================================================
+# CONVERSÃO DE RODADAS (NOMES <-> IDS)
+# ============================================================================
+
+def _mapear_jogadores(dados: Dict, funcao: Callable) -> Dict:
+    """Copia o documento de rodadas aplicando funcao a cada referência de jogador"""
+    def mapear_dupla(dupla):
+        if not dupla:
+            return dupla
+        return dict(dupla, jogador1=funcao(dupla["jogador1"]), jogador2=funcao(dupla["jogador2"]))
+
+    rodadas = []
+    for rodada in dados.get("rodadas", []):
+        confrontos = [
+            dict(c, dupla1=mapear_dupla(c.get("dupla1")), dupla2=mapear_dupla(c.get("dupla2")))
+            for c in rodada.get("confrontos", [])
+        ]
+        rodadas.append(dict(rodada, confrontos=confrontos,
+                            descansando=[funcao(j) for j in rodada.get("descansando", [])]))
+    return dict(dados, rodadas=rodadas)
+
+
+def usa_nomes(dados: Optional[Dict]) -> bool:
+    """True se o documento de rodadas ainda referencia jogadores pelo nome (formato antigo)"""
+    for rodada in (dados or {}).get("rodadas", []):
+        for confronto in rodada.get("confrontos", []):
+            return isinstance(confronto["dupla1"]["jogador1"], str)
+        for jogador in rodada.get("descansando", []):
+            return isinstance(jogador, str)
+    return False
+
+
+def codificar_rodadas(dados: Dict, registro: RegistroJogadores) -> Dict:
+    """Nomes -> ids (nomes fora do cadastro são mantidos como texto)"""
+    def para_id(jogador):
+        jogador_id = registro.id(jogador)
+        return jogador if jogador_id is None else jogador_id
+    return _mapear_jogadores(dados, para_id)
+
+
+def decodificar_rodadas(dados: Dict, registro: RegistroJogadores) -> Dict:
+    """Ids -> nomes, para exibição"""
+    return _mapear_jogadores(dados, registro.nome)
+
+
+def resolver_nomes_ranking(ranking: List[Dict], registro: RegistroJogadores) -> List[Dict]:
+    """Ranking calculado sobre ids: guarda o id e troca pelo nome de exibição (in-place)"""
+    for linha in ranking:
+        jogador = linha["nome"]
+        if isinstance(jogador, int):
+            linha["id"] = jogador
+        linha["nome"] = registro.nome(jogador)
+    return ranking
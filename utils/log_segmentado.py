@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+Log append-only em segmentos (NDJSON), lido do mais recente para o mais antigo
+
+Arquivos no diretório do log:
+  <seq>-<inicio>.ndjson               segmento ativo, em ordem cronológica (append)
+  <seq>-<inicio>-<bytes>.ndjson.gz    segmento selado, compactado e em ordem INVERSA
+
+O segmento ativo é selado quando passa de tamanho_maximo bytes ou de duracao_maxima
+segundos desde o início. Ao selar, as linhas são gravadas da mais recente para a
+mais antiga, assim a leitura "mais recentes primeiro" descompacta em sequência,
+sem carregar o segmento inteiro. <bytes> é o tamanho do segmento descompactado.
+
+Cursor: "<seq>:<posição>" = entradas do segmento seq que terminam até a posição
+(em bytes, na ordem cronológica original). Vale igual antes e depois de o segmento
+ser selado, então a paginação continua certa mesmo com rotações entre as páginas.
+
+Retenção: segmentos selados há mais de retencao_dias, ou além de retencao_bytes
+(compactados, somando dos mais novos para os mais antigos), são apagados.
+
+Registros compactos (anexar_registros): cada registro é um array JSON e as posições
+em campos_texto guardam o id do texto no dicionário do segmento, <seq>.dic
+(um texto JSON por linha, id = número da linha; <seq>.dic.gz depois de selado).
+Textos novos entram no dicionário antes dos registros que os usam.
+"""
+
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils.arquivos import bloqueio
+
+_ATIVO = re.compile(r"^(\d+)-(\d+)\.ndjson$")
+_SELADO = re.compile(r"^(\d+)-(\d+)-(\d+)\.ndjson\.gz$")
+
+
+def _linhas_de_tras_para_frente(arquivo: str, fim: int, bloco: int = 64 * 1024) -> Iterator[Tuple[int, bytes]]:
+    """(início, linha) das linhas completas que terminam até fim, da última para a primeira"""
+    with open(arquivo, "rb") as f:
+        posicao = fim
+        resto = b""
+        while posicao > 0:
+            tamanho = min(bloco, posicao)
+            posicao -= tamanho
+            f.seek(posicao)
+            dados = f.read(tamanho) + resto
+            linhas = dados.split(b"\n")
+            resto = linhas[0]
+            final = posicao + len(dados)
+            for linha in reversed(linhas[1:]):
+                final -= len(linha) + 1
+                if linha:
+                    yield final + 1, linha
+        if resto:
+            yield 0, resto
+
+
+class LogSegmentado:
+    """Log NDJSON segmentado, rotacionado, compactado e com retenção"""
+
+    def __init__(self, diretorio: str, tamanho_maximo: int, duracao_maxima: int,
+                 retencao_dias: int, retencao_bytes: int, campos_texto: Sequence[int] = ()):
+        self.diretorio = diretorio
+        self.tamanho_maximo = tamanho_maximo
+        self.duracao_maxima = duracao_maxima
+        self.retencao_dias = retencao_dias
+        self.retencao_bytes = retencao_bytes
+        self.campos_texto = tuple(campos_texto)
+        # Dicionário do segmento ativo para o gravador: (seq, {texto: id}, bytes lidos)
+        self._dicionario_gravacao: Optional[Tuple[int, Dict[str, int], int]] = None
+        # Dicionários para leitura: seq -> (textos, bytes lidos); os selados não mudam mais
+        self._dicionarios: "OrderedDict[int, Tuple[List[str], int]]" = OrderedDict()
+        self._dicionarios_guarda = threading.RLock()
+        os.makedirs(diretorio, exist_ok=True)
+
+    def bloqueio(self):
+        return bloqueio(os.path.join(self.diretorio, "segmentos"))
+
+    def segmentos(self) -> List[Dict]:
+        """Segmentos do mais recente para o mais antigo"""
+        segmentos = []
+        for nome in os.listdir(self.diretorio):
+            ativo = _ATIVO.match(nome)
+            if ativo:
+                segmentos.append({"seq": int(ativo.group(1)), "inicio": int(ativo.group(2)),
+                                  "selado": False, "arquivo": os.path.join(self.diretorio, nome)})
+                continue
+            selado = _SELADO.match(nome)
+            if selado:
+                segmentos.append({"seq": int(selado.group(1)), "inicio": int(selado.group(2)),
+                                  "selado": True, "bytes": int(selado.group(3)),
+                                  "arquivo": os.path.join(self.diretorio, nome)})
+        segmentos.sort(key=lambda s: s["seq"], reverse=True)
+        return segmentos
+
+    def arquivo_dicionario(self, seq: int, selado: bool) -> str:
+        return os.path.join(self.diretorio, f"{seq:08d}.dic" + (".gz" if selado else ""))
+
+    # ---------------------------------------------------------------- gravação
+
+    def anexar(self, linhas: bytes, ao_gravar: Optional[Callable] = None):
+        """
+        Acrescenta linhas NDJSON (terminadas em \\n) ao segmento ativo, com um único write.
+        ao_gravar roda ainda sob o bloqueio do log (ex.: manter agregados em sincronia).
+        """
+        with self.bloqueio():
+            self._anexar(self._segmento_ativo(), linhas, ao_gravar)
+
+    def anexar_registros(self, registros: List[list], ao_gravar: Optional[Callable] = None):
+        """Como anexar, trocando os textos das posições campos_texto pelos ids do dicionário"""
+        with self.bloqueio():
+            ativo = self._segmento_ativo()
+            textos = self._sincronizar_dicionario(ativo["seq"])
+            novos = []
+            linhas = []
+            for registro in registros:
+                registro = list(registro)
+                for posicao in self.campos_texto:
+                    texto = registro[posicao]
+                    if texto is None:
+                        continue
+                    identificador = textos.get(texto)
+                    if identificador is None:
+                        identificador = textos[texto] = len(textos)
+                        novos.append(texto)
+                    registro[posicao] = identificador
+                linhas.append(json.dumps(registro, separators=(",", ":")))
+            if novos:
+                # Dicionário primeiro: um leitor nunca vê um id sem o texto correspondente
+                conteudo = "".join(json.dumps(texto, ensure_ascii=False) + "\n" for texto in novos).encode("utf-8")
+                with open(self.arquivo_dicionario(ativo["seq"], False), "ab") as f:
+                    f.write(conteudo)
+                seq, _, lidos = self._dicionario_gravacao
+                self._dicionario_gravacao = (seq, textos, lidos + len(conteudo))
+            self._anexar(ativo, ("\n".join(linhas) + "\n").encode("utf-8"), ao_gravar)
+
+    def _sincronizar_dicionario(self, seq: int) -> Dict[str, int]:
+        """Dicionário do segmento ativo, com os textos acrescentados por outros workers"""
+        if self._dicionario_gravacao is None or self._dicionario_gravacao[0] != seq:
+            self._dicionario_gravacao = (seq, {}, 0)
+        _, textos, lidos = self._dicionario_gravacao
+        try:
+            with open(self.arquivo_dicionario(seq, False), "rb") as f:
+                f.seek(lidos)
+                conteudo = f.read()
+        except FileNotFoundError:
+            conteudo = b""
+        conteudo = conteudo[:conteudo.rfind(b"\n") + 1]
+        for linha in conteudo.splitlines():
+            textos.setdefault(json.loads(linha), len(textos))
+        self._dicionario_gravacao = (seq, textos, lidos + len(conteudo))
+        return textos
+
+    def _segmento_ativo(self) -> Dict:
+        segmentos = self.segmentos()
+        if segmentos and not segmentos[0]["selado"]:
+            return segmentos[0]
+        seq = segmentos[0]["seq"] + 1 if segmentos else 1
+        inicio = int(time.time())
+        return {"seq": seq, "inicio": inicio, "arquivo": os.path.join(self.diretorio, f"{seq:08d}-{inicio}.ndjson")}
+
+    def _anexar(self, ativo: Dict, linhas: bytes, ao_gravar: Optional[Callable]):
+        with open(ativo["arquivo"], "ab") as f:
+            f.write(linhas)
+            tamanho = f.tell()
+        if ao_gravar is not None:
+            ao_gravar()
+        if tamanho >= self.tamanho_maximo or time.time() - ativo["inicio"] >= self.duracao_maxima:
+            self._selar(ativo)
+            self._aplicar_retencao()
+
+    def _selar(self, ativo: Dict):
+        with open(ativo["arquivo"], "rb") as f:
+            conteudo = f.read()
+        linhas = conteudo.split(b"\n")
+        if linhas and not linhas[-1]:
+            linhas.pop()
+        nome = f"{ativo['seq']:08d}-{ativo['inicio']}-{len(conteudo)}.ndjson.gz"
+        destino = os.path.join(self.diretorio, nome)
+        temporario = os.path.join(self.diretorio, ".tmp-" + nome)
+        with gzip.open(temporario, "wb") as f:
+            for linha in reversed(linhas):
+                f.write(linha + b"\n")
+        dicionario = self.arquivo_dicionario(ativo["seq"], False)
+        if os.path.exists(dicionario):
+            dicionario_selado = self.arquivo_dicionario(ativo["seq"], True)
+            temporario_dicionario = os.path.join(self.diretorio, ".tmp-" + os.path.basename(dicionario_selado))
+            with open(dicionario, "rb") as f, gzip.open(temporario_dicionario, "wb") as g:
+                g.write(f.read())
+            os.replace(temporario_dicionario, dicionario_selado)
+        os.replace(temporario, destino)
+        os.remove(ativo["arquivo"])
+        if os.path.exists(dicionario):
+            os.remove(dicionario)
+
+    def _aplicar_retencao(self):
+        limite = time.time() - self.retencao_dias * 86400
+        acumulado = 0
+        for segmento in self.segmentos():
+            if not segmento["selado"]:
+                continue
+            st = os.stat(segmento["arquivo"])
+            acumulado += st.st_size
+            if st.st_mtime < limite or acumulado > self.retencao_bytes:
+                os.remove(segmento["arquivo"])
+                dicionario = self.arquivo_dicionario(segmento["seq"], True)
+                if os.path.exists(dicionario):
+                    os.remove(dicionario)
+
+    # ----------------------------------------------------------------- leitura
+
+    def _entradas(self, segmento: Dict, posicao: Optional[int]) -> Iterator[Tuple[int, bytes]]:
+        """(início, linha) das entradas do segmento que terminam até a posição, mais recentes primeiro"""
+        if not segmento["selado"]:
+            if posicao is None:
+                posicao = os.path.getsize(segmento["arquivo"])
+            with open(segmento["arquivo"], "rb") as f:
+                # Ignora uma linha final ainda incompleta (gravação em andamento)
+                f.seek(max(0, posicao - 1))
+                if posicao and f.read(1) != b"\n":
+                    posicao = self._ultimo_fim_de_linha(segmento["arquivo"], posicao)
+            yield from _linhas_de_tras_para_frente(segmento["arquivo"], posicao)
+            return
+
+        final = segmento["bytes"]
+        with gzip.open(segmento["arquivo"], "rb") as f:
+            for linha in f:
+                inicio = final - len(linha)
+                if posicao is None or final <= posicao:
+                    yield inicio, linha.rstrip(b"\n")
+                final = inicio
+
+    @staticmethod
+    def _ultimo_fim_de_linha(arquivo: str, posicao: int) -> int:
+        for inicio, _ in _linhas_de_tras_para_frente(arquivo, posicao):
+            return inicio  # a primeira "linha" devolvida é o pedaço incompleto
+        return 0
+
+    def ler(self, cursor: Optional[str] = None, limite: int = 50) -> Tuple[List[Tuple[int, bytes]], Optional[str]]:
+        """Até limite linhas (seq, linha), das mais recentes para as mais antigas, e o cursor da próxima página"""
+        seq, posicao = None, None
+        if cursor:
+            try:
+                seq, posicao = (int(parte) for parte in cursor.split(":"))
+            except ValueError:
+                raise ValueError(f"Cursor inválido: {cursor}")
+
+        for _ in range(3):  # o segmento ativo pode ser selado entre a listagem e a leitura
+            try:
+                return self._ler(seq, posicao, limite)
+            except FileNotFoundError:
+                continue
+        return self._ler(seq, posicao, limite)
+
+    def _ler(self, seq: Optional[int], posicao: Optional[int], limite: int):
+        linhas: List[Tuple[int, bytes]] = []
+        segmentos = [s for s in self.segmentos() if seq is None or s["seq"] <= seq]
+        for segmento in segmentos:
+            limite_segmento = posicao if segmento["seq"] == seq else None
+            for inicio, linha in self._entradas(segmento, limite_segmento):
+                if len(linhas) == limite:
+                    return linhas, f"{segmento['seq']}:{inicio + len(linha) + 1}"
+                linhas.append((segmento["seq"], linha))
+        return linhas, None
+
+    def percorrer(self) -> Iterator[Tuple[int, bytes]]:
+        """Todas as linhas (seq, linha), das mais recentes para as mais antigas (em streaming)"""
+        for segmento in self.segmentos():
+            try:
+                for _, linha in self._entradas(segmento, None):
+                    yield segmento["seq"], linha
+            except FileNotFoundError:
+                continue
+
+    # ------------------------------------------------------------- dicionários
+
+    def decodificar(self, seq: int, registro: list) -> list:
+        """Troca os ids das posições campos_texto pelos textos do dicionário do segmento seq"""
+        textos = self._dicionario(seq, max(
+            (registro[p] for p in self.campos_texto if registro[p] is not None), default=-1))
+        for posicao in self.campos_texto:
+            if registro[posicao] is not None:
+                registro[posicao] = textos[registro[posicao]]
+        return registro
+
+    def _dicionario(self, seq: int, maior_id: int) -> List[str]:
+        with self._dicionarios_guarda:
+            return self._carregar_dicionario(seq, maior_id)
+
+    def _carregar_dicionario(self, seq: int, maior_id: int) -> List[str]:
+        textos, lidos = self._dicionarios.get(seq, ([], 0))
+        if maior_id >= len(textos):
+            selado = self.arquivo_dicionario(seq, True)
+            if os.path.exists(selado):
+                with gzip.open(selado, "rb") as f:
+                    textos, lidos = [json.loads(linha) for linha in f], -1
+            else:
+                # Segmento ativo: lê só o que foi acrescentado (ou o selado, se acabou de selar)
+                try:
+                    with open(self.arquivo_dicionario(seq, False), "rb") as f:
+                        f.seek(lidos)
+                        conteudo = f.read()
+                except FileNotFoundError:
+                    return self._carregar_dicionario(seq, maior_id) if os.path.exists(selado) else textos
+                conteudo = conteudo[:conteudo.rfind(b"\n") + 1]
+                textos = textos + [json.loads(linha) for linha in conteudo.splitlines()]
+                lidos += len(conteudo)
+        self._dicionarios[seq] = (textos, lidos)
+        self._dicionarios.move_to_end(seq)
+        while len(self._dicionarios) > 16:
+            self._dicionarios.popitem(last=False)
+        return textos
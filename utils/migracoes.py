@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Versão do esquema de dados e migrações
+As migrações rodam uma única vez, na inicialização, e deixam os dados no esquema
+atual. Daí em diante os carregadores assumem o esquema atual: nada de completar
+chaves ou procurar arquivos antigos a cada requisição.
+
+Versões:
+  1 - jogadores completos: "confirmado", "categorias", id inteiro e nome normalizado
+  2 - data/rodadas.json e data/ranking.json viram a categoria mista
+      (rodadas_mista.json / ranking_mista.json)
+  3 - rodadas referenciam jogadores pelo id
+"""
+
+from typing import Callable, List, Tuple
+
+from utils.armazenamento import CATEGORIAS
+from utils.jogadores import RegistroJogadores, atribuir_ids, codificar_rodadas, usa_nomes
+
+
+def _jogadores_completos(backend):
+    def completar(jogadores):
+        alterado = atribuir_ids(jogadores, backend.proximo_id_jogador())
+        for j in jogadores:
+            if "confirmado" not in j:
+                j["confirmado"] = False
+                alterado = True
+            if "categorias" not in j:
+                j["categorias"] = ["mista"]
+                alterado = True
+        return jogadores if alterado else None
+    backend.atualizar_jogadores(completar)
+
+
+def _legado_para_mista(backend):
+    rodadas = backend.carregar_rodadas(None)
+    if rodadas and not backend.carregar_rodadas("mista", copiar=False):
+        backend.salvar_rodadas("mista", dict(rodadas, categoria="mista"))
+    ranking = backend.carregar_ranking(None)
+    if ranking and not backend.carregar_ranking("mista", copiar=False):
+        backend.salvar_ranking("mista", dict(ranking, categoria="mista"))
+    backend.remover_legado()
+
+
+def _rodadas_com_ids(backend):
+    registro = RegistroJogadores(backend.carregar_jogadores(copiar=False))
+    for categoria in CATEGORIAS:
+        backend.reescrever_rodadas(
+            categoria, lambda atuais: codificar_rodadas(atuais, registro) if usa_nomes(atuais) else None
+        )
+
+
+MIGRACOES: List[Tuple[int, Callable]] = [
+    (1, _jogadores_completos),
+    (2, _legado_para_mista),
+    (3, _rodadas_com_ids),
+]
+
+ESQUEMA_ATUAL = MIGRACOES[-1][0]
+
+
+def migrar(backend) -> List[int]:
+    """Aplica as migrações pendentes (uma vez, mesmo com vários workers); retorna as versões aplicadas"""
+    if backend.versao_esquema() >= ESQUEMA_ATUAL:
+        return []
+
+    aplicadas = []
+    with backend.bloqueio_migracao():
+        versao = backend.versao_esquema()  # outro worker pode ter migrado enquanto esperávamos
+        for numero, migracao in MIGRACOES:
+            if numero > versao:
+                migracao(backend)
+                backend.definir_versao_esquema(numero)
+                aplicadas.append(numero)
+    return aplicadas
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Ranking individual mantido de forma incremental
+Guarda os totais de cada jogador e a ordem do ranking (lista ordenada pela chave de
+desempate). Um placar novo ou editado desfaz o placar anterior do confronto, soma o
+novo nos 4 jogadores e reposiciona só esses jogadores (busca binária):
+O(jogadores do confronto + log n) por placar, em vez de recalcular tudo.
+O resultado é idêntico ao de calcular_ranking_individual.
+
+O motor mantém também o índice de parcerias e confrontos entre jogadores
+(IndicePares), atualizado pela mesma soma/desfazer de cada placar.
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from utils.sorteio_rodadas import chave_ranking
+
+Chave = Tuple[int, int]  # (rodada_idx, confronto_idx)
+
+
+def _estrutura(dados: Dict) -> Tuple[Dict[Chave, Tuple], List]:
+    """Duplas de cada confronto e jogadores descansando de cada rodada"""
+    confrontos = {}
+    descansando = []
+    for r, rodada in enumerate(dados.get("rodadas", [])):
+        for c, confronto in enumerate(rodada.get("confrontos", [])):
+            dupla1 = confronto["dupla1"]
+            dupla2 = confronto.get("dupla2")  # Pode ser None em caso de bye
+            confrontos[(r, c)] = (
+                (dupla1["jogador1"], dupla1["jogador2"]),
+                (dupla2["jogador1"], dupla2["jogador2"]) if dupla2 else None
+            )
+        descansando.append(rodada.get("descansando", []))
+    return confrontos, descansando
+
+
+# Colunas de cada par no IndicePares (do ponto de vista do primeiro jogador)
+COLUNAS_PAR = ("jogos", "vitorias", "games_feitos", "games_sofridos")
+
+
+class IndicePares:
+    """
+    Matriz esparsa jogador × jogador (só os pares que já jogaram juntos ou contra),
+    guardada por linhas: parcerias[a][b] e adversarios[a][b] = [jogos, vitorias,
+    games_feitos, games_sofridos] de a com b como parceiro / contra b.
+    Consulta de um par em O(1); um placar soma ou desfaz 12 células.
+    """
+
+    __slots__ = ("parcerias", "adversarios")
+
+    def __init__(self):
+        self.parcerias: Dict[object, Dict[object, List[int]]] = {}
+        self.adversarios: Dict[object, Dict[object, List[int]]] = {}
+
+    @staticmethod
+    def _somar_celula(matriz: Dict, a, b, venceu: bool, feitos: int, sofridos: int, sinal: int):
+        linha = matriz.setdefault(a, {})
+        celula = linha.get(b)
+        if celula is None:
+            celula = linha[b] = [0, 0, 0, 0]
+        celula[0] += sinal
+        celula[1] += sinal if venceu else 0
+        celula[2] += feitos * sinal
+        celula[3] += sofridos * sinal
+        if celula[0] == 0:  # placar desfeito: o par sai da matriz
+            del linha[b]
+            if not linha:
+                del matriz[a]
+
+    def somar(self, dupla1: Tuple, dupla2: Tuple, games_d1: int, games_d2: int, sinal: int):
+        """Soma (sinal=1) ou desfaz (sinal=-1) um placar nos pares do confronto"""
+        venceu_dupla1 = games_d1 > games_d2
+        for dupla, outra, feitos, sofridos, venceu in ((dupla1, dupla2, games_d1, games_d2, venceu_dupla1),
+                                                       (dupla2, dupla1, games_d2, games_d1, not venceu_dupla1)):
+            for i, jogador in enumerate(dupla):
+                self._somar_celula(self.parcerias, jogador, dupla[1 - i], venceu, feitos, sofridos, sinal)
+                for adversario in outra:
+                    self._somar_celula(self.adversarios, jogador, adversario, venceu, feitos, sofridos, sinal)
+
+    def linha(self, tipo: str, jogador) -> Dict[object, List[int]]:
+        """Pares do jogador em "parcerias" ou "adversarios" (compartilhado: não modificar)"""
+        return getattr(self, tipo).get(jogador, {})
+
+
+def _placar(confronto: Dict) -> Optional[Tuple[int, int]]:
+    resultado = confronto.get("resultado") or {}
+    if not resultado.get("finalizado", False):
+        return None
+    return resultado.get("games_dupla1", 0), resultado.get("games_dupla2", 0)
+
+
+class MotorRanking:
+    """Totais por jogador e ordem do ranking de uma categoria (um sorteio)"""
+
+    def __init__(self, dados: Dict):
+        self.confrontos, self._descansando = _estrutura(dados)
+        self.aplicados: Dict[Chave, Tuple[int, int]] = {}
+        self.stats: Dict[object, Dict] = {}
+        self.pares = IndicePares()
+        for dupla1, dupla2 in self.confrontos.values():
+            for jogador in dupla1 + (dupla2 or ()):
+                self._iniciar(jogador)
+        for jogadores in self._descansando:
+            for jogador in jogadores:
+                self._iniciar(jogador)
+
+        self.base = None  # snapshot das rodadas já incorporado
+        self.ultima_atualizacao: Optional[str] = None
+        self.marca = object()  # trocada a cada mudança (chave dos memos)
+        self._linhas: Dict[object, Dict] = {}
+        self._registro = None
+
+        for chave, confronto in self._iterar(dados):
+            placar = _placar(confronto)
+            if placar is not None and self.confrontos[chave][1]:
+                self.aplicados[chave] = placar
+                self._somar(chave, placar, 1)
+        self._chaves = {jogador: chave_ranking(stat) for jogador, stat in self.stats.items()}
+        self._ordem = sorted(self._chaves.values())
+
+    def _iniciar(self, jogador):
+        if jogador not in self.stats:
+            self.stats[jogador] = {
+                "nome": jogador,
+                "vitorias": 0,
+                "derrotas": 0,
+                "games_feitos": 0,
+                "games_sofridos": 0,
+                "jogos_realizados": 0,
+                "saldo_games": 0
+            }
+
+    @staticmethod
+    def _iterar(dados: Dict):
+        for r, rodada in enumerate(dados.get("rodadas", [])):
+            for c, confronto in enumerate(rodada.get("confrontos", [])):
+                yield (r, c), confronto
+
+    def _somar(self, chave: Chave, placar: Tuple[int, int], sinal: int):
+        """Soma (sinal=1) ou desfaz (sinal=-1) um placar nos totais dos 4 jogadores"""
+        dupla1, dupla2 = self.confrontos[chave]
+        games_d1, games_d2 = placar
+        venceu_dupla1 = games_d1 > games_d2
+        for dupla, feitos, sofridos, venceu in ((dupla1, games_d1, games_d2, venceu_dupla1),
+                                                (dupla2, games_d2, games_d1, not venceu_dupla1)):
+            for jogador in dupla:
+                stat = self.stats[jogador]
+                stat["jogos_realizados"] += sinal
+                stat["games_feitos"] += feitos * sinal
+                stat["games_sofridos"] += sofridos * sinal
+                stat["saldo_games"] += (feitos - sofridos) * sinal
+                stat["vitorias" if venceu else "derrotas"] += sinal
+        self.pares.somar(dupla1, dupla2, games_d1, games_d2, sinal)
+
+    # ---------------------------------------------------------------- mudanças
+
+    def aplicar(self, chave: Chave, placar: Optional[Tuple[int, int]]) -> bool:
+        """Troca o placar do confronto (None = sem resultado); retorna se algo mudou"""
+        dupla1, dupla2 = self.confrontos[chave]
+        anterior = self.aplicados.get(chave)
+        if not dupla2 or anterior == placar:
+            return False
+        if anterior is not None:
+            self._somar(chave, anterior, -1)
+            del self.aplicados[chave]
+        if placar is not None:
+            self._somar(chave, placar, 1)
+            self.aplicados[chave] = placar
+
+        for jogador in dupla1 + dupla2:
+            antiga, nova = self._chaves[jogador], chave_ranking(self.stats[jogador])
+            if antiga != nova:
+                del self._ordem[bisect_left(self._ordem, antiga)]
+                insort(self._ordem, nova)
+                self._chaves[jogador] = nova
+            self._linhas.pop(jogador, None)
+        self.marca = object()
+        return True
+
+    def registrar(self, chave: Chave, placar: Tuple[int, int], timestamp: str):
+        """Placar novo ou editado em tempo real (a hora do resultado muda mesmo se o placar é o mesmo)"""
+        self.aplicar(chave, placar)
+        self.ultima_atualizacao = max(self.ultima_atualizacao or "", timestamp)
+        self.marca = object()
+
+    def mesmo_sorteio(self, dados: Dict) -> bool:
+        """Mesmos confrontos e descansos (só placares podem ter mudado)"""
+        return _estrutura(dados) == (self.confrontos, self._descansando)
+
+    def sincronizar(self, base: Dict, placares: Dict[Chave, Tuple[int, int, str]]):
+        """
+        Incorpora um novo snapshot das rodadas (gravado por este ou outro worker) com os
+        placares pendentes por cima: só os confrontos que diferem são reaplicados.
+        """
+        for chave, confronto in self._iterar(base):
+            pendente = placares.get(chave)
+            self.aplicar(chave, pendente[:2] if pendente else _placar(confronto))
+        ultimas = [base.get("ultimo_resultado") or ""] + [ts for _, _, ts in placares.values()]
+        self.ultima_atualizacao = max(ultimas) or None
+        self.base = base
+        self.marca = object()
+
+    # ----------------------------------------------------------------- leitura
+
+    def linhas(self, registro) -> List[Dict]:
+        """
+        Ranking na ordem, no formato de calcular_ranking_individual com os nomes
+        resolvidos (como resolver_nomes_ranking). Linhas de jogadores que não mudaram
+        são reaproveitadas: compartilhadas, NÃO modificar.
+        """
+        if registro is not self._registro:
+            self._linhas.clear()
+            self._registro = registro
+        resultado = []
+        for chave in self._ordem:
+            jogador = chave[-1][1]
+            linha = self._linhas.get(jogador)
+            if linha is None:
+                linha = self._linha(jogador, registro)
+                self._linhas[jogador] = linha
+            resultado.append(linha)
+        return resultado
+
+    def _linha(self, jogador, registro) -> Dict:
+        stat = self.stats[jogador]
+        jogos = stat["jogos_realizados"]
+        linha = {
+            "nome": registro.nome(jogador),
+            "vitorias": stat["vitorias"],
+            "derrotas": stat["derrotas"],
+            "games_feitos": stat["games_feitos"],
+            "games_sofridos": stat["games_sofridos"],
+            "jogos_realizados": jogos,
+            "saldo_games": stat["saldo_games"],
+            "percentual_vitorias": round((stat["vitorias"] / jogos) * 100, 1) if jogos > 0 else 0.0
+        }
+        if isinstance(jogador, int):
+            linha["id"] = jogador
+        return linha
+
+
+# Listas de linhas de um ranking formatado (masculino/feminino na mista)
+LISTAS_RANKING = ("ranking", "masculino", "feminino")
+
+
+def _chave_linha(linha: Dict):
+    return linha.get("id", linha["nome"])
+
+
+def diferenca_ranking(anterior: Dict, atual: Dict) -> Dict[str, Dict]:
+    """
+    Por lista do ranking, só as linhas que mudaram (valores ou posição) entre duas
+    versões, com a posição nova em "posicao" (1 = primeiro). "total" é o tamanho atual
+    da lista: quem aplica a diferença percebe jogadores que entraram ou saíram.
+    """
+    diferenca = {}
+    for lista in LISTAS_RANKING:
+        if lista not in atual:
+            continue
+        antigas = {_chave_linha(linha): (posicao, linha) for posicao, linha in enumerate(anterior.get(lista) or [])}
+        mudaram = []
+        for posicao, linha in enumerate(atual[lista]):
+            antiga = antigas.get(_chave_linha(linha))
+            # Linhas de jogadores que não mudaram são os mesmos objetos (MotorRanking.linhas)
+            if antiga is None or antiga[0] != posicao or (antiga[1] is not linha and antiga[1] != linha):
+                mudaram.append(dict(linha, posicao=posicao + 1))
+        diferenca[lista] = {"total": len(atual[lista]), "linhas": mudaram}
+    return diferenca
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Ranking individual calculado com NumPy (opcional: requer o pacote numpy)
+Os placares viram vetores de inteiros (4 jogadores por confronto) e os totais de cada
+jogador saem de somas vetorizadas (np.bincount); a ordem sai de np.lexsort com as
+mesmas chaves de chave_ranking. O resultado é idêntico ao de calcular_ranking_individual.
+
+Só compensa com muitos confrontos (temporada, liga): calcular_ranking escolhe entre as
+duas implementações pelo tamanho. O ponto de virada foi medido com
+tools/benchmark_ranking.py e pode ser ajustado em BT_RANKING_VETORIZADO_MINIMO.
+"""
+
+import os
+from typing import Dict, List
+
+from utils.sorteio_rodadas import calcular_ranking_individual, chave_jogador
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Confrontos a partir dos quais a versão vetorizada é usada (se o numpy estiver instalado)
+MINIMO_CONFRONTOS = int(os.environ.get("BT_RANKING_VETORIZADO_MINIMO", "200"))
+
+
+def disponivel() -> bool:
+    return np is not None
+
+
+def calcular_ranking_vetorizado(rodadas: List[Dict]) -> List[Dict]:
+    """
+    Mesmo resultado de calcular_ranking_individual (TODOS os jogadores, mesma ordem,
+    mesmas chaves), com os totais somados pelo numpy
+    """
+    if np is None:
+        raise RuntimeError("Ranking vetorizado requer o pacote numpy (pip install numpy)")
+
+    # Índice de cada jogador, na ordem em que aparece (confrontos e descansos)
+    indices: Dict[object, int] = {}
+    jogadores_placar: List[int] = []  # 4 por confronto: dupla1 (2) e dupla2 (2)
+    games: List[int] = []             # 2 por confronto: games_dupla1, games_dupla2
+    for rodada in rodadas:
+        for confronto in rodada.get("confrontos", []):
+            dupla1 = confronto["dupla1"]
+            dupla2 = confronto.get("dupla2")  # Pode ser None em caso de bye
+            quatro = [indices.setdefault(dupla1["jogador1"], len(indices)),
+                      indices.setdefault(dupla1["jogador2"], len(indices))]
+            if not dupla2:
+                continue
+            quatro.append(indices.setdefault(dupla2["jogador1"], len(indices)))
+            quatro.append(indices.setdefault(dupla2["jogador2"], len(indices)))
+
+            resultado = confronto.get("resultado", {})
+            if resultado.get("finalizado", False):
+                jogadores_placar.extend(quatro)
+                games.append(resultado.get("games_dupla1", 0))
+                games.append(resultado.get("games_dupla2", 0))
+        for jogador in rodada.get("descansando", []):
+            indices.setdefault(jogador, len(indices))
+
+    total = len(indices)
+    if total == 0:
+        return []
+
+    # Linha por jogador em cada confronto: feitos/sofridos vêm da dupla do jogador
+    participantes = np.array(jogadores_placar, dtype=np.int64)
+    placares = np.array(games, dtype=np.int64).reshape(-1, 2)
+    d1, d2 = placares[:, 0], placares[:, 1]
+    feitos = np.column_stack((d1, d1, d2, d2)).ravel()
+    sofridos = np.column_stack((d2, d2, d1, d1)).ravel()
+    # Como em calcular_ranking_individual: a dupla1 vence só com mais games; senão vence a dupla2
+    venceu_d1 = d1 > d2
+    venceu = np.column_stack((venceu_d1, venceu_d1, ~venceu_d1, ~venceu_d1)).ravel()
+
+    jogos = np.bincount(participantes, minlength=total)
+    vitorias = np.bincount(participantes, weights=venceu, minlength=total).astype(np.int64)
+    games_feitos = np.bincount(participantes, weights=feitos, minlength=total).astype(np.int64)
+    games_sofridos = np.bincount(participantes, weights=sofridos, minlength=total).astype(np.int64)
+    derrotas = jogos - vitorias
+    saldo = games_feitos - games_sofridos
+
+    # Desempate final pelo jogador: posição de cada um na ordem de chave_jogador (ids e nomes)
+    jogadores = list(indices)
+    posicao_nome = np.empty(total, dtype=np.int64)
+    posicao_nome[sorted(range(total), key=lambda i: chave_jogador(jogadores[i]))] = np.arange(total)
+
+    # np.lexsort ordena pela ÚLTIMA chave primeiro (mesmas chaves de chave_ranking)
+    ordem = np.lexsort((posicao_nome, games_sofridos, -games_feitos, -saldo, -vitorias))
+
+    colunas = zip(ordem.tolist(), vitorias[ordem].tolist(), derrotas[ordem].tolist(),
+                  games_feitos[ordem].tolist(), games_sofridos[ordem].tolist(),
+                  jogos[ordem].tolist(), saldo[ordem].tolist())
+    ranking = []
+    for i, v, d, gf, gs, j, s in colunas:
+        ranking.append({
+            "nome": jogadores[i],
+            "vitorias": v,
+            "derrotas": d,
+            "games_feitos": gf,
+            "games_sofridos": gs,
+            "jogos_realizados": j,
+            "saldo_games": s,
+            "percentual_vitorias": round((v / j) * 100, 1) if j > 0 else 0.0
+        })
+    return ranking
+
+
+def calcular_ranking(rodadas: List[Dict]) -> List[Dict]:
+    """Ranking individual pela implementação mais rápida para o tamanho das rodadas"""
+    if np is not None:
+        confrontos = sum(len(rodada.get("confrontos", [])) for rodada in rodadas)
+        if confrontos >= MINIMO_CONFRONTOS:
+            return calcular_ranking_vetorizado(rodadas)
+    return calcular_ranking_individual(rodadas)
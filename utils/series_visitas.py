@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Série temporal de acessos (acessos por página em intervalos de tempo)
+Cada lote de visitas soma contagens em três níveis, com retenção própria:
+  minuto - "AAAA-MM-DD HH:MM", guardado por 48 horas
+  hora   - "AAAA-MM-DD HH",    guardado por 90 dias
+  dia    - "AAAA-MM-DD",       guardado para sempre
+O início de cada intervalo é o próprio prefixo do timestamp da visita, então
+as consultas por período são comparações de texto no índice da tabela.
+Fica num banco SQLite próprio (data/visitas_series.db), em modo WAL: o gravador
+de visitas faz um UPSERT por (nível, intervalo, página) a cada lote.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.transacao_sqlite import em_transacao
+
+# nível -> (tamanho do prefixo do timestamp, retenção)
+NIVEIS: Dict[str, Tuple[int, Optional[timedelta]]] = {
+    "minuto": (16, timedelta(hours=48)),
+    "hora": (13, timedelta(days=90)),
+    "dia": (10, None),
+}
+
+# Período consultado quando não se informa o início
+PERIODO_PADRAO = {
+    "minuto": timedelta(hours=1),
+    "hora": timedelta(hours=48),
+    "dia": timedelta(days=30),
+}
+
+# Limpeza dos intervalos vencidos no máximo uma vez por minuto
+INTERVALO_LIMPEZA = 60
+
+ESQUEMA_SERIES = """
+CREATE TABLE IF NOT EXISTS serie_visitas (
+    nivel TEXT NOT NULL,
+    inicio TEXT NOT NULL,
+    pagina TEXT NOT NULL,
+    acessos INTEGER NOT NULL,
+    PRIMARY KEY (nivel, inicio, pagina)
+) WITHOUT ROWID;
+"""
+
+
+def _formatar(momento: datetime) -> str:
+    return momento.strftime("%Y-%m-%d %H:%M:%S")
+
+
+class SeriesVisitas:
+    """Contagens de acessos por minuto/hora/dia e por página"""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._local = threading.local()
+        self._ultima_limpeza = 0.0
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self._conexao().executescript(ESQUEMA_SERIES)
+
+    def _conexao(self) -> sqlite3.Connection:
+        # Uma conexão por thread; recriada depois do fork do gunicorn
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None or self._local.pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=10, isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            conexao.execute("PRAGMA busy_timeout=10000")
+            self._local.conexao = conexao
+            self._local.pid = os.getpid()
+        return conexao
+
+    def somar(self, acessos: Iterable[Tuple[str, str, int]]):
+        """Soma acessos (timestamp, página, peso) aos três níveis, em uma transação"""
+        contagens = Counter()
+        for timestamp, pagina, peso in acessos:
+            for nivel, (tamanho, _) in NIVEIS.items():
+                contagens[(nivel, timestamp[:tamanho], pagina)] += peso
+        if not contagens:
+            return
+
+        conexao = self._conexao()
+        with em_transacao(conexao):
+            conexao.executemany(
+                "INSERT INTO serie_visitas (nivel, inicio, pagina, acessos) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (nivel, inicio, pagina) DO UPDATE SET acessos = acessos + excluded.acessos",
+                [(nivel, inicio, pagina, n) for (nivel, inicio, pagina), n in contagens.items()]
+            )
+            if time.monotonic() - self._ultima_limpeza >= INTERVALO_LIMPEZA:
+                self._limpar(conexao)
+                self._ultima_limpeza = time.monotonic()
+
+    def _limpar(self, conexao: sqlite3.Connection):
+        agora = datetime.now()
+        for nivel, (tamanho, retencao) in NIVEIS.items():
+            if retencao is not None:
+                limite = _formatar(agora - retencao)[:tamanho]
+                conexao.execute("DELETE FROM serie_visitas WHERE nivel = ? AND inicio < ?", (nivel, limite))
+
+    # ---------------------------------------------------------------- consultas
+
+    def periodo(self, nivel: str, inicio: Optional[str] = None, fim: Optional[str] = None) -> Tuple[str, str]:
+        """Período normalizado para o nível (prefixos do timestamp); padrão: PERIODO_PADRAO até agora"""
+        if nivel not in NIVEIS:
+            raise ValueError(f"Nível inválido: {nivel}")
+        tamanho = NIVEIS[nivel][0]
+        agora = datetime.now()
+        inicio = (inicio or _formatar(agora - PERIODO_PADRAO[nivel])).replace("T", " ")
+        fim = (fim or _formatar(agora)).replace("T", " ")
+        return inicio[:tamanho], fim[:tamanho]
+
+    def consultar(self, nivel: str, inicio: Optional[str] = None, fim: Optional[str] = None,
+                  pagina: Optional[str] = None) -> List[Dict]:
+        """Acessos por intervalo no período (todas as páginas ou uma só), em ordem cronológica"""
+        inicio, fim = self.periodo(nivel, inicio, fim)
+        sql = "SELECT inicio, SUM(acessos) FROM serie_visitas WHERE nivel = ? AND inicio >= ? AND inicio <= ?"
+        parametros = [nivel, inicio, fim]
+        if pagina is not None:
+            sql += " AND pagina = ?"
+            parametros.append(pagina)
+        sql += " GROUP BY inicio ORDER BY inicio"
+        return [{"inicio": i, "acessos": n} for i, n in self._conexao().execute(sql, parametros)]
+
+    def por_pagina(self, nivel: str, inicio: Optional[str] = None, fim: Optional[str] = None,
+                   quantidade: int = 20) -> Dict[str, int]:
+        """Páginas mais acessadas no período"""
+        inicio, fim = self.periodo(nivel, inicio, fim)
+        linhas = self._conexao().execute(
+            "SELECT pagina, SUM(acessos) AS total FROM serie_visitas "
+            "WHERE nivel = ? AND inicio >= ? AND inicio <= ? "
+            "GROUP BY pagina ORDER BY total DESC, pagina LIMIT ?",
+            (nivel, inicio, fim, quantidade)
+        )
+        return {pagina: total for pagina, total in linhas}
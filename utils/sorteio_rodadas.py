@@ -632,31 +632,44 @@ def calcular_ranking_individual(rodadas: List[Dict]) -> List[Dict]:
         else:
             stat["percentual_vitorias"] = 0.0
     
-    ranking_ordenado = sorted(
-        stats.values(),
-        key=lambda x: (
-            -x["vitorias"],          # 1º: Mais vitórias = melhor
-            -x["saldo_games"],       # 2º: Maior saldo = melhor
-            -x["games_feitos"],      # 3º: Mais games feitos = melhor
-            x["games_sofridos"]      # 4º: Menos games sofridos = melhor (ordem crescente)
-        )
-    )
+    ranking_ordenado = sorted(stats.values(), key=chave_ranking)
     
     return ranking_ordenado
 
 
+def chave_jogador(jogador) -> tuple:
+    """
+    Ordem estável entre jogadores: ids (int) em ordem numérica e depois nomes (str).
+    Rodadas podem misturar os dois (nomes fora do cadastro ficam como texto).
+    """
+    return (isinstance(jogador, str), jogador)
+
+
+def chave_ranking(stat: Dict) -> tuple:
+    """Chave de ordenação do ranking (menor = melhor)"""
+    return (
+        -stat["vitorias"],              # 1º: Mais vitórias = melhor
+        -stat["saldo_games"],           # 2º: Maior saldo = melhor
+        -stat["games_feitos"],          # 3º: Mais games feitos = melhor
+        stat["games_sofridos"],         # 4º: Menos games sofridos = melhor (ordem crescente)
+        chave_jogador(stat["nome"])     # 5º: Empate total: ordem estável pelo jogador (id ou nome)
+    )
+
+
 def separar_ranking_por_genero(ranking: List[Dict], jogadores_data: List[Dict]) -> Dict:
     """
     Separa o ranking em masculino e feminino
+    (usa o id do jogador quando o ranking tiver, senão o nome)
     """
     sexo_map = {j["nome"]: j["sexo"] for j in jogadores_data}
+    sexo_map.update({j["id"]: j["sexo"] for j in jogadores_data if "id" in j})
     
     masculino = []
     feminino = []
     
     for jogador_stat in ranking:
-        nome = jogador_stat["nome"]
-        sexo = sexo_map.get(nome, "M")
+        chave = jogador_stat.get("id", jogador_stat["nome"])
+        sexo = sexo_map.get(chave, "M")
         
         if sexo == "M":
             masculino.append(jogador_stat)
@@ -669,6 +682,33 @@ def separar_ranking_por_genero(ranking: List[Dict], jogadores_data: List[Dict])
     }
 
 
+def resumo_jogadores(rankings: Dict[str, Dict]) -> List[Dict]:
+    """
+    Totais de cada jogador somando todas as categorias em que joga, com a posição
+    em cada uma ("categorias": {categoria: posição}). Uma passada pelas linhas dos
+    rankings já formatados; ordenado pelos critérios do ranking.
+    """
+    campos = ("vitorias", "derrotas", "games_feitos", "games_sofridos", "saldo_games", "jogos_realizados")
+    resumo = {}
+    for categoria, ranking in rankings.items():
+        for lista in ("ranking", "masculino", "feminino"):
+            for posicao, linha in enumerate(ranking.get(lista) or [], start=1):
+                chave = linha.get("id", linha["nome"])
+                total = resumo.get(chave)
+                if total is None:
+                    total = resumo[chave] = dict({campo: 0 for campo in campos}, nome=linha["nome"], categorias={})
+                    if "id" in linha:
+                        total["id"] = linha["id"]
+                total["categorias"][categoria] = posicao
+                for campo in campos:
+                    total[campo] += linha.get(campo, 0)
+
+    for total in resumo.values():
+        jogos = total["jogos_realizados"]
+        total["percentual_vitorias"] = round((total["vitorias"] / jogos) * 100, 1) if jogos > 0 else 0.0
+    return sorted(resumo.values(), key=chave_ranking)
+
+
 # ============================================================================
 # FUNÇÕES PARA CATEGORIAS MASCULINO E FEMININO (MESMO GÊNERO)
 # ============================================================================
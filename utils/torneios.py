@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Arquivo de torneios encerrados
+O torneio atual continua em data/ e é aberto sem consultar o arquivo (O(1)).
+Ao resetar, o torneio atual é copiado para data/torneios/<id>/ (sempre em arquivos,
+qualquer que seja o backend) e o índice data/torneios/indice.json ganha uma linha
+com a data, as categorias e a quantidade de jogadores de cada categoria.
+
+Cada partição guarda também agregado.json: os totais de cada jogador por categoria
+naquele torneio. O ranking da temporada soma esses agregados (O(torneios × jogadores))
+em vez de recalcular as rodadas de todos os torneios. O agregado registra a assinatura
+dos arquivos de rodadas de onde saiu: se um torneio antigo for corrigido depois, só o
+agregado dele é recalculado.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from utils.armazenamento import CATEGORIAS, BackendJSON, importar_dados
+from utils.arquivos import atualizar_json, escrever_json_atomico
+from utils.cache_leitura import MemoDerivado, cache_leitura
+from utils.estado_torneio import EstadoTorneio
+from utils.jogadores import RegistroJogadores
+from utils.migracoes import migrar
+from utils.ranking_vetorizado import calcular_ranking
+from utils.sorteio_rodadas import chave_ranking
+
+# Ids no formato AAAA-MM-DD, com sufixo -2, -3... para mais de um evento no mesmo dia
+FORMATO_ID = re.compile(r"^\d{4}-\d{2}-\d{2}(-\d+)?$")
+
+# Quantos torneios arquivados ficam abertos em memória ao mesmo tempo
+MAXIMO_ABERTOS = 8
+
+
+def jogadores_das_rodadas(dados: Dict) -> set:
+    """Jogadores (ids) que aparecem em alguma rodada, jogando ou descansando"""
+    jogadores = set()
+    for rodada in dados.get("rodadas", []):
+        for confronto in rodada.get("confrontos", []):
+            for dupla in (confronto.get("dupla1"), confronto.get("dupla2")):
+                if dupla:
+                    jogadores.update((dupla["jogador1"], dupla["jogador2"]))
+        jogadores.update(rodada.get("descansando", []))
+    return jogadores
+
+
+# Colunas de cada linha de agregado.json (uma linha por jogador e categoria)
+COLUNAS_AGREGADO = ("jogador", "vitorias", "derrotas", "games_feitos", "games_sofridos", "jogos_realizados")
+
+
+def agregar_rodadas(dados: Dict) -> List[List]:
+    """Totais de cada jogador numa categoria de um torneio, nas colunas de COLUNAS_AGREGADO"""
+    return [[linha["nome"]] + [linha[coluna] for coluna in COLUNAS_AGREGADO[1:]]
+            for linha in calcular_ranking(dados.get("rodadas", []))]
+
+
+def somar_agregados(agregados: List[Dict], categoria: Optional[str] = None,
+                    registro: Optional[RegistroJogadores] = None) -> List[Dict]:
+    """
+    Ranking da temporada: soma os totais dos torneios (de uma categoria ou de todas),
+    no formato de calcular_ranking_individual mais "torneios" (de quantos participou).
+    Torneios antigos guardam nomes e os novos ids: com o registro, nomes do cadastro
+    viram o id do jogador antes da soma (nomes fora do cadastro continuam texto).
+    """
+    totais: Dict[object, List] = {}
+    for agregado in agregados:
+        presentes = set()
+        for nome_categoria, linhas in agregado["categorias"].items():
+            if categoria is not None and nome_categoria != categoria:
+                continue
+            for jogador, *valores in linhas:
+                if registro is not None and isinstance(jogador, str):
+                    jogador_id = registro.id(jogador)
+                    jogador = jogador if jogador_id is None else jogador_id
+                soma = totais.get(jogador)
+                if soma is None:
+                    totais[jogador] = soma = [0] * (len(valores) + 1)
+                for i, valor in enumerate(valores):
+                    soma[i] += valor
+                if jogador not in presentes:
+                    presentes.add(jogador)
+                    soma[-1] += 1
+
+    ranking = []
+    for jogador, (vitorias, derrotas, feitos, sofridos, jogos, torneios) in totais.items():
+        ranking.append({
+            "nome": jogador,
+            "vitorias": vitorias,
+            "derrotas": derrotas,
+            "games_feitos": feitos,
+            "games_sofridos": sofridos,
+            "jogos_realizados": jogos,
+            "saldo_games": feitos - sofridos,
+            "percentual_vitorias": round((vitorias / jogos) * 100, 1) if jogos > 0 else 0.0,
+            "torneios": torneios
+        })
+    ranking.sort(key=chave_ranking)
+    return ranking
+
+
+class ArquivoTorneios:
+    """Índice e partições (um diretório por torneio) dos torneios encerrados"""
+
+    def __init__(self, diretorio: str = os.path.join("data", "torneios")):
+        self.diretorio = diretorio
+        self._memo = MemoDerivado()
+        self._abertos: "OrderedDict[str, EstadoTorneio]" = OrderedDict()
+        self._abertos_guarda = threading.Lock()
+
+    @property
+    def arquivo_indice(self) -> str:
+        return os.path.join(self.diretorio, "indice.json")
+
+    def diretorio_torneio(self, torneio_id: str) -> str:
+        return os.path.join(self.diretorio, torneio_id)
+
+    def arquivo_agregado(self, torneio_id: str) -> str:
+        return os.path.join(self.diretorio_torneio(torneio_id), "agregado.json")
+
+    # ----------------------------------------------------------------- índice
+
+    def listar(self) -> List[Dict]:
+        """Torneios arquivados, do mais recente para o mais antigo (compartilhado: não modificar)"""
+        indice = cache_leitura.ler(self.arquivo_indice, copiar=False) or []
+        return self._memo.obter("listar", (indice,), lambda: indice[::-1])
+
+    def obter(self, torneio_id: str) -> Optional[Dict]:
+        indice = cache_leitura.ler(self.arquivo_indice, copiar=False) or []
+        por_id = self._memo.obter("por_id", (indice,), lambda: {t["id"]: t for t in indice})
+        return por_id.get(torneio_id)
+
+    def estado(self, torneio_id: str) -> Optional[EstadoTorneio]:
+        """Estado (somente leitura) de um torneio arquivado; None se o id não existe"""
+        if not FORMATO_ID.match(torneio_id or "") or self.obter(torneio_id) is None:
+            return None
+        with self._abertos_guarda:
+            estado = self._abertos.get(torneio_id)
+            if estado is None:
+                backend = BackendJSON(self.diretorio_torneio(torneio_id))
+                migrar(backend)  # partições gravadas por versões anteriores
+                estado = EstadoTorneio(backend)
+                self._abertos[torneio_id] = estado
+                if len(self._abertos) > MAXIMO_ABERTOS:
+                    self._abertos.popitem(last=False)
+            else:
+                self._abertos.move_to_end(torneio_id)
+            return estado
+
+    # -------------------------------------------------------------- arquivar
+
+    def arquivar(self, origem) -> Optional[Dict]:
+        """
+        Copia o torneio atual do backend origem para uma nova partição e registra no índice.
+        Retorna a linha do índice (None se não há rodadas para arquivar).
+        Quem chama limpa o torneio atual depois.
+        """
+        rodadas = {}
+        for categoria in CATEGORIAS:
+            dados = origem.carregar_rodadas(categoria, copiar=False)
+            if dados:
+                rodadas[categoria] = dados
+        if not rodadas:
+            return None
+
+        data = min(dados.get("data_sorteio") or datetime.now().isoformat() for dados in rodadas.values())[:10]
+        resumo = {
+            "data": data,
+            "arquivado_em": datetime.now().isoformat(),
+            "categorias": list(rodadas),
+            "jogadores": {categoria: len(jogadores_das_rodadas(dados)) for categoria, dados in rodadas.items()},
+        }
+
+        def registrar(indice):
+            ids = {t["id"] for t in indice}
+            torneio_id, sufixo = data, 2
+            while torneio_id in ids or os.path.exists(self.diretorio_torneio(torneio_id)):
+                torneio_id, sufixo = f"{data}-{sufixo}", sufixo + 1
+            resumo["id"] = torneio_id
+            os.makedirs(self.diretorio_torneio(torneio_id))
+            importar_dados(origem, BackendJSON(self.diretorio_torneio(torneio_id)))
+            indice.append({"id": torneio_id, **resumo})
+            return indice
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        atualizar_json(self.arquivo_indice, registrar, padrao=[])
+        self.agregado(resumo["id"])  # totais do torneio para o ranking da temporada
+        return self.obter(resumo["id"])
+
+    # ------------------------------------------------------------- temporada
+
+    def _origens(self, backend: BackendJSON) -> Dict[str, Optional[List[int]]]:
+        """Assinatura (mtime, tamanho) dos arquivos de rodadas e diários da partição"""
+        origens = {}
+        for categoria in CATEGORIAS:
+            for arquivo in (backend.arquivo_rodadas(categoria), backend.arquivo_diario(categoria)):
+                try:
+                    st = os.stat(arquivo)
+                    origens[os.path.basename(arquivo)] = [st.st_mtime_ns, st.st_size]
+                except FileNotFoundError:
+                    origens[os.path.basename(arquivo)] = None
+        return origens
+
+    def agregado(self, torneio_id: str) -> Dict:
+        """
+        Totais por jogador e categoria do torneio (compartilhado: não modificar).
+        Recalculado só se ainda não existe ou se as rodadas da partição mudaram.
+        """
+        arquivo = self.arquivo_agregado(torneio_id)
+        backend = BackendJSON(self.diretorio_torneio(torneio_id))
+        agregado = cache_leitura.ler(arquivo, copiar=False)
+        if agregado is not None and agregado.get("origens") == self._origens(backend):
+            return agregado
+
+        migrar(backend)  # partições gravadas por versões anteriores
+        categorias = {}
+        for categoria in CATEGORIAS:
+            dados = backend.carregar_rodadas(categoria, copiar=False)
+            if dados:
+                categorias[categoria] = agregar_rodadas(dados)
+        agregado = {"torneio": torneio_id, "colunas": list(COLUNAS_AGREGADO),
+                    "origens": self._origens(backend), "categorias": categorias}
+        escrever_json_atomico(arquivo, agregado)
+        return agregado
+
+    def anos(self) -> List[str]:
+        """Anos com torneios arquivados, do mais recente para o mais antigo"""
+        return sorted({t["data"][:4] for t in self.listar()}, reverse=True)
+
+    def ranking_temporada(self, categoria: Optional[str] = None, ano: Optional[str] = None,
+                          registro: Optional[RegistroJogadores] = None) -> List[Dict]:
+        """
+        Ranking acumulado dos torneios arquivados (do ano, se informado), de uma
+        categoria ou de todas, sobre ids (compartilhado: não modificar).
+        O registro (cadastro atual) junta nomes de torneios antigos aos ids.
+        """
+        agregados = tuple(self.agregado(t["id"]) for t in self.listar()
+                          if ano is None or t["data"].startswith(ano))
+        return self._memo.obter(("temporada", categoria, ano), agregados + (registro,),
+                                lambda: somar_agregados(agregados, categoria, registro))
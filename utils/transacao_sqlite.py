@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Transações explícitas nos bancos SQLite do sistema (torneio e série de visitas)
+As conexões são abertas com isolation_level=None (autocommit): cada bloco que
+precisa ser atômico abre a sua com em_transacao.
+"""
+
+import sqlite3
+
+
+class em_transacao:
+    """Executa um bloco dentro de BEGIN IMMEDIATE / COMMIT (ROLLBACK em caso de erro)"""
+
+    def __init__(self, conexao: sqlite3.Connection):
+        self.conexao = conexao
+
+    def __enter__(self):
+        self.conexao.execute("BEGIN IMMEDIATE")
+        return self.conexao
+
+    def __exit__(self, tipo, valor, tb):
+        self.conexao.execute("COMMIT" if tipo is None else "ROLLBACK")
+        return False
+
+
+class sem_transacao:
+    """Bloco já executado dentro de uma transação aberta pelo chamador"""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, tipo, valor, tb):
+        return False
@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+"""
+Registro de visitas fora do caminho da requisição
+O before_request só coloca a visita numa fila em memória (limitada); uma thread
+grava as visitas em lotes a cada BT_VISITAS_INTERVALO_MS:
+- data/visitas/: log append-only em segmentos, uma visita por linha, ver utils.log_segmentado;
+  cada visita é um array de inteiros (CAMPOS_VISITA), com os textos no dicionário do segmento
+- data/visitas_agregados.json: contagens por navegador, plataforma, página, origem e hora,
+  atualizadas a cada lote (a página de estatísticas não percorre o log)
+- data/visitantes.bin: total de visitantes únicos (só ele: lido a cada página inicial),
+  e data/visitantes_detalhes.bin: únicos por dia e por página, ver utils.cardinalidade
+- data/visitas_series.db: acessos por minuto/hora/dia e página, ver utils.series_visitas
+Se a fila encher (BT_VISITAS_FILA), as visitas excedentes são descartadas e contadas.
+"""
+
+import atexit
+import json
+import os
+import queue
+import re
+import threading
+from datetime import date, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.arquivos import atualizar_json, bloqueio, escrever_atomico, escrever_json_atomico, ler_json
+from utils.cache_leitura import MemoDerivado, cache_leitura
+from utils.cardinalidade import hash_visitante, ler_contadores, serializar_contadores, unir_contadores
+from utils.log_segmentado import LogSegmentado
+from utils.series_visitas import SeriesVisitas
+
+INTERVALO_VISITAS_MS = int(os.environ.get("BT_VISITAS_INTERVALO_MS", "1000"))
+TAMANHO_FILA_VISITAS = int(os.environ.get("BT_VISITAS_FILA", "10000"))
+
+# Segmentos do log: rotação por tamanho ou idade e retenção dos segmentos selados
+TAMANHO_SEGMENTO = int(os.environ.get("BT_VISITAS_SEGMENTO_KB", "4096")) * 1024
+DURACAO_SEGMENTO = int(os.environ.get("BT_VISITAS_SEGMENTO_HORAS", "24")) * 3600
+RETENCAO_DIAS = int(os.environ.get("BT_VISITAS_RETENCAO_DIAS", "365"))
+RETENCAO_BYTES = int(os.environ.get("BT_VISITAS_RETENCAO_MB", "1024")) * 1024 * 1024
+
+# Contadores de únicos: por quantos dias guardar o contador diário e quantas páginas
+# distintas acompanhar (o resto, ex.: URLs de robôs, vai para OUTRAS_PAGINAS)
+DIAS_UNICOS = int(os.environ.get("BT_VISITANTES_DIAS", "90"))
+MAXIMO_PAGINAS = 200
+OUTRAS_PAGINAS = "(outras)"
+
+# Agregados: dimensões contadas e limite de chaves distintas por dimensão
+DIMENSOES = ("navegadores", "plataformas", "paginas", "referrers", "horarios")
+MAXIMO_CHAVES = 500
+OUTRAS_CHAVES = "(outros)"
+ACESSO_DIRETO = "(acesso direto)"
+
+
+def chaves_visita(visita: Dict) -> Dict[str, str]:
+    """Chave de cada dimensão dos agregados para uma visita"""
+    timestamp = visita.get("timestamp") or ""
+    return {
+        "navegadores": visita.get("navegador") or "",
+        "plataformas": visita.get("plataforma") or "",
+        "paginas": visita.get("path") or "/",
+        "referrers": visita.get("referrer") or ACESSO_DIRETO,
+        "horarios": timestamp[11:13] if len(timestamp) >= 13 else "",
+    }
+
+
+def somar_agregados(agregados: Dict, visitas: Iterable[Dict]) -> Dict:
+    """Soma as visitas aos agregados, cada uma com seu peso de amostragem (modifica e retorna o dict)"""
+    agregados.setdefault("total", 0)
+    for dimensao in DIMENSOES:
+        agregados.setdefault(dimensao, {})
+    for visita in visitas:
+        peso = visita.get("peso", 1)
+        agregados["total"] += peso
+        for dimensao, chave in chaves_visita(visita).items():
+            if dimensao == "horarios" and not chave:
+                continue
+            contagens = agregados[dimensao]
+            if chave not in contagens and len(contagens) >= MAXIMO_CHAVES:
+                chave = OUTRAS_CHAVES
+            contagens[chave] = contagens.get(chave, 0) + peso
+    return agregados
+
+
+def mais_frequentes(contagens: Dict[str, int], quantidade: int) -> Dict[str, int]:
+    return dict(sorted(contagens.items(), key=lambda item: (-item[1], item[0]))[:quantidade])
+
+
+# Registro compacto de uma visita: posições do array gravado no log. O timestamp vira
+# o inteiro AAAAMMDDHHMMSS; os textos (TEXTOS_VISITA) viram ids do dicionário do segmento.
+# O IP em si não é gravado, só o hash.
+CAMPOS_VISITA = ("timestamp", "ip_hash", "user_agent", "navegador", "plataforma", "idioma", "referrer",
+                 "url_acessada", "path", "metodo", "host", "scheme", "peso")
+TEXTOS_VISITA = tuple(range(1, 12))
+
+
+def codificar_visita(visita: Dict) -> list:
+    registro = [visita.get(campo) for campo in CAMPOS_VISITA]
+    registro[0] = int(re.sub(r"\D", "", registro[0] or "")[:14] or 0)
+    registro[-1] = registro[-1] or 1
+    return registro
+
+
+def decodificar_visita(registro: list) -> Dict:
+    """Array (com os textos já resolvidos) de volta ao dict da visita"""
+    visita = dict(zip(CAMPOS_VISITA, registro))
+    t = f"{visita['timestamp']:014d}"
+    visita["timestamp"] = f"{t[:4]}-{t[4:6]}-{t[6:8]} {t[8:10]}:{t[10:12]}:{t[12:]}"
+    if visita["peso"] == 1:
+        del visita["peso"]
+    return visita
+
+
+class RegistradorVisitas:
+    """Fila limitada + gravação em lotes por uma thread de segundo plano"""
+
+    def __init__(self, diretorio_log: str, arquivo_unicos: str, arquivo_unicos_detalhes: str,
+                 arquivo_agregados: str, arquivo_series: str,
+                 intervalo_ms: int = INTERVALO_VISITAS_MS, tamanho_fila: int = TAMANHO_FILA_VISITAS):
+        self.log = LogSegmentado(diretorio_log, TAMANHO_SEGMENTO, DURACAO_SEGMENTO, RETENCAO_DIAS, RETENCAO_BYTES,
+                                 campos_texto=TEXTOS_VISITA)
+        self.arquivo_unicos = arquivo_unicos
+        self.arquivo_unicos_detalhes = arquivo_unicos_detalhes
+        self.arquivo_agregados = arquivo_agregados
+        self.series = SeriesVisitas(arquivo_series)
+        self._memo = MemoDerivado()
+        self.intervalo = intervalo_ms / 1000
+        self._fila: "queue.Queue[Dict]" = queue.Queue(maxsize=tamanho_fila)
+        self._gravacao = threading.Lock()
+        self._gravador = None
+        self._pid = None
+        self.descartadas = 0
+        self.gravadas = 0
+        self._paginas: set = set()
+        self._nomes_unicos: List[str] = []
+
+    def registrar(self, visita: Dict):
+        """Enfileira a visita sem bloquear; descarta se a fila estiver cheia"""
+        self._iniciar()
+        try:
+            self._fila.put_nowait(visita)
+        except queue.Full:
+            self.descartadas += 1
+
+    def _iniciar(self):
+        # A thread não sobrevive ao fork do gunicorn: cria no worker, na primeira visita
+        if self._gravador is not None and self._pid == os.getpid():
+            return
+        with self._gravacao:
+            if self._gravador is not None and self._pid == os.getpid():
+                return
+            if self._gravador is None:
+                atexit.register(self.descarregar)
+            self._pid = os.getpid()
+            self._gravador = threading.Thread(target=self._laco, name="gravacao-visitas", daemon=True)
+            self._gravador.start()
+
+    def _laco(self):
+        evento = threading.Event()
+        while True:
+            evento.wait(self.intervalo)
+            try:
+                self.descarregar()
+            except Exception as e:
+                print(f"Erro ao gravar visitas: {e}")
+
+    def descarregar(self) -> int:
+        """Grava tudo o que está na fila (um append no log; agregados, únicos e série uma vez por lote)"""
+        with self._gravacao:
+            lote = []
+            while True:
+                try:
+                    lote.append(self._fila.get_nowait())
+                except queue.Empty:
+                    break
+            if not lote:
+                return 0
+
+            # Agregados atualizados sob o bloqueio do log: os dois sempre contam as mesmas visitas
+            self.log.anexar_registros(
+                [codificar_visita(visita) for visita in lote],
+                ao_gravar=lambda: atualizar_json(self.arquivo_agregados,
+                                                 lambda agregados: somar_agregados(agregados, lote), padrao={})
+            )
+
+            paginas = self._contar_unicos(lote)
+            self.series.somar(
+                (visita["timestamp"], pagina, visita.get("peso", 1)) for visita, pagina in zip(lote, paginas)
+            )
+            self.gravadas += len(lote)
+            return len(lote)
+
+    def _contar_unicos(self, lote: List[Dict]) -> List[str]:
+        """Junta o lote aos contadores de únicos; retorna a página (já limitada) de cada visita"""
+        total = set()
+        novos: Dict[str, set] = {}
+        paginas = []
+        for visita in lote:
+            valor = hash_visitante(visita["ip_hash"])
+            pagina = visita.get("path") or "/"
+            if pagina not in self._paginas and len(self._paginas) >= MAXIMO_PAGINAS:
+                pagina = OUTRAS_PAGINAS
+            paginas.append(pagina)
+            total.add(valor)
+            for nome in ("dia:" + visita["timestamp"][:10], "pagina:" + pagina):
+                novos.setdefault(nome, set()).add(valor)
+
+        unir_contadores(self.arquivo_unicos, {"total": total})
+        # Dias fora da retenção, pelos nomes vistos na gravação anterior
+        limite = "dia:" + (date.today() - timedelta(days=DIAS_UNICOS)).isoformat()
+        antigos = [nome for nome in self._nomes_unicos if nome.startswith("dia:") and nome < limite]
+        contadores = unir_contadores(self.arquivo_unicos_detalhes, novos, remover=antigos)
+        self._nomes_unicos = list(contadores)
+        self._paginas = {nome[7:] for nome in contadores if nome.startswith("pagina:")}
+        return paginas
+
+    # ---------------------------------------------------------------- leitura
+
+    def contadores_unicos(self) -> Dict:
+        """Contadores de únicos por dia e por página (compartilhados: não modificar)"""
+        return cache_leitura.ler(self.arquivo_unicos_detalhes, ler_contadores, copiar=False) or {}
+
+    def total_unicos(self) -> int:
+        """Visitantes únicos desde o início: arquivo de um contador só (até 4 KB), em cache pelo stat"""
+        contador = (cache_leitura.ler(self.arquivo_unicos, ler_contadores, copiar=False) or {}).get("total")
+        return len(contador) if contador is not None else 0
+
+    def unicos_por_dia(self, dias: int = 14) -> Dict[str, int]:
+        """Únicos de cada um dos últimos dias (do mais recente para o mais antigo)"""
+        contadores = self.contadores_unicos()
+        hoje = date.today()
+        resultado = {}
+        for atraso in range(dias):
+            dia = (hoje - timedelta(days=atraso)).isoformat()
+            contador = contadores.get("dia:" + dia)
+            resultado[dia] = len(contador) if contador is not None else 0
+        return resultado
+
+    def unicos_por_pagina(self, quantidade: int = 10) -> Dict[str, int]:
+        """Páginas com mais visitantes únicos"""
+        contadores = self.contadores_unicos()
+
+        def calcular():
+            paginas = {nome[7:]: len(contador) for nome, contador in contadores.items()
+                       if nome.startswith("pagina:")}
+            return mais_frequentes(paginas, quantidade)
+
+        return self._memo.obter(("unicos_por_pagina", quantidade), (contadores,), calcular)
+
+    def agregados(self) -> Dict:
+        """Contagens acumuladas de todas as visitas (compartilhadas: não modificar)"""
+        try:
+            return cache_leitura.ler(self.arquivo_agregados, copiar=False) or {}
+        except ValueError:
+            return {}
+
+    def resumo(self, quantidade: int = 10) -> Dict:
+        """Total de acessos e as chaves mais frequentes de cada dimensão (horários em ordem)"""
+        agregados = self.agregados()
+
+        def calcular():
+            resumo = {"total": agregados.get("total", 0)}
+            for dimensao in DIMENSOES:
+                contagens = agregados.get(dimensao, {})
+                if dimensao == "horarios":
+                    resumo[dimensao] = dict(sorted(contagens.items()))
+                else:
+                    resumo[dimensao] = mais_frequentes(contagens, quantidade)
+            return resumo
+
+        return self._memo.obter(("resumo", quantidade), (agregados,), calcular)
+
+    def pagina_log(self, cursor: Optional[str] = None, limite: int = 50) -> Tuple[List[Dict], Optional[str]]:
+        """Visitas da mais recente para a mais antiga, a partir do cursor, e o cursor seguinte"""
+        linhas, proximo = self.log.ler(cursor, limite)
+        return list(self._decodificar(linhas)), proximo
+
+    def _decodificar(self, linhas: Iterable[Tuple[int, bytes]]) -> Iterator[Dict]:
+        """Visitas das linhas (seq, linha) do log; só as linhas pedidas são decodificadas"""
+        for seq, linha in linhas:
+            try:
+                registro = json.loads(linha)
+                if isinstance(registro, dict):  # gravada antes dos registros compactos
+                    registro.pop("ip_original", None)
+                    yield registro
+                else:
+                    yield decodificar_visita(self.log.decodificar(seq, registro))
+            except (json.JSONDecodeError, IndexError, TypeError, ValueError):
+                continue
+
+    def ultimas(self, quantidade: int) -> List[Dict]:
+        """Últimas visitas gravadas, da mais recente para a mais antiga"""
+        return self.pagina_log(None, quantidade)[0]
+
+    def converter_log_antigo(self, arquivo_antigo: str):
+        """
+        Logs de versões anteriores entram no log segmentado (uma vez):
+        data/visitas_detalhadas.json (lista JSON) ou data/visitas.log (NDJSON)
+        """
+        if not os.path.exists(arquivo_antigo):
+            return
+        with bloqueio(arquivo_antigo):
+            if not os.path.exists(arquivo_antigo):
+                return
+            if arquivo_antigo.endswith(".json"):
+                try:
+                    antigas = ler_json(arquivo_antigo, padrao=[])
+                except ValueError:
+                    antigas = []
+                self._anexar_antigas(antigas)
+            else:
+                with open(arquivo_antigo, "rb") as f:
+                    self._anexar_antigas(self._decodificar((0, linha) for linha in f))
+            os.remove(arquivo_antigo)
+
+    def _anexar_antigas(self, visitas: Iterable[Dict], lote: int = 1000):
+        registros = []
+        for visita in visitas:
+            registros.append(codificar_visita(visita))
+            if len(registros) == lote:
+                self.log.anexar_registros(registros)
+                registros = []
+        if registros:
+            self.log.anexar_registros(registros)
+
+    def reconstruir_agregados(self):
+        """Cria os agregados a partir do log, se ainda não existem (uma vez)"""
+        if os.path.exists(self.arquivo_agregados):
+            return
+        with self.log.bloqueio():
+            if os.path.exists(self.arquivo_agregados):
+                return
+            agregados = somar_agregados({}, self._decodificar(self.log.percorrer()))
+            escrever_json_atomico(self.arquivo_agregados, agregados)
+
+    def converter_unicos_antigos(self, arquivo_antigo: str):
+        """data/visitas.json (lista de hashes) vira o contador total (uma vez)"""
+        if not os.path.exists(arquivo_antigo):
+            return
+        with bloqueio(arquivo_antigo):
+            if not os.path.exists(arquivo_antigo):
+                return
+            try:
+                hashes = ler_json(arquivo_antigo, padrao=[])
+            except ValueError:
+                hashes = []
+            unir_contadores(self.arquivo_unicos, {"total": {hash_visitante(h) for h in hashes}})
+            os.remove(arquivo_antigo)
+
+    def separar_unicos(self):
+        """
+        Arquivo de únicos do formato anterior (total, dias e páginas juntos): move os
+        contadores por dia e por página para o arquivo de detalhes (uma vez)
+        """
+        with bloqueio(self.arquivo_unicos):
+            try:
+                contadores = ler_contadores(self.arquivo_unicos)
+            except ValueError:
+                return
+            detalhes = {nome: contador for nome, contador in contadores.items() if nome != "total"}
+            if not detalhes:
+                return
+            # Unir é idempotente: se cair antes da linha seguinte, repetir não conta ninguém duas vezes
+            unir_contadores(self.arquivo_unicos_detalhes, detalhes)
+            total = {"total": contadores["total"]} if "total" in contadores else {}
+            escrever_atomico(self.arquivo_unicos, serializar_contadores(total))
+
+    def estatisticas(self) -> Dict:
+        return {
+            "na_fila": self._fila.qsize(),
+            "gravadas": self.gravadas,
+            "descartadas": self.descartadas
+        }